@@ -491,7 +491,8 @@ async def QuestionAnswerGenerationModel(
                     await save_video_results(
                         video_id=video_id,
                         video_data=video_data,
-                        courses_videos_collection=courses_videos_collection
+                        courses_videos_collection=courses_videos_collection,
+                        course_id=course_id
                     )
                     
                     processed_video_ids.append(video_id)
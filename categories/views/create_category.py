@@ -1,8 +1,9 @@
 from fastapi import HTTPException, Request, Form, File, UploadFile, Depends
 from bson import ObjectId
 from core.database import categories_collection
-from helper_function.image_upload import upload_image_to_tencent
+from helper_function.image_processing import upload_image_with_variants
 from helper_function.apis_requests import get_current_user
+from helper_function.reference_cache import invalidate_reference_cache
 from datetime import datetime
 
 async def create_category(
@@ -23,12 +24,14 @@ async def create_category(
         
         # Upload image to Tencent Cloud
         image_content = await category_image.read()
-        image_result = await upload_image_to_tencent(image_content, category_image.filename)
+        image_result = await upload_image_with_variants(image_content, category_image.filename)
         
         # Create image object
         image_obj = {
             "fileId": image_result["file_id"],
-            "image_url": image_result["image_url"]
+            "image_url": image_result["image_url"],
+            "variants": image_result["variants"],
+            "placeholder": image_result["placeholder"]
         }
         
         # Create new category  
@@ -41,6 +44,7 @@ async def create_category(
         }
         
         result = await categories_collection.insert_one(new_category)
+        await invalidate_reference_cache("categories")
         category_id = str(result.inserted_id)
         
         # Format response
@@ -1,8 +1,10 @@
 from fastapi import HTTPException, Request, Depends
 from bson import ObjectId
 from core.database import categories_collection, courses_collection
-from helper_function.video_upload import delete_from_tencent_vod
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
 from helper_function.apis_requests import get_current_user
+from helper_function.image_processing import image_file_ids
+from helper_function.reference_cache import invalidate_reference_cache
 
 async def delete_category(
     category_id: str,
@@ -26,21 +28,25 @@ async def delete_category(
         )
         courses_affected = courses_updated.modified_count
         
-        # Delete image from Tencent Cloud
-        deleted_from_tencent = False
-        if "image" in category and category["image"]:
-            image_obj = category["image"]
-            if "fileId" in image_obj and image_obj["fileId"]:
-                success = await delete_from_tencent_vod(image_obj["fileId"])
-                deleted_from_tencent = success
-        elif "image_url" in category and category["image_url"]:
-            image_obj = category["image_url"]
-            if "fileId" in image_obj and image_obj["fileId"]:
-                success = await delete_from_tencent_vod(image_obj["fileId"])
-                deleted_from_tencent = success
+        # Image is recorded in the outbox before the delete and queued once it lands
+        image_obj = category.get("image") or category.get("image_url") or {}
+        staged_deletions = await stage_media_deletions(image_file_ids(image_obj), "delete_category")
         
         # Delete category from database
-        await categories_collection.delete_one({"_id": ObjectId(category_id)})
+        try:
+            deleted = await categories_collection.delete_one({"_id": ObjectId(category_id)})
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
+        await invalidate_reference_cache("categories")
+        
+        # Image is deleted from Tencent Cloud by the media outbox reaper
+        if deleted.deleted_count:
+            deletion_queued = bool(await activate_media_deletions(staged_deletions))
+        else:
+            # A concurrent delete won and queues the image itself
+            await discard_staged_deletions(staged_deletions)
+            deletion_queued = False
         
         return {
             "success": True,
@@ -48,7 +54,7 @@ async def delete_category(
             "data": {
                 "category_id": category_id,
                 "category_name": category.get("name"),
-                "deleted_from_tencent": deleted_from_tencent,
+                "image_deletion_queued": deletion_queued,
                 "image_fileId": category["image"]["fileId"] if category.get("image") else (category["image_url"]["fileId"] if category.get("image_url") else None)
             }
         }
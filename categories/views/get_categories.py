@@ -1,33 +1,60 @@
 from fastapi import HTTPException, Request, Depends
+from typing import Optional
 from core.database import categories_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.pagination import fetch_keyset_page, keyset_cursor, get_estimated_count, validate_limit, DEFAULT_PAGE_LIMIT
+from helper_function.streaming import stream_documents, validate_stream_format, validate_stream_limit
+
+def format_category(doc):
+    return {
+        "id": str(doc.get("_id")),
+        "category_name": doc.get("name"),
+        "image": doc.get("image") or doc.get("image_url"),
+        "status": doc.get("status", True)
+    }
 
 async def get_all_categories(
     request: Request,
-    token: str = Depends(get_current_user)
+    token: str = Depends(get_current_user),
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    stream: Optional[str] = None
 ):
     """Get all categories with id and category_name"""
     try:
-        docs = await categories_collection.find({}).to_list(length=10000)
-
-        categories = [
-            {
-                "id": str(doc.get("_id")),
-                "category_name": doc.get("name"),
-                "image": doc.get("image") or doc.get("image_url"),
-                "status": doc.get("status", True)
+        if stream:
+            cursor = keyset_cursor(categories_collection, {}, after, limit=validate_stream_limit(limit))
+            return stream_documents(cursor, format_category, validate_stream_format(stream))
+        
+        pagination = None
+        if after or limit is not None:
+            page_limit = validate_limit(DEFAULT_PAGE_LIMIT if limit is None else limit)
+            docs, next_cursor, has_next = await fetch_keyset_page(categories_collection, {}, page_limit, after)
+            pagination = {
+                "limit": page_limit,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+                "estimated_total": await get_estimated_count(categories_collection)
             }
-            for doc in docs
-        ]    
+        else:
+            docs = await categories_collection.find({}).to_list(length=10000)
+
+        categories = [format_category(doc) for doc in docs]    
             
+        data = {
+            "total_categories": len(categories),
+            "categories": categories
+        }
+        if pagination:
+            data["pagination"] = pagination
+        
         return {
             "success": True,
             "message": "Categories retrieved successfully",
-            "data": {
-                "total_categories": len(categories),
-                "categories": categories
-            }
+            "data": data
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
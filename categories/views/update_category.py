@@ -1,9 +1,10 @@
 from fastapi import HTTPException, Request, Form, File, UploadFile, Depends
 from bson import ObjectId
 from core.database import categories_collection
-from helper_function.image_upload import upload_image_to_tencent
-from helper_function.video_upload import delete_from_tencent_vod
+from helper_function.image_processing import upload_image_with_variants, image_file_ids
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
 from helper_function.apis_requests import get_current_user
+from helper_function.reference_cache import invalidate_reference_cache
 from datetime import datetime
 from typing import Optional
 
@@ -32,6 +33,7 @@ async def update_category(
         # Prepare update data
         update_data = {"updatedAt": datetime.now()}
         old_image_file_id = None
+        old_image_file_ids = []
         
         # Update name if provided
         if name:
@@ -51,34 +53,43 @@ async def update_category(
         # Update image if provided
         if category_image:
             # Store old image fileId for deletion
-            if "image" in existing_category and existing_category["image"]:
-                old_image_file_id = existing_category["image"].get("fileId")
-            elif "image_url" in existing_category and existing_category["image_url"]:
-                old_image_file_id = existing_category["image_url"].get("fileId")
+            old_image = existing_category.get("image") or existing_category.get("image_url")
+            if old_image:
+                old_image_file_id = old_image.get("fileId")
+                old_image_file_ids = image_file_ids(old_image)
             
             # Upload new image to Tencent Cloud
             image_content = await category_image.read()
-            image_result = await upload_image_to_tencent(image_content, category_image.filename)
+            image_result = await upload_image_with_variants(image_content, category_image.filename)
             
             # Create new image object
             update_data["image"] = {
                 "fileId": image_result["file_id"],
-                "image_url": image_result["image_url"]
+                "image_url": image_result["image_url"],
+                "variants": image_result["variants"],
+                "placeholder": image_result["placeholder"]
             }
         
+        # Old image is recorded in the outbox before the write and queued once it lands
+        staged_deletions = await stage_media_deletions(old_image_file_ids if category_image else [], "update_category")
+        
         # Update category in database
-        result = await categories_collection.update_one(
-            {"_id": ObjectId(category_id)},
-            {"$set": update_data}
-        )
+        try:
+            result = await categories_collection.update_one(
+                {"_id": ObjectId(category_id)},
+                {"$set": update_data}
+            )
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
         
         if result.matched_count == 0:
+            await discard_staged_deletions(staged_deletions)
             raise HTTPException(status_code=404, detail={"message": "Category not found. Please verify the category ID and try again."})
+        await invalidate_reference_cache("categories")
         
-        # Delete old image from Tencent Cloud if new image was uploaded
-        deleted_from_tencent = False
-        if old_image_file_id and category_image:
-            deleted_from_tencent = await delete_from_tencent_vod(old_image_file_id)
+        # Old image is deleted from Tencent Cloud by the media outbox reaper
+        deletion_queued = bool(await activate_media_deletions(staged_deletions))
         
         # Get updated category
         updated_category = await categories_collection.find_one({"_id": ObjectId(category_id)})
@@ -93,7 +104,7 @@ async def update_category(
             "message": "Category updated successfully",
             "data": {
                 "category": updated_category,
-                "old_image_deleted": deleted_from_tencent,
+                "old_image_deletion_queued": deletion_queued,
                 "old_image_fileId": old_image_file_id if old_image_file_id else None
             }
         }
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class DatabaseSettings(BaseSettings):
@@ -23,6 +24,38 @@ class TencentSettings(BaseSettings):
         env_file = ".env"
         extra = "ignore"  # Ignore extra fields in the .env file
 
+class UploadSettings(BaseSettings):
+    UPLOAD_SPOOL_DIR: Optional[str] = None  # Defaults to the system temp directory
+    UPLOAD_COPY_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_EXECUTOR_WORKERS: int = 4
+    UPLOAD_CONCURRENCY: int = 4  # Files uploaded at once across all requests
+    # Per-upload memory is bounded by UPLOAD_PART_SIZE_MB * UPLOAD_PART_THREADS
+    UPLOAD_PART_SIZE_MB: int = 8
+    UPLOAD_PART_THREADS: int = 4
+    # Resumable upload sessions: parts are staged under this directory until finalize
+    UPLOAD_SESSION_DIR: Optional[str] = None  # Defaults to <temp dir>/upload_sessions
+    UPLOAD_SESSION_MAX_CHUNK_BYTES: int = 64 * 1024 * 1024
+    UPLOAD_SESSION_TTL_HOURS: int = 24
+    # Threads for chunk file I/O, kept apart from the long-running upload pool
+    UPLOAD_SESSION_IO_WORKERS: int = 4
+    UPLOAD_SESSION_SWEEP_MINUTES: int = 30
+    # Background upload jobs: worker tasks per process, how long a running job
+    # may go without a heartbeat before another worker takes it over, and tries per job
+    UPLOAD_JOB_WORKERS: int = 2
+    UPLOAD_JOB_STALE_MINUTES: int = 30
+    UPLOAD_JOB_MAX_ATTEMPTS: int = 3
+    # Tencent DeleteMedia calls in flight at once, and tries per file
+    MEDIA_DELETE_CONCURRENCY: int = 8
+    MEDIA_DELETE_MAX_ATTEMPTS: int = 4
+    # Deletion outbox reaper: files per batch, and attempts before an entry is parked as dead
+    MEDIA_OUTBOX_BATCH_SIZE: int = 50
+    MEDIA_OUTBOX_MAX_ATTEMPTS: int = 10
+    # Worker processes generating resized image variants
+    IMAGE_PROCESS_WORKERS: int = 2
+    class Config:
+        env_file = ".env"
+        extra = "ignore"
+
 class AIFeatureSecrets(BaseSettings):
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
     # HUGGINGFACEHUB_API_TOKEN: str
@@ -40,4 +73,5 @@ class AIFeatureSecrets(BaseSettings):
 db_settings = DatabaseSettings()
 jwt_settings = JWTSettings()
 settings = TencentSettings()
+upload_settings = UploadSettings()
 ai_api_secrets = AIFeatureSecrets()
\ No newline at end of file
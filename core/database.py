@@ -13,6 +13,7 @@ testimonials_collection = db.testimonials
 sponsors_collection = db.sponsors
 mobile_otp_collection = db.mobile_otps
 layout_collection = db.layout
+layout_cards_collection = db.layout_cards
 instructors_collection = db.instructor
 email_otp_collection = db.email_otps
 dashboard_collection = db.dashboard
@@ -23,4 +24,9 @@ contact_collection = db.contact
 categories_collection = db.categories
 admins_collection = db.admins
 question_and_answer_collection = db["Q&A"]
+upload_sessions_collection = db.upload_sessions
+upload_jobs_collection = db.upload_jobs
+media_deletion_outbox_collection = db.media_deletion_outbox
+media_reconciliation_runs_collection = db.media_reconciliation_runs
+media_blobs_collection = db.media_blobs
 languages_collection = db.languages
\ No newline at end of file
@@ -9,10 +9,14 @@ from courses.views.course_curd.delete_all_intro_videos import delete_all_intro_v
 from courses.views.course_curd.delete_all_course_videos import delete_all_course_videos_from_tencent
 from courses.views.course_curd.update_course import update_course
 from courses.views.course_curd.add_videos_to_course import add_videos_to_course
-from courses.views.course_curd.update_course_video import update_course_video_by_fileid, delete_course_video_by_fileid
+from courses.views.course_curd.update_course_video import update_course_video_by_fileid, delete_course_video_by_fileid, bulk_update_course_videos
 from courses.views.course_curd.specific_course_details import get_specific_course_details
+from courses.views.course_curd.resumable_upload import create_upload_session, get_upload_session, upload_session_chunk, finalize_upload_session
+from courses.views.course_curd.upload_job_status import get_upload_job_status
+from courses.views.course_curd.media_outbox_metrics import get_media_outbox_metrics
+from courses.views.course_curd.media_reconciliation import start_media_reconciliation, get_media_reconciliation
 from helper_function.video_upload import upload_course_video, get_course_videos
-from helper_function.layoutdata_update import update_layout_endpoint, get_layout_courses
+from helper_function.layoutdata_update import update_layout_endpoint, update_layout_rule, get_layout_courses
 from documentation.userRoutesAPIDocumentation import *
 
 courses_router = APIRouter(prefix="/admin", tags=["Courses"])
@@ -25,18 +29,28 @@ courses_router.add_api_route("/courses/visible", get_visible_courses, methods=["
 courses_router.add_api_route("/courses/top", get_top_courses, methods=["GET"], description="Get top courses")
 courses_router.add_api_route("/courses/{course_id}/update", update_course, methods=["PUT"], description="Update course with smart file replacement")
 courses_router.add_api_route("/courses/{course_id}/videos/add", add_videos_to_course, methods=["POST"], description="Add videos to existing course")
+courses_router.add_api_route("/courses/{course_id}/videos/bulk-update", bulk_update_course_videos, methods=["PATCH"], description="Reorder and update many course videos in one request")
 courses_router.add_api_route("/courses/{course_id}/videos/{file_id}/update", update_course_video_by_fileid, methods=["PUT"], description="Update specific course video by fileId")
 courses_router.add_api_route("/courses/{course_id}/videos/{file_id}/delete", delete_course_video_by_fileid, methods=["DELETE"], description="Delete specific course video by fileId")
 courses_router.add_api_route("/courses/{course_id}/visibility/toggle", toggle_course_visibility, methods=["PUT"], description="Toggle course visibility")
 courses_router.add_api_route("/courses/{course_id}/delete", delete_entire_course, methods=["DELETE"], description="Delete entire course and all media")
 courses_router.add_api_route("/intro-videos/delete-all", delete_all_intro_videos_from_tencent, methods=["DELETE"], description="Delete all intro videos from collection and Tencent Cloud")
 courses_router.add_api_route("/course-videos/delete-all", delete_all_course_videos_from_tencent, methods=["DELETE"], description="Delete all course videos from collection and Tencent Cloud")
+courses_router.add_api_route("/media/outbox/metrics", get_media_outbox_metrics, methods=["GET"], description="Media deletion outbox backlog and metrics")
+courses_router.add_api_route("/media/reconcile", start_media_reconciliation, methods=["POST"], description="Find Tencent media no document references (optionally queue them for deletion)")
+courses_router.add_api_route("/media/reconcile/{run_id}", get_media_reconciliation, methods=["GET"], description="Get media reconciliation run report")
 
 # Course Videos
-courses_router.add_api_route("/courses/{course_id}/videos/upload", upload_course_video, methods=["POST"], description="Upload course video")
+courses_router.add_api_route("/courses/{course_id}/videos/upload", upload_course_video, methods=["POST"], description="Queue a course video upload (returns 202 with a job id)")
 courses_router.add_api_route("/courses/{course_id}/videos", get_course_videos, methods=["GET"], description="Get course videos")
+courses_router.add_api_route("/courses/{course_id}/videos/uploads", create_upload_session, methods=["POST"], description="Start a resumable video upload session")
+courses_router.add_api_route("/courses/{course_id}/videos/uploads/{upload_id}", get_upload_session, methods=["GET"], description="Get resumable upload status and offset")
+courses_router.add_api_route("/courses/{course_id}/videos/uploads/{upload_id}", upload_session_chunk, methods=["PUT"], description="Upload a chunk at the given offset")
+courses_router.add_api_route("/courses/{course_id}/videos/uploads/{upload_id}/finalize", finalize_upload_session, methods=["POST"], description="Finalize resumable upload and send video to Tencent VOD")
+courses_router.add_api_route("/jobs/{job_id}", get_upload_job_status, methods=["GET"], description="Get background upload job status and progress")
 
 # Layout Management
 courses_router.add_api_route("/layout/update-by-rating", update_layout_endpoint, methods=["PUT"], description="Update layout based on course ratings")
-# courses_router.add_api_route("/layout/{layout_id}/courses", get_layout_courses, methods=["GET"], description="Get courses for specific layout")
+courses_router.add_api_route("/layout/{layout_id}/rule", update_layout_rule, methods=["PUT"], description="Set a layout's rule and recompute layouts")
+courses_router.add_api_route("/layout/{layout_id}/courses", get_layout_courses, methods=["GET"], description="Get courses for specific layout")
 
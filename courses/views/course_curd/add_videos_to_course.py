@@ -2,29 +2,48 @@ from fastapi import HTTPException, Depends, Form, File, UploadFile
 from typing import Optional, List
 from bson import ObjectId
 from core.database import courses_collection, courses_videos_collection
-from helper_function.video_upload import upload_to_tencent_vod
+from functools import partial
+from helper_function.video_upload import upload_video_file_to_tencent, delete_from_tencent_vod
+from helper_function.upload_engine import upload_concurrently, upload_failure_detail, uploaded_file_ids, MediaUploadError
 from helper_function.apis_requests import get_current_user
+from helper_function.course_detail_cache import invalidate_course_detail
+from helper_function.course_videos import push_course_videos, insertion_point, parse_order, find_course_video
+from helper_function.media_outbox import enqueue_media_deletions
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+async def _discard_new_videos(new_videos_list, upload_results):
+    """Queue uploaded files no course references and drop their lecture documents"""
+    await enqueue_media_deletions(uploaded_file_ids(upload_results), "add_videos_to_course")
+    # insert_many sets _id on each document it was given, even when the write fails
+    written_ids = [video["_id"] for video in new_videos_list if "_id" in video]
+    if written_ids:
+        await courses_videos_collection.delete_many({"_id": {"$in": written_ids}})
+
+def _video_id_list(course):
+    # Old courses store a single id (or null) instead of an array
+    video_ids = course.get("videos") or []
+    return video_ids if isinstance(video_ids, list) else [video_ids]
+
 async def add_videos_to_course(
     course_id: str,
     token: str = Depends(get_current_user),
     video_title: Optional[str] = Form(None),
     video_description: Optional[str] = Form(None),
     order: Optional[str] = Form(None),
+    insert_after: Optional[str] = Form(None),  # fileId of the lecture the new videos follow
     video_file: List[UploadFile] = File(...)
 ):
-    """Add new videos to existing course"""
+    """Add new videos to existing course, at the end or right after `insert_after`"""
     try:
         # Validate course_id
         if not ObjectId.is_valid(course_id):
             raise HTTPException(status_code=400, detail="Invalid course ID")
         
         # Check course exists
-        existing_course = await courses_collection.find_one({"_id": ObjectId(course_id)})
+        existing_course = await courses_collection.find_one({"_id": ObjectId(course_id)}, {"videos": 1})
         if not existing_course:
             raise HTTPException(status_code=404, detail="Course not found")
         
@@ -39,47 +58,89 @@ async def add_videos_to_course(
         descriptions = video_description.split(',') if video_description else []
         orders = order.split(',') if order else []
         
-        # Upload videos and prepare data
-        new_videos_list = []
+        # Reject a bad anchor before uploading; its position is taken after the upload
+        if insert_after:
+            try:
+                await find_course_video(_video_id_list(existing_course), insert_after, projection={"_id": 1})
+            except LookupError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+            except ValueError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+        
+        # Upload all videos concurrently (bounded by the upload semaphore)
+        upload_jobs = []
+        file_indexes = []
         for i, vid_file in enumerate(video_file):
             if vid_file.filename:
-                # Upload video to Tencent
-                video_content = await vid_file.read()
-                video_result = await upload_to_tencent_vod(video_content, vid_file.filename)
-                
-                # Simple order - use provided order or increment
-                order_value = int(orders[i].strip()) if i < len(orders) and orders[i].strip().isdigit() else i + 1
-                
-                video_obj = {
-                    "order": order_value,
-                    "video_title": titles[i].strip() if i < len(titles) else f"Video {i+1}",
-                    "video_description": descriptions[i].strip() if i < len(descriptions) else "",
-                    "fileId": video_result["file_id"],
-                    "videoUrl": video_result["video_url"],
-                    "type": "video",
-                    "uploaded_at": current_time
-                }
-                new_videos_list.append(video_obj)
-                logger.info(f"Video uploaded: {video_result['file_id']}")
+                file_indexes.append(i)
+                upload_jobs.append(("video_file", vid_file.filename, partial(upload_video_file_to_tencent, vid_file)))
+        
+        try:
+            upload_results = await upload_concurrently(upload_jobs, rollback=delete_from_tencent_vod)
+        except MediaUploadError as e:
+            raise HTTPException(status_code=500, detail=upload_failure_detail(e))
+        
+        # Prepare video data
+        new_videos_list = []
+        for i, upload_result in zip(file_indexes, upload_results):
+            video_result = upload_result["result"]
+            
+            # Order - the provided (possibly fractional) order or increment; an insert overrides it below
+            order_value = parse_order(orders[i]) if i < len(orders) else None
+            if order_value is None:
+                order_value = i + 1
+            
+            video_obj = {
+                "order": order_value,
+                "video_title": titles[i].strip() if i < len(titles) else f"Video {i+1}",
+                "video_description": descriptions[i].strip() if i < len(descriptions) else "",
+                "fileId": video_result["file_id"],
+                "videoUrl": video_result["video_url"],
+                "type": "video",
+                "uploaded_at": current_time,
+                "course_id": course_id
+            }
+            new_videos_list.append(video_obj)
+            logger.info(f"Video uploaded: {video_result['file_id']}")
         
         if not new_videos_list:
             raise HTTPException(status_code=400, detail="No valid videos were uploaded")
         
-        # Insert individual video documents
-        new_video_ids = []
-        for video_obj in new_videos_list:
-            video_obj["course_id"] = course_id
-            video_result = await courses_videos_collection.insert_one(video_obj)
-            new_video_ids.append(video_result.inserted_id)
-        
-        # Update course with new video IDs
-        existing_video_ids = existing_course.get("videos", [])
-        updated_video_ids = existing_video_ids + new_video_ids
+        # Inserting between lectures gets fractional orders, placed against the
+        # course as it is now rather than before the (slow) upload
+        position = None
+        if insert_after:
+            try:
+                current_course = await courses_collection.find_one({"_id": ObjectId(course_id)}, {"videos": 1})
+                if not current_course:
+                    raise LookupError("Course not found")
+                position, insert_orders = await insertion_point(
+                    _video_id_list(current_course), insert_after, len(new_videos_list)
+                )
+            except Exception as e:
+                await _discard_new_videos(new_videos_list, upload_results)
+                if isinstance(e, LookupError):
+                    raise HTTPException(status_code=404, detail=str(e))
+                if isinstance(e, ValueError):
+                    raise HTTPException(status_code=409, detail=str(e))
+                raise
+            for video_obj, order_value in zip(new_videos_list, insert_orders):
+                video_obj["order"] = order_value
         
-        await courses_collection.update_one(
-            {"_id": ObjectId(course_id)},
-            {"$set": {"videos": updated_video_ids, "updated_at": current_time}}
-        )
+        # Insert individual video documents in one write, then append (or insert) their IDs
+        # atomically so concurrent adds cannot lose each other
+        try:
+            insert_result = await courses_videos_collection.insert_many(new_videos_list)
+            new_video_ids = list(insert_result.inserted_ids)
+            updated_video_ids = await push_course_videos(course_id, new_video_ids, position, current_time)
+        except Exception:
+            await _discard_new_videos(new_videos_list, upload_results)
+            raise
+        if updated_video_ids is None:
+            # Course was deleted while the videos uploaded
+            await _discard_new_videos(new_videos_list, upload_results)
+            raise HTTPException(status_code=404, detail="Course not found")
+        invalidate_course_detail(course_id)
         
         # Get all videos for response sorted by order
         all_videos_cursor = courses_videos_collection.find({"_id": {"$in": updated_video_ids}}).sort("order", 1)
@@ -88,13 +149,6 @@ async def add_videos_to_course(
             video["_id"] = str(video["_id"])
             all_videos.append(video)
         
-        # Auto-update layout based on rating in background
-        try:
-            from helper_function.layoutdata_update import update_layout_by_rating
-            await update_layout_by_rating()
-        except Exception:
-            pass  # Don't fail video addition if layout update fails
-        
         return {
             "status": 200,
             "massage": f"Successfully added {len(new_videos_list)} videos to course",
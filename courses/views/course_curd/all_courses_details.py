@@ -1,8 +1,11 @@
+import asyncio
 from fastapi import HTTPException, Request, Depends
+from typing import Optional
 from bson import ObjectId
 from core.database import courses_collection, courses_videos_collection
 from helper_function.apis_requests import get_current_user
-from helper_function.validate_references import validate_course_references
+from helper_function.validate_references import validate_courses_references, request_lookup_cache
+from helper_function.pagination import validate_limit, keyset_query, build_keyset_page, get_estimated_count
 
 def convert_objectids(obj):
     """Recursively convert ObjectIds to strings"""
@@ -15,77 +18,97 @@ def convert_objectids(obj):
     else:
         return obj
 
+def _video_join_stages():
+    """Join each course to its sorted videos and strip bookkeeping fields"""
+    return [
+        {"$lookup": {
+            "from": courses_videos_collection.name,
+            "localField": "videos",
+            "foreignField": "_id",
+            "pipeline": [
+                {"$sort": {"order": 1}},
+                {"$project": {"type": 0, "created_at": 0}},
+            ],
+            "as": "videos_details",
+        }},
+        {"$set": {"total_videos": {"$size": "$videos_details"}}},
+        # Keep only videos_details; strip bookkeeping fields from media subdocuments
+        {"$unset": [
+            "videos",
+            "intro_videos.type",
+            "intro_videos.uploaded_at",
+            "images.type",
+            "images.uploaded_at",
+        ]},
+    ]
+
+def build_courses_page_pipeline(skip: int, limit: int, after_match: dict = None):
+    """Aggregation returning one _id-ordered page of courses with their videos.
+
+    $match/$sort/$skip/$limit lead the pipeline so the page is read from the
+    _id index; videos are joined only for the courses on the page.
+    """
+    stages = [{"$match": after_match or {}}, {"$sort": {"_id": 1}}]
+    if skip:
+        stages.append({"$skip": skip})
+    stages.append({"$limit": limit})
+    return [*stages, *_video_join_stages()]
+
 async def get_all_courses_details(
     request: Request,
     token: str = Depends(get_current_user),
     page: int = 1, 
-    limit: int = 10
+    limit: int = 10,
+    after: Optional[str] = None,
+    exact_total: bool = False
 ):
-    """Get all courses with pagination"""
+    """Get all courses with page or cursor (`after`) pagination"""
     try:
-        skip = (page - 1) * limit
+        validate_limit(limit)
+        skip = 0 if after else (page - 1) * limit
+        after_match = keyset_query({}, after)
         
-        # Get total count
-        total_courses = await courses_collection.count_documents({})
+        # Page with joined video details; the exact count (if asked for) runs alongside it.
+        # One extra row is read so has_next does not depend on the count.
+        page_query = courses_collection.aggregate(
+            build_courses_page_pipeline(skip, limit + 1, after_match)
+        ).to_list(length=None)
+        count_query = (
+            courses_collection.count_documents({}) if exact_total
+            else get_estimated_count(courses_collection)
+        )
+        rows, total_courses = await asyncio.gather(page_query, count_query)
         
-        # Get paginated courses
-        courses_cursor = courses_collection.find({}).skip(skip).limit(limit)
-        courses = await courses_cursor.to_list(length=None)
+        courses, next_cursor, has_next = build_keyset_page(rows, limit)
         
-        # Validate references and fetch video details for each course
-        for course in courses:
-            # Validate and clean invalid references
-            course = await validate_course_references(course)
-            if "videos" in course and course["videos"]:
-                try:
-                    # Get individual video documents sorted by order
-                    videos_cursor = courses_videos_collection.find({"_id": {"$in": course["videos"]}}).sort("order", 1)
-                    videos_details = []
-                    async for video in videos_cursor:
-                        video["_id"] = str(video["_id"])
-                        # Remove unwanted fields
-                        video.pop("type", None)
-                        video.pop("created_at", None)
-                        videos_details.append(video)
-                    course["videos_details"] = videos_details
-                    course["total_videos"] = len(videos_details)
-                except Exception as e:
-                    course["videos_details"] = []
-                    course["total_videos"] = 0
-            else:
-                course["videos_details"] = []
-                course["total_videos"] = 0
-            
-            # Remove videos array (keep only videos_details)
-            if "videos" in course:
-                del course["videos"]
-            
-            # Clean intro_videos and images - remove type and uploaded_at
-            if "intro_videos" in course and course["intro_videos"]:
-                course["intro_videos"].pop("type", None)
-                course["intro_videos"].pop("uploaded_at", None)
-            
-            if "images" in course and course["images"]:
-                course["images"].pop("type", None)
-                course["images"].pop("uploaded_at", None)
+        # Validate and clean invalid references for the whole page at once
+        await validate_courses_references(courses, request_lookup_cache(request))
         
         courses = convert_objectids(courses)
         
-        total_pages = (total_courses + limit - 1) // limit
+        pagination = {
+            "limit": limit,
+            "has_next": has_next,
+            "next_cursor": next_cursor,
+            "total_courses": total_courses,
+            "total_is_exact": exact_total
+        }
+        if not after:
+            total_pages = (total_courses + limit - 1) // limit
+            pagination.update({
+                "current_page": page,
+                "total_pages": total_pages,
+                "has_prev": page > 1
+            })
         
         return {
             "success": True,
             "message": f"Retrieved {len(courses)} courses successfully",
             "data": courses,
-            "pagination": {
-                "current_page": page,
-                "total_pages": total_pages,
-                "total_courses": total_courses,
-                "limit": limit,
-                "has_next": page < total_pages,
-                "has_prev": page > 1
-            }
+            "pagination": pagination
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -3,10 +3,16 @@ from fastapi import Request, Body, HTTPException, Depends, Form, File, UploadFil
 from typing import Optional, List
 from bson import ObjectId
 from core.database import courses_collection, courses_videos_collection, course_intro_video_collection
-from helper_function.video_upload import upload_to_tencent_vod
-from helper_function.image_upload import upload_image_to_tencent
-from helper_function.layoutdata_update import update_layout_by_rating
+from functools import partial
+from helper_function.video_upload import upload_video_file_to_tencent, delete_from_tencent_vod
+from helper_function.image_processing import upload_image_file_with_variants
+from helper_function.upload_engine import upload_concurrently, upload_failure_detail, uploaded_file_ids, MediaUploadError
+from helper_function.media_outbox import enqueue_media_deletions
+from helper_function.layout_engine import sync_course_layout
+from helper_function.course_videos import parse_order
+from helper_function.dashboard_counters import record_course_created
 from datetime import datetime
+import logging
 
 # class CourseModel(BaseModel):
 #     title: str
@@ -22,6 +28,8 @@ from datetime import datetime
 from fastapi import Request,Body,HTTPException, Depends
 from helper_function.apis_requests import get_current_user
 
+logger = logging.getLogger(__name__)
+
 async def create_course(
     request: Request,
     token: str = Depends(get_current_user),
@@ -43,45 +51,77 @@ async def create_course(
     """Create course with optional video upload"""
     try:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # Parse comma-separated IDs into arrays (before uploading, so bad IDs don't orphan media)
+        category_id_list = [ObjectId(id.strip()) for id in category_id.split(',') if id.strip() and id.strip() != "string"]
+        language_id_list = [ObjectId(id.strip()) for id in language_id.split(',') if id.strip() and id.strip() != "string"]
+        instructor_id_list = [ObjectId(id.strip()) for id in instructor_id.split(',') if instructor_id and id.strip() and id.strip() != "string"] if instructor_id else []
+
+        # Lectures, course image and intro video are uploaded concurrently
+        upload_jobs = []
+        lecture_indexes = []
+        if video_file and len(video_file) > 0 and video_file[0].filename:
+            for i, vid_file in enumerate(video_file):
+                if vid_file.filename:
+                    lecture_indexes.append(i)
+                    upload_jobs.append(("video_file", vid_file.filename, partial(upload_video_file_to_tencent, vid_file)))
+        
+        if course_image_url and course_image_url.filename:
+            upload_jobs.append(("course_image_url", course_image_url.filename, partial(upload_image_file_with_variants, course_image_url)))
+        
+        if course_intro_video and course_intro_video.filename:
+            upload_jobs.append(("course_intro_video", course_intro_video.filename, partial(upload_video_file_to_tencent, course_intro_video)))
+        
+        try:
+            upload_results = await upload_concurrently(upload_jobs, rollback=delete_from_tencent_vod)
+        except MediaUploadError as e:
+            raise HTTPException(status_code=500, detail=upload_failure_detail(e))
+        
+        lecture_results = [r["result"] for r in upload_results if r["field"] == "video_file"]
+        uploaded_media = {r["field"]: r["result"] for r in upload_results if r["field"] != "video_file"}
+
+        # Course id is allocated up front so video documents are written with it directly
+        course_object_id = ObjectId()
+        course_id = str(course_object_id)
+
         # Create individual video documents
         video_ids = []
-        if video_file and len(video_file) > 0 and video_file[0].filename:
+        video_docs = []
+        if lecture_results:
             titles = video_title.split(',') if video_title else []
             descriptions = video_description.split(',') if video_description else []
             orders = order.split(',') if order else []
             
-            for i, vid_file in enumerate(video_file):
-                if vid_file.filename:
-                    video_content = await vid_file.read()
-                    video_result = await upload_to_tencent_vod(video_content, vid_file.filename)
-                    
-                    # Simple order - use provided order or increment
-                    order_value = int(orders[i].strip()) if i < len(orders) and orders[i].strip().isdigit() else i + 1
-                    
-                    video_obj = {
-                        "order": order_value,
-                        "video_title": titles[i].strip() if i < len(titles) else f"Video {i+1}",
-                        "video_description": descriptions[i].strip() if i < len(descriptions) else "",
-                        "fileId": video_result["file_id"],
-                        "videoUrl": video_result["video_url"],
-                        "type": "video",
-                        "created_at": current_time
-                    }
-                    
-                    # Insert each video as separate document
-                    video_doc_result = await courses_videos_collection.insert_one(video_obj)
-                    video_ids.append(video_doc_result.inserted_id)
+            for i, video_result in zip(lecture_indexes, lecture_results):
+                # Simple order - use provided order or increment
+                order_value = parse_order(orders[i]) if i < len(orders) else None
+                if order_value is None:
+                    order_value = i + 1
+                
+                video_docs.append({
+                    "_id": ObjectId(),
+                    "order": order_value,
+                    "video_title": titles[i].strip() if i < len(titles) else f"Video {i+1}",
+                    "video_description": descriptions[i].strip() if i < len(descriptions) else "",
+                    "fileId": video_result["file_id"],
+                    "videoUrl": video_result["video_url"],
+                    "type": "video",
+                    "created_at": current_time,
+                    "course_id": course_id
+                })
+            video_ids = [doc["_id"] for doc in video_docs]
         
         # Handle course image upload to Tencent Cloud
         image_obj = None
         
-        if course_image_url and course_image_url.filename:
-            course_image_content = await course_image_url.read()
-            course_image_result = await upload_image_to_tencent(course_image_content, course_image_url.filename)
+        if "course_image_url" in uploaded_media:
+            course_image_result = uploaded_media["course_image_url"]
             
             image_obj = {
                 "fileId": course_image_result["file_id"],
                 "course_image_url": course_image_result["image_url"],
+                "variants": course_image_result["variants"],
+                "placeholder": course_image_result["placeholder"],
                 "type": "course_image",
                 "uploaded_at": current_time
             }
@@ -90,9 +130,8 @@ async def create_course(
         intro_video_obj = None
         intro_video_url = None
         
-        if course_intro_video and course_intro_video.filename:
-            course_intro_video_content = await course_intro_video.read()
-            course_intro_video_result = await upload_to_tencent_vod(course_intro_video_content, course_intro_video.filename)
+        if "course_intro_video" in uploaded_media:
+            course_intro_video_result = uploaded_media["course_intro_video"]
             
             intro_video_obj = {
                 "fileId": course_intro_video_result["file_id"],
@@ -101,17 +140,9 @@ async def create_course(
                 "uploaded_at": current_time
             }
             intro_video_url = course_intro_video_result["video_url"]
-            
-
-
-        # Parse comma-separated IDs into arrays
-        category_id_list = [ObjectId(id.strip()) for id in category_id.split(',') if id.strip() and id.strip() != "string"]
-        language_id_list = [ObjectId(id.strip()) for id in language_id.split(',') if id.strip() and id.strip() != "string"]
-        instructor_id_list = [ObjectId(id.strip()) for id in instructor_id.split(',') if instructor_id and id.strip() and id.strip() != "string"] if instructor_id else []
-
-
 
         new_course = {
+            "_id": course_object_id,
             "title": title,
             "description": description,
             "category_id": category_id_list,
@@ -127,15 +158,18 @@ async def create_course(
             "updated_at": current_time
         }
 
-        result = await courses_collection.insert_one(new_course)
-        course_id = str(result.inserted_id)
-        
-        # Update all videos with course_id
-        if video_ids:
-            await courses_videos_collection.update_many(
-                {"_id": {"$in": video_ids}},
-                {"$set": {"course_id": course_id}}
-            )
+        try:
+            # Lecture documents in one write, then the course that references them
+            if video_docs:
+                await courses_videos_collection.insert_many(video_docs)
+            await courses_collection.insert_one(new_course)
+        except Exception:
+            # Nothing references the uploaded files; queue them and drop any written lectures
+            await enqueue_media_deletions(uploaded_file_ids(upload_results), "create_course_rollback")
+            await courses_videos_collection.delete_many({"course_id": course_id})
+            raise
+
+        await record_course_created(visible)
         
 
  
@@ -147,11 +181,12 @@ async def create_course(
         if new_course["videos"]:
             new_course["videos"] = [str(vid_id) for vid_id in new_course["videos"]]
 
-        # Auto-update layout based on rating in background
+        # Apply only this course to the layouts
         try:
-            await update_layout_by_rating()
-        except Exception:
-            pass  # Don't fail course creation if layout update fails
+            await sync_course_layout(course_object_id)
+        except Exception as e:
+            # Don't fail course creation; the periodic layout rebuild picks the course up
+            logger.error(f"Layout sync failed for new course {course_object_id}: {e}")
 
         # Fetch videos data for response sorted by order
         videos_data = []
@@ -190,6 +225,8 @@ async def create_course(
             "data": response_data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,7 +1,8 @@
 from fastapi import HTTPException, Depends
 from core.database import courses_videos_collection
-from helper_function.video_upload import delete_from_tencent_vod
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
 from helper_function.apis_requests import get_current_user
+from helper_function.course_detail_cache import invalidate_course_detail
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,7 +13,7 @@ async def delete_all_course_videos_from_tencent(
     """Delete all course videos from courses_videos collection and Tencent Cloud"""
     try:
         # Get all video containers from collection
-        video_containers = await courses_videos_collection.find({}).to_list(None)
+        video_containers = await courses_videos_collection.find({}, {"fileId": 1, "file_id": 1, "FileId": 1, "videos": 1}).to_list(None)
         
         if not video_containers:
             return {
@@ -21,46 +22,44 @@ async def delete_all_course_videos_from_tencent(
                 "data": {
                     "total_containers": 0,
                     "total_videos": 0,
-                    "deleted_from_tencent": 0,
+                    "queued_for_deletion": 0,
                     "deleted_from_database": 0,
-                    "failed_deletions": []
+                    "kept_shared_files": 0
                 }
             }
         
-        deleted_from_tencent = []
-        failed_deletions = []
+        # Collect fileIds from video documents and legacy containers with a videos array
+        file_ids = []
         total_videos = 0
-        
-        # Process each video container
         for container in video_containers:
-            # Check if container has videos array
             if "videos" in container and isinstance(container["videos"], list):
-                for video in container["videos"]:
-                    total_videos += 1
-                    file_id = None
-                    
-                    # Try to get fileId from different possible fields
-                    if "fileId" in video and video["fileId"]:
-                        file_id = video["fileId"]
-                    elif "file_id" in video and video["file_id"]:
-                        file_id = video["file_id"]
-                    elif "FileId" in video and video["FileId"]:
-                        file_id = video["FileId"]
-                    
-                    if file_id:
-                        success = await delete_from_tencent_vod(file_id)
-                        if success:
-                            deleted_from_tencent.append(file_id)
-                            logger.info(f"Successfully deleted course video from Tencent: {file_id}")
-                        else:
-                            failed_deletions.append(file_id)
-                            logger.error(f"Failed to delete course video from Tencent: {file_id}")
-                    else:
-                        logger.warning(f"No fileId found for video in container: {container.get('_id', 'Unknown')}")
+                videos = container["videos"]
+            else:
+                videos = [container]
+            for video in videos:
+                total_videos += 1
+                # Try to get fileId from different possible fields
+                file_id = video.get("fileId") or video.get("file_id") or video.get("FileId")
+                if file_id:
+                    file_ids.append(file_id)
+                else:
+                    logger.warning(f"No fileId found for video in container: {container.get('_id', 'Unknown')}")
+        
+        # One reference is released per entry; files another document still shares are kept
+        staged_deletions = await stage_media_deletions(file_ids, "delete_all_course_videos")
         
         # Delete all video containers from database collection
-        delete_result = await courses_videos_collection.delete_many({})
+        try:
+            delete_result = await courses_videos_collection.delete_many({})
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
         deleted_from_database = delete_result.deleted_count
+        # Every course page listed these videos
+        invalidate_course_detail()
+        
+        # Files are deleted from Tencent by the media outbox reaper
+        queued_for_deletion = await activate_media_deletions(staged_deletions)
         
         response = {
             "success": True,
@@ -68,16 +67,13 @@ async def delete_all_course_videos_from_tencent(
             "data": {
                 "total_containers": len(video_containers),
                 "total_videos": total_videos,
-                "deleted_from_tencent": len(deleted_from_tencent),
+                "queued_for_deletion": len(queued_for_deletion),
                 "deleted_from_database": deleted_from_database,
-                "failed_deletions": failed_deletions,
-                "tencent_deleted_files": deleted_from_tencent
+                "kept_shared_files": len(set(file_ids)) - len(queued_for_deletion),
+                "tencent_queued_files": queued_for_deletion
             }
         }
         
-        if failed_deletions:
-            response["message"] += f" (Warning: {len(failed_deletions)} files could not be deleted from Tencent Cloud)"
-        
         return response
         
     except Exception as e:
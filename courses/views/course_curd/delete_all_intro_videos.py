@@ -1,6 +1,6 @@
 from fastapi import HTTPException, Depends
 from core.database import course_intro_video_collection
-from helper_function.video_upload import delete_from_tencent_vod
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
 from helper_function.apis_requests import get_current_user
 import logging
 
@@ -12,7 +12,7 @@ async def delete_all_intro_videos_from_tencent(
     """Delete all intro videos from course_intro_video collection and Tencent Cloud"""
     try:
         # Get all intro videos from collection
-        intro_videos = await course_intro_video_collection.find({}).to_list(None)
+        intro_videos = await course_intro_video_collection.find({}, {"fileId": 1, "file_id": 1, "FileId": 1}).to_list(None)
         
         if not intro_videos:
             return {
@@ -20,57 +20,47 @@ async def delete_all_intro_videos_from_tencent(
                 "message": "No intro videos found to delete",
                 "data": {
                     "total_found": 0,
-                    "deleted_from_tencent": 0,
+                    "queued_for_deletion": 0,
                     "deleted_from_database": 0,
-                    "failed_deletions": []
+                    "kept_shared_files": 0
                 }
             }
         
-        deleted_from_tencent = []
-        failed_deletions = []
-        
-        # Delete each video from Tencent Cloud
+        # Collect fileIds, trying the different possible fields
+        file_ids = []
         for video in intro_videos:
-            file_id = None
-            
-            # Try to get fileId from different possible fields
-            if "fileId" in video and video["fileId"]:
-                file_id = video["fileId"]
-            elif "file_id" in video and video["file_id"]:
-                file_id = video["file_id"]
-            elif "FileId" in video and video["FileId"]:
-                file_id = video["FileId"]
-            
+            file_id = video.get("fileId") or video.get("file_id") or video.get("FileId")
             if file_id:
-                success = await delete_from_tencent_vod(file_id)
-                if success:
-                    deleted_from_tencent.append(file_id)
-                    logger.info(f"Successfully deleted intro video from Tencent: {file_id}")
-                else:
-                    failed_deletions.append(file_id)
-                    logger.error(f"Failed to delete intro video from Tencent: {file_id}")
+                file_ids.append(file_id)
             else:
                 logger.warning(f"No fileId found for intro video: {video.get('_id', 'Unknown')}")
         
+        # One reference is released per entry; files another document still shares are kept
+        staged_deletions = await stage_media_deletions(file_ids, "delete_all_intro_videos")
+        
         # Delete all intro videos from database collection
-        delete_result = await course_intro_video_collection.delete_many({})
+        try:
+            delete_result = await course_intro_video_collection.delete_many({})
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
         deleted_from_database = delete_result.deleted_count
         
+        # Files are deleted from Tencent by the media outbox reaper
+        queued_for_deletion = await activate_media_deletions(staged_deletions)
+        
         response = {
             "success": True,
             "message": f"Processed {len(intro_videos)} intro videos",
             "data": {
                 "total_found": len(intro_videos),
-                "deleted_from_tencent": len(deleted_from_tencent),
+                "queued_for_deletion": len(queued_for_deletion),
                 "deleted_from_database": deleted_from_database,
-                "failed_deletions": failed_deletions,
-                "tencent_deleted_files": deleted_from_tencent
+                "kept_shared_files": len(set(file_ids)) - len(queued_for_deletion),
+                "tencent_queued_files": queued_for_deletion
             }
         }
         
-        if failed_deletions:
-            response["message"] += f" (Warning: {len(failed_deletions)} files could not be deleted from Tencent Cloud)"
-        
         return response
         
     except Exception as e:
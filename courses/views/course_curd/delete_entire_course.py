@@ -1,20 +1,16 @@
 from fastapi import HTTPException, Depends
 from bson import ObjectId
 from core.database import courses_collection, courses_videos_collection
-from helper_function.video_upload import delete_from_tencent_vod
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
+from helper_function.layout_engine import remove_course_from_layouts
+from helper_function.dashboard_counters import record_course_deleted
 from helper_function.apis_requests import get_current_user
+from helper_function.image_processing import image_file_ids
+from helper_function.course_detail_cache import invalidate_course_detail
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def delete_from_tencent_vod_image(file_id: str):
-    """Delete image from Tencent VOD (same function as video delete)"""
-    try:
-        return await delete_from_tencent_vod(file_id)
-    except Exception as e:
-        logger.error(f"Failed to delete image {file_id}: {str(e)}")
-        return False
-
 async def delete_entire_course(
     course_id: str,
     token: str = Depends(get_current_user)
@@ -30,72 +26,66 @@ async def delete_entire_course(
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
         
-        deleted_files = []
-        failed_deletions = []
+        # Collect every Tencent file of the course, labelled for the response
+        media_files = []
         
-        # Delete course image from Tencent VOD
-        if "images" in course and course["images"]:
-            image = course["images"]
-            if "fileId" in image and image["fileId"]:
-                success = await delete_from_tencent_vod_image(image["fileId"])
-                if success:
-                    deleted_files.append(f"Image: {image['fileId']}")
-                else:
-                    failed_deletions.append(f"Image: {image['fileId']}")
+        # Course image and its variants
+        for index, file_id in enumerate(image_file_ids(course.get("images"))):
+            media_files.append(("Image" if index == 0 else "Image Variant", file_id))
         
-        # Delete intro video from Tencent VOD
+        # Intro video
         if "intro_videos" in course and course["intro_videos"]:
             intro_video = course["intro_videos"]
             if "fileId" in intro_video and intro_video["fileId"]:
-                success = await delete_from_tencent_vod(intro_video["fileId"])
-                if success:
-                    deleted_files.append(f"Intro Video: {intro_video['fileId']}")
-                else:
-                    failed_deletions.append(f"Intro Video: {intro_video['fileId']}")
+                media_files.append(("Intro Video", intro_video["fileId"]))
+        
+        # Course videos
+        video_ids = course.get("videos") or []
+        # Ensure videos is an array
+        if not isinstance(video_ids, list):
+            # Handle old format where videos was single ObjectId
+            video_ids = [video_ids]
+        if video_ids:
+            videos_cursor = courses_videos_collection.find({"_id": {"$in": video_ids}}, {"fileId": 1})
+            async for video in videos_cursor:
+                if video.get("fileId"):
+                    media_files.append(("Video", video["fileId"]))
         
-        # Delete course videos from Tencent VOD and individual video documents
-        if "videos" in course and course["videos"]:
-            video_ids = course["videos"]
-            # Ensure videos is an array
-            if not isinstance(video_ids, list):
-                # Handle old format where videos was single ObjectId
-                video_ids = [video_ids] if video_ids else []
-            
-            if video_ids:
-                videos_cursor = courses_videos_collection.find({"_id": {"$in": video_ids}})
-                async for video in videos_cursor:
-                    if "fileId" in video and video["fileId"]:
-                        success = await delete_from_tencent_vod(video["fileId"])
-                        if success:
-                            deleted_files.append(f"Video: {video['fileId']}")
-                        else:
-                            failed_deletions.append(f"Video: {video['fileId']}")
-                
-                # Delete all video documents from database
-                await courses_videos_collection.delete_many({"_id": {"$in": video_ids}})
+        # Files are recorded in the outbox before the deletes and queued once they land
+        staged_deletions = await stage_media_deletions((file_id for _, file_id in media_files), "delete_entire_course")
         
-        # Delete course from database
-        await courses_collection.delete_one({"_id": ObjectId(course_id)})
+        # Delete course from database, then its video documents
+        try:
+            deleted_course = await courses_collection.find_one_and_delete({"_id": ObjectId(course_id)}, {"visible": 1})
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
+        if not deleted_course:
+            # A concurrent delete won and queues the files itself
+            await discard_staged_deletions(staged_deletions)
+            raise HTTPException(status_code=404, detail="Course not found")
+        
+        # Files are deleted from Tencent VOD by the media outbox reaper; queued as soon as
+        # the course is gone so a failure below cannot strand them
+        await activate_media_deletions(staged_deletions)
+        await record_course_deleted(deleted_course.get("visible"))
+        if video_ids:
+            await courses_videos_collection.delete_many({"_id": {"$in": video_ids}})
+        await remove_course_from_layouts(course_id)
+        invalidate_course_detail(course_id)
+        queued_files = [f"{label}: {file_id}" for label, file_id in media_files]
         
-        # Prepare response
-        response = {
+        return {
             "success": True,
             "message": "Course deleted successfully",
             "data": {
                 "course_id": course_id,
                 "course_title": course.get("title", "Unknown"),
-                "deleted_files": deleted_files,
-                "failed_deletions": failed_deletions,
-                "total_deleted": len(deleted_files),
-                "total_failed": len(failed_deletions)
+                "queued_for_deletion": queued_files,
+                "total_queued": len(queued_files)
             }
         }
         
-        if failed_deletions:
-            response["message"] += f" (Warning: {len(failed_deletions)} files could not be deleted from Tencent Cloud)"
-        
-        return response
-        
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,7 @@
+from fastapi import Depends
+from helper_function.apis_requests import get_current_user
+from helper_function.media_outbox import get_outbox_metrics
+
+async def get_media_outbox_metrics(token: str = Depends(get_current_user)):
+    """Backlog and throughput of the media deletion outbox"""
+    return {"status": 200, "data": await get_outbox_metrics()}
@@ -0,0 +1,25 @@
+from fastapi import HTTPException, Depends
+from fastapi.responses import JSONResponse
+from bson import ObjectId
+from core.database import media_reconciliation_runs_collection
+from helper_function.apis_requests import get_current_user
+from helper_function.media_reconciliation import start_reconciliation, format_run
+
+async def start_media_reconciliation(delete: bool = False, token: str = Depends(get_current_user)):
+    """Scan Tencent VOD for unreferenced media; with delete=true orphans are queued for deletion"""
+    run_id = await start_reconciliation(delete=delete)
+    if run_id is None:
+        raise HTTPException(status_code=409, detail="A media reconciliation is already running")
+    return JSONResponse(
+        status_code=202,
+        content={"status": 202, "message": "Media reconciliation started", "data": {"run_id": str(run_id)}}
+    )
+
+async def get_media_reconciliation(run_id: str, token: str = Depends(get_current_user)):
+    """Progress and orphan report of a reconciliation run"""
+    if not ObjectId.is_valid(run_id):
+        raise HTTPException(status_code=400, detail="Invalid run ID")
+    run = await media_reconciliation_runs_collection.find_one({"_id": ObjectId(run_id)})
+    if not run:
+        raise HTTPException(status_code=404, detail="Reconciliation run not found")
+    return {"status": 200, "data": format_run(run)}
@@ -0,0 +1,216 @@
+from fastapi import HTTPException, Depends, Form, Request, Query
+from fastapi.responses import JSONResponse
+from typing import Optional
+from bson import ObjectId
+from core.config import upload_settings
+from core.database import courses_collection, upload_sessions_collection
+from helper_function.apis_requests import get_current_user
+from helper_function.upload_session_store import create_part_file, write_chunk, remove_part_file
+from helper_function.upload_jobs import enqueue_course_video_job, format_job
+from datetime import datetime, timedelta
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Serializes chunk writes per session within this worker: upload_id -> [lock, users]
+_session_locks = {}
+
+@asynccontextmanager
+async def _session_lock(upload_id: str):
+    # The entry is dropped once nobody holds or waits for it, so abandoned sessions leave nothing behind
+    entry = _session_locks.setdefault(upload_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _session_locks.pop(upload_id, None)
+
+def format_session(session):
+    return {
+        "upload_id": str(session["_id"]),
+        "course_id": session["course_id"],
+        "filename": session["filename"],
+        "total_size": session["total_size"],
+        "offset": session["offset"],
+        "status": session["status"],
+        "expires_at": session["expires_at"].strftime("%Y-%m-%d %H:%M:%S"),
+        "job_id": session.get("job_id"),
+        "video_id": session.get("video_id"),
+    }
+
+async def _get_session(course_id: str, upload_id: str):
+    if not ObjectId.is_valid(upload_id):
+        raise HTTPException(status_code=400, detail="Invalid upload ID")
+    session = await upload_sessions_collection.find_one({"_id": ObjectId(upload_id), "course_id": course_id})
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session["status"] == "uploading" and session["expires_at"] < datetime.now():
+        await remove_part_file(session["path"])
+        raise HTTPException(status_code=410, detail="Upload session has expired")
+    return session
+
+async def create_upload_session(
+    course_id: str,
+    token: str = Depends(get_current_user),
+    filename: str = Form(...),
+    total_size: int = Form(...),
+    video_title: Optional[str] = Form(None),
+    video_description: Optional[str] = Form(None),
+    order: Optional[int] = Form(None)
+):
+    """Start a resumable video upload; chunks are then PUT at increasing offsets"""
+    try:
+        if not ObjectId.is_valid(course_id):
+            raise HTTPException(status_code=400, detail="Invalid course ID")
+        if total_size <= 0:
+            raise HTTPException(status_code=400, detail="total_size must be positive")
+
+        course = await courses_collection.find_one({"_id": ObjectId(course_id)}, {"_id": 1})
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found")
+
+        upload_id = ObjectId()
+        now = datetime.now()
+        session = {
+            "_id": upload_id,
+            "course_id": course_id,
+            "filename": filename,
+            "total_size": total_size,
+            "offset": 0,
+            "status": "uploading",
+            "path": await create_part_file(str(upload_id)),
+            "video_title": video_title or filename,
+            "video_description": video_description or "",
+            "order": order or 1,
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": now + timedelta(hours=upload_settings.UPLOAD_SESSION_TTL_HOURS),
+        }
+        await upload_sessions_collection.insert_one(session)
+
+        return {
+            "status": 201,
+            "message": "Upload session created",
+            "data": {**format_session(session), "max_chunk_bytes": upload_settings.UPLOAD_SESSION_MAX_CHUNK_BYTES}
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating upload session for course {course_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to create upload session: {str(e)}")
+
+async def get_upload_session(course_id: str, upload_id: str, token: str = Depends(get_current_user)):
+    """Session status; `offset` is where the client should resume"""
+    session = await _get_session(course_id, upload_id)
+    return {"status": 200, "data": format_session(session)}
+
+async def upload_session_chunk(
+    course_id: str,
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    token: str = Depends(get_current_user)
+):
+    """Append the raw request body to the session at `offset`.
+
+    The offset must equal the last committed offset; otherwise 409 is returned
+    with the offset to resume from. A chunk is committed only once it is fully
+    on disk, so an interrupted chunk is simply resent.
+    """
+    try:
+        async with _session_lock(upload_id):
+            session = await _get_session(course_id, upload_id)
+            if session["status"] != "uploading":
+                raise HTTPException(status_code=409, detail=f"Upload session is {session['status']}")
+            if offset != session["offset"]:
+                return JSONResponse(
+                    {"msg": "Offset mismatch", "offset": session["offset"]}, status_code=409
+                )
+
+            max_bytes = min(upload_settings.UPLOAD_SESSION_MAX_CHUNK_BYTES, session["total_size"] - offset)
+            try:
+                written = await write_chunk(session["path"], offset, request.stream(), max_bytes)
+            except ValueError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            if written == 0:
+                raise HTTPException(status_code=400, detail="Empty chunk")
+
+            # Commit only if nobody else moved the offset meanwhile
+            result = await upload_sessions_collection.update_one(
+                {"_id": session["_id"], "offset": offset, "status": "uploading"},
+                {"$set": {"offset": offset + written, "updated_at": datetime.now()}}
+            )
+            if result.modified_count == 0:
+                current = await upload_sessions_collection.find_one({"_id": session["_id"]}, {"offset": 1})
+                return JSONResponse(
+                    {"msg": "Offset mismatch", "offset": current["offset"]}, status_code=409
+                )
+
+        new_offset = offset + written
+        return {
+            "status": 200,
+            "data": {
+                "upload_id": upload_id,
+                "offset": new_offset,
+                "complete": new_offset == session["total_size"]
+            }
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error writing chunk for upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to store chunk: {str(e)}")
+
+async def finalize_upload_session(course_id: str, upload_id: str, token: str = Depends(get_current_user)):
+    """Queue the assembled file for upload to Tencent VOD; returns 202 with a job id"""
+    try:
+        session = await _get_session(course_id, upload_id)
+        if session["status"] == "completed":
+            return {"status": 200, "message": "Upload already finalized", "data": format_session(session)}
+        if session["offset"] != session["total_size"]:
+            return JSONResponse(
+                {"msg": "Upload is incomplete", "offset": session["offset"], "total_size": session["total_size"]},
+                status_code=409
+            )
+
+        # Only one finalize may run per session
+        claimed = await upload_sessions_collection.find_one_and_update(
+            {"_id": session["_id"], "status": "uploading"},
+            {"$set": {"status": "finalizing", "updated_at": datetime.now()}}
+        )
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+
+        video_data = {
+            "order": session["order"],
+            "video_title": session["video_title"],
+            "video_description": session["video_description"],
+        }
+        try:
+            job = await enqueue_course_video_job(
+                course_id, session["path"], session["filename"], video_data, upload_session_id=upload_id
+            )
+        except Exception:
+            await upload_sessions_collection.update_one(
+                {"_id": session["_id"]}, {"$set": {"status": "uploading", "updated_at": datetime.now()}}
+            )
+            raise
+        await upload_sessions_collection.update_one({"_id": session["_id"]}, {"$set": {"job_id": str(job["_id"])}})
+
+        return JSONResponse(
+            status_code=202,
+            content={"status": 202, "message": "Video upload queued", "data": format_job(job)}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finalizing upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to finalize upload: {str(e)}")
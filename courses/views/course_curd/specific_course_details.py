@@ -1,19 +1,12 @@
 from fastapi import HTTPException, Depends
+from fastapi.responses import Response
 from bson import ObjectId
 from core.database import courses_collection, courses_videos_collection
 from helper_function.apis_requests import get_current_user
-from helper_function.validate_references import validate_course_references
-
-def convert_objectids(obj):
-    """Recursively convert ObjectIds to strings"""
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    elif isinstance(obj, dict):
-        return {key: convert_objectids(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_objectids(item) for item in obj]
-    else:
-        return obj
+from helper_function.validate_references import validate_course_references, resolve_valid_references
+from helper_function.course_detail_cache import (
+    get_cached_course_detail, cache_course_detail, course_detail_generation,
+)
 
 async def get_specific_course_details(
     course_id: str,
@@ -25,13 +18,20 @@ async def get_specific_course_details(
         if not ObjectId.is_valid(course_id):
             raise HTTPException(status_code=400, detail="Invalid course ID")
         
+        # Serve the rendered payload when neither the course nor its references changed
+        lookup_cache = await resolve_valid_references()
+        cached = get_cached_course_detail(course_id, lookup_cache)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        generation = course_detail_generation()
+        
         # Get course details
         course = await courses_collection.find_one({"_id": ObjectId(course_id)})
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
         
         # Validate and clean invalid references
-        course = await validate_course_references(course)
+        course = await validate_course_references(course, lookup_cache)
         
         # Fetch complete video details
         if "videos" in course and course["videos"]:
@@ -69,14 +69,13 @@ async def get_specific_course_details(
             course["images"].pop("type", None)
             course["images"].pop("uploaded_at", None)
         
-        # Convert ObjectIds to strings
-        course = convert_objectids(course)
-        
-        return {
+        # ObjectIds are stringified by the serializer
+        body = cache_course_detail(course_id, {
             "success": True,
             "message": "Course details retrieved successfully",
             "data": course
-        }
+        }, lookup_cache, generation)
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
@@ -1,19 +1,20 @@
 from fastapi import HTTPException, Request, Depends
-from core.database import layout_collection, courses_collection
-from bson import ObjectId
+from core.database import layout_collection
 from helper_function.apis_requests import get_current_user
-from helper_function.validate_references import validate_course_references
+from helper_function.layout_engine import TOP_COURSES_LAYOUT_ID, format_course_card, get_layout_cards
+from helper_function.validate_references import resolve_valid_references, request_lookup_cache
 
 async def get_top_courses(
     request: Request,
     token: str = Depends(get_current_user)
 ):
-    """Get top courses based on layout linked_courses"""
+    """Get top courses from the top courses layout's materialized course cards"""
     try:
-        # Get the specific layout document with ID 68d0d3643deb5b22c6613b61
-        layout_id = "68d0d3643deb5b22c6613b61"
-        layout_doc = await layout_collection.find_one({"_id": ObjectId(layout_id)})
-        
+        layout_id = str(TOP_COURSES_LAYOUT_ID)
+        layout_doc = await layout_collection.find_one(
+            {"_id": TOP_COURSES_LAYOUT_ID}, {"card_count": 1}
+        )
+
         if not layout_doc:
             return {
                 "success": False,
@@ -23,11 +24,10 @@ async def get_top_courses(
                     "total": 0
                 }
             }
-        
-        # Get linked_courses from layout document
-        linked_courses = layout_doc.get("linked_courses", [])
-        
-        if not linked_courses:
+
+        course_cards = await get_layout_cards(TOP_COURSES_LAYOUT_ID)
+
+        if not course_cards:
             return {
                 "success": True,
                 "message": "No linked courses found in layout",
@@ -36,62 +36,22 @@ async def get_top_courses(
                     "total": 0
                 }
             }
-        
-        # Convert string IDs to ObjectIds for query
-        course_object_ids = []
-        for course_id in linked_courses:
-            try:
-                course_object_ids.append(ObjectId(course_id))
-            except:
-                # Skip invalid ObjectId strings
-                continue
-        
-        if not course_object_ids:
-            return {
-                "success": True,
-                "message": "No valid course IDs found in linked_courses",
-                "data": {
-                    "top_courses": [],
-                    "total": 0
-                }
-            }
-        
-        # Fetch matching courses from courses collection
-        courses_docs = await courses_collection.find(
-            {"_id": {"$in": course_object_ids}}
-        ).to_list(length=1000)
-        
-        # Validate references for each course
-        for i, doc in enumerate(courses_docs):
-            courses_docs[i] = await validate_course_references(doc)
-        
-        # Format course data
-        top_courses = [
-            {
-                "id": str(doc.get("_id")),
-                "title": doc.get("title"),
-                "description": doc.get("description"),
-                "image_url": doc.get("images", {}).get("course_image_url") if doc.get("images") else None,
-                "rating": doc.get("rating"),
-                "price": doc.get("price"),
-                "visible": doc.get("visible"),
-                "instructor_id": [str(id) for id in doc.get("instructor_id", [])] if doc.get("instructor_id") else [],
-                "category_id": [str(id) for id in doc.get("category_id", [])] if doc.get("category_id") else [],
-            }
-            for doc in courses_docs
-        ]
-        
+
+        # Inactive categories and instructors are filtered against the reference cache
+        lookup_cache = await resolve_valid_references(request_lookup_cache(request))
+        top_courses = [format_course_card(card, lookup_cache) for card in course_cards]
+
         return {
             "success": True,
             "message": "Top courses retrieved successfully",
             "data": {
                 "layout_id": layout_id,
-                "linked_courses_count": len(linked_courses),
+                "linked_courses_count": layout_doc.get("card_count", len(course_cards)),
                 "matched_courses_count": len(top_courses),
                 "top_courses": top_courses,
                 "total": len(top_courses)
             }
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,15 @@
 from fastapi import HTTPException, Depends, Form, File, UploadFile
 from typing import Optional
 from bson import ObjectId
+from pymongo import ReturnDocument
 from core.database import courses_collection
-from helper_function.video_upload import upload_to_tencent_vod, delete_from_tencent_vod
-from helper_function.image_upload import upload_image_to_tencent
+from helper_function.video_upload import upload_video_file_to_tencent
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
+from helper_function.image_processing import upload_image_with_variants, image_file_ids
 from helper_function.apis_requests import get_current_user
+from helper_function.dashboard_counters import record_visibility_change
+from helper_function.course_detail_cache import invalidate_course_detail
+from helper_function.layout_engine import sync_course_layout
 from datetime import datetime
 import logging
 
@@ -76,17 +81,17 @@ async def update_course(
         if course_image_url and course_image_url.filename:
             # Get old image fileId for deletion
             if "images" in existing_course and existing_course["images"]:
-                old_image = existing_course["images"]
-                if "fileId" in old_image and old_image["fileId"]:
-                    old_files_to_delete.append(old_image["fileId"])
+                old_files_to_delete.extend(image_file_ids(existing_course["images"]))
             
             # Upload new image
             course_image_content = await course_image_url.read()
-            course_image_result = await upload_image_to_tencent(course_image_content, course_image_url.filename)
+            course_image_result = await upload_image_with_variants(course_image_content, course_image_url.filename)
             
             new_image_obj = {
                 "fileId": course_image_result["file_id"],
                 "course_image_url": course_image_result["image_url"],
+                "variants": course_image_result["variants"],
+                "placeholder": course_image_result["placeholder"],
                 "type": "course_image",
                 "uploaded_at": current_time
             }
@@ -102,8 +107,7 @@ async def update_course(
                     old_files_to_delete.append(old_intro_video["fileId"])
             
             # Upload new intro video
-            course_intro_video_content = await course_intro_video.read()
-            course_intro_video_result = await upload_to_tencent_vod(course_intro_video_content, course_intro_video.filename)
+            course_intro_video_result = await upload_video_file_to_tencent(course_intro_video)
             
             new_intro_video_obj = {
                 "fileId": course_intro_video_result["file_id"],
@@ -114,28 +118,31 @@ async def update_course(
             update_data["intro_videos"] = new_intro_video_obj
             logger.info(f"New intro video uploaded: {course_intro_video_result['file_id']}")
         
+        # Old files are recorded in the outbox before the write and queued once it lands
+        staged_deletions = await stage_media_deletions(old_files_to_delete, "update_course")
+        
         # Update course in database
-        result = await courses_collection.update_one(
-            {"_id": ObjectId(course_id)},
-            {"$set": update_data}
-        )
-        
-        # Background cleanup: Delete old files from Tencent
-        deleted_files = []
-        failed_deletions = []
-        
-        for old_file_id in old_files_to_delete:
-            try:
-                success = await delete_from_tencent_vod(old_file_id)
-                if success:
-                    deleted_files.append(old_file_id)
-                    logger.info(f"Successfully deleted old file from Tencent: {old_file_id}")
-                else:
-                    failed_deletions.append(old_file_id)
-                    logger.warning(f"Failed to delete old file from Tencent: {old_file_id}")
-            except Exception as e:
-                failed_deletions.append(old_file_id)
-                logger.error(f"Error deleting old file {old_file_id}: {str(e)}")
+        # The pre-update visibility keeps the dashboard counters exact under concurrent writes
+        try:
+            previous_course = await courses_collection.find_one_and_update(
+                {"_id": ObjectId(course_id)},
+                {"$set": update_data},
+                projection={"visible": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
+        if not previous_course:
+            # Deleted meanwhile; the delete queued the old files itself
+            await discard_staged_deletions(staged_deletions)
+            raise HTTPException(status_code=404, detail="Course not found")
+        if visible is not None:
+            await record_visibility_change(previous_course.get("visible"), visible)
+        invalidate_course_detail(course_id)
+        
+        # Old files are deleted from Tencent by the media outbox reaper
+        queued_deletions = await activate_media_deletions(staged_deletions)
         
         # Get updated course for response
         updated_course = await courses_collection.find_one({"_id": ObjectId(course_id)})
@@ -165,17 +172,16 @@ async def update_course(
             "intro_videos": clean_intro_videos,
             "updated_at": current_time,
             "cleanup_info": {
-                "old_files_deleted": deleted_files,
-                "failed_deletions": failed_deletions
+                "queued_for_deletion": queued_deletions
             }
         }
         
-        # Auto-update layout based on rating in background
+        # Apply only this course to the layouts
         try:
-            from helper_function.layoutdata_update import update_layout_by_rating
-            await update_layout_by_rating()
-        except Exception:
-            pass  # Don't fail course update if layout update fails
+            await sync_course_layout(course_id)
+        except Exception as e:
+            # Don't fail course update; the periodic layout rebuild corrects the layouts
+            logger.error(f"Layout sync failed for course {course_id}: {e}")
         
         return {
             "status": 200,
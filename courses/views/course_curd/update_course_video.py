@@ -1,22 +1,31 @@
-from fastapi import HTTPException, Depends, Form, File, UploadFile
-from typing import Optional
+from fastapi import HTTPException, Depends, Form, File, UploadFile, Body, Query
+from typing import Optional, List
 from bson import ObjectId
+from pymongo import UpdateOne
 from core.database import courses_collection, courses_videos_collection
-from helper_function.video_upload import upload_to_tencent_vod, delete_from_tencent_vod
+from helper_function.video_upload import upload_video_file_to_tencent
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
 from helper_function.apis_requests import get_current_user
+from helper_function.course_detail_cache import invalidate_course_detail
+from helper_function.course_videos import pull_course_videos, parse_order, find_course_video
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Patch fields accepted by the bulk endpoint -> video document fields
+BULK_PATCH_FIELDS = {"title": "video_title", "description": "video_description"}
+MAX_BULK_PATCHES = 500
+
 async def update_course_video_by_fileid(
     course_id: str,
     file_id: str,
     token: str = Depends(get_current_user),
     video_title: Optional[str] = Form(None),
     video_description: Optional[str] = Form(None),
-    video_order: Optional[int] = Form(None),
-    video_file: Optional[UploadFile] = File(None)
+    video_order: Optional[float] = Form(None),  # Fractional orders place a video between two others
+    video_file: Optional[UploadFile] = File(None),
+    video_id: Optional[str] = Query(None)  # Picks the lecture when several share the fileId
 ):
     """Update specific course video by fileId - can update title, description, order, or replace video file"""
     try:
@@ -39,13 +48,12 @@ async def update_course_video_by_fileid(
             video_ids = [video_ids] if video_ids else []
         
         # Find video document by fileId
-        target_video = await courses_videos_collection.find_one({
-            "_id": {"$in": video_ids},
-            "fileId": file_id
-        })
-        
-        if not target_video:
-            raise HTTPException(status_code=404, detail=f"Video with fileId {file_id} not found")
+        try:
+            target_video = await find_course_video(video_ids, file_id, video_id)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         old_file_to_delete = None
@@ -59,7 +67,7 @@ async def update_course_video_by_fileid(
         if video_description is not None:
             update_data["video_description"] = video_description
         if video_order is not None:
-            update_data["order"] = video_order
+            update_data["order"] = int(video_order) if video_order.is_integer() else video_order
         
         # Handle video file replacement
         if video_file and video_file.filename:
@@ -67,8 +75,7 @@ async def update_course_video_by_fileid(
             old_file_to_delete = target_video.get("fileId")
             
             # Upload new video to Tencent
-            video_content = await video_file.read()
-            video_result = await upload_to_tencent_vod(video_content, video_file.filename)
+            video_result = await upload_video_file_to_tencent(video_file)
             
             # Update video with new file data
             update_data["fileId"] = video_result["file_id"]
@@ -76,34 +83,34 @@ async def update_course_video_by_fileid(
             
             logger.info(f"New video uploaded: {video_result['file_id']}")
         
+        # Old video file is recorded in the outbox before the write and queued once it lands
+        staged_deletions = await stage_media_deletions([old_file_to_delete], "update_course_video")
+        
         # Update video document in database
-        await courses_videos_collection.update_one(
-            {"_id": target_video["_id"]},
-            {"$set": update_data}
-        )
+        try:
+            await courses_videos_collection.update_one(
+                {"_id": target_video["_id"]},
+                {"$set": update_data}
+            )
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
+        invalidate_course_detail(course_id)
+        
+        # Old video file is deleted from Tencent by the media outbox reaper
+        await activate_media_deletions(staged_deletions)
         
         # Get updated video for response
         updated_video = await courses_videos_collection.find_one({"_id": target_video["_id"]})
         updated_video["_id"] = str(updated_video["_id"])
         
-        # Background cleanup: Delete old video file from Tencent
-        if old_file_to_delete:
-            try:
-                success = await delete_from_tencent_vod(old_file_to_delete)
-                if success:
-                    logger.info(f"Successfully deleted old video from Tencent: {old_file_to_delete}")
-                else:
-                    logger.warning(f"Failed to delete old video from Tencent: {old_file_to_delete}")
-            except Exception as e:
-                logger.error(f"Error deleting old video {old_file_to_delete}: {str(e)}")
-        
         return {
             "success": True,
             "message": "Course video updated successfully",
             "data": {
                 "course_id": course_id,
                 "updated_video": updated_video,
-                "old_file_deleted": old_file_to_delete if old_file_to_delete else None
+                "old_file_queued_for_deletion": old_file_to_delete if old_file_to_delete else None
             }
         }
         
@@ -116,7 +123,8 @@ async def update_course_video_by_fileid(
 async def delete_course_video_by_fileid(
     course_id: str,
     file_id: str,
-    token: str = Depends(get_current_user)
+    token: str = Depends(get_current_user),
+    video_id: Optional[str] = Query(None)  # Picks the lecture when several share the fileId
 ):
     """Delete specific course video by fileId"""
     try:
@@ -139,37 +147,29 @@ async def delete_course_video_by_fileid(
             video_ids = [video_ids] if video_ids else []
         
         # Find video document by fileId
-        video_to_delete = await courses_videos_collection.find_one({
-            "_id": {"$in": video_ids},
-            "fileId": file_id
-        })
-        
-        if not video_to_delete:
-            raise HTTPException(status_code=404, detail=f"Video with fileId {file_id} not found")
-        
-        # Remove video from course videos array
-        updated_video_ids = [vid_id for vid_id in video_ids if vid_id != video_to_delete["_id"]]
-        
-        # Update course with new video IDs array
-        await courses_collection.update_one(
-            {"_id": ObjectId(course_id)},
-            {"$set": {"videos": updated_video_ids}}
-        )
+        try:
+            video_to_delete = await find_course_video(video_ids, file_id, video_id)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         
-        # Delete video document
-        await courses_videos_collection.delete_one({"_id": video_to_delete["_id"]})
+        # Video file is recorded in the outbox before the delete and queued once it lands
+        staged_deletions = await stage_media_deletions([file_id], "delete_course_video")
         
-        # Delete video from Tencent
-        deleted_from_tencent = False
         try:
-            success = await delete_from_tencent_vod(file_id)
-            if success:
-                deleted_from_tencent = True
-                logger.info(f"Successfully deleted video from Tencent: {file_id}")
-            else:
-                logger.warning(f"Failed to delete video from Tencent: {file_id}")
-        except Exception as e:
-            logger.error(f"Error deleting video {file_id}: {str(e)}")
+            # Remove video from course videos array atomically
+            updated_video_ids = await pull_course_videos(course_id, [video_to_delete["_id"]]) or []
+            
+            # Delete video document
+            await courses_videos_collection.delete_one({"_id": video_to_delete["_id"]})
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
+        invalidate_course_detail(course_id)
+        
+        # Video file is deleted from Tencent by the media outbox reaper
+        await activate_media_deletions(staged_deletions)
         
         return {
             "success": True,
@@ -181,7 +181,7 @@ async def delete_course_video_by_fileid(
                     "fileId": video_to_delete["fileId"],
                     "video_title": video_to_delete.get("video_title")
                 },
-                "deleted_from_tencent": deleted_from_tencent,
+                "queued_for_deletion": True,
                 "remaining_videos": len(updated_video_ids)
             }
         }
@@ -190,4 +190,133 @@ async def delete_course_video_by_fileid(
         raise
     except Exception as e:
         logger.error(f"Error deleting course video {file_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to delete video: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to delete video: {str(e)}")
+
+def _bulk_patch_target(patch):
+    """("video_id", ObjectId) or ("fileId", str) naming the lecture a patch applies to"""
+    if not isinstance(patch, dict):
+        raise HTTPException(status_code=400, detail="Every patch must be an object")
+    if patch.get("video_id") is not None:
+        if not ObjectId.is_valid(str(patch["video_id"])):
+            raise HTTPException(status_code=400, detail=f"Invalid video_id {patch['video_id']}")
+        return "video_id", ObjectId(str(patch["video_id"]))
+    if not isinstance(patch.get("fileId"), str) or not patch["fileId"]:
+        raise HTTPException(status_code=400, detail="Every patch needs a video_id or a fileId")
+    return "fileId", patch["fileId"]
+
+def _bulk_patch_update(patch, label, current_time):
+    """$set payload for one bulk patch, raising HTTPException if it is invalid"""
+    update_data = {}
+    if patch.get("order") is not None:
+        order_value = parse_order(patch["order"])
+        if order_value is None:
+            raise HTTPException(status_code=400, detail=f"Invalid order for {label}")
+        update_data["order"] = order_value
+    for key, field in BULK_PATCH_FIELDS.items():
+        if patch.get(key) is not None:
+            if not isinstance(patch[key], str):
+                raise HTTPException(status_code=400, detail=f"{key} must be a string for {label}")
+            update_data[field] = patch[key]
+    if not update_data:
+        raise HTTPException(status_code=400, detail=f"Nothing to update for {label}")
+    update_data["updated_at"] = current_time
+    return update_data
+
+async def bulk_update_course_videos(
+    course_id: str,
+    patches: List[dict] = Body(..., embed=True),
+    token: str = Depends(get_current_user)
+):
+    """Reorder and/or retitle many course videos at once.
+
+    `patches` is a list of {video_id or fileId, order?, title?, description?};
+    a fileId only identifies a lecture when no other lecture of the course
+    shares it. All are applied with one bulk_write and the re-sorted video
+    list is returned.
+    """
+    try:
+        # Validate course_id
+        if not ObjectId.is_valid(course_id):
+            raise HTTPException(status_code=400, detail="Invalid course ID")
+        if not patches:
+            raise HTTPException(status_code=400, detail="At least one patch is required")
+        if len(patches) > MAX_BULK_PATCHES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_PATCHES} patches per request")
+        
+        # Check course exists
+        existing_course = await courses_collection.find_one({"_id": ObjectId(course_id)}, {"videos": 1})
+        if not existing_course:
+            raise HTTPException(status_code=404, detail="Course not found")
+        
+        # Handle both old and new video formats
+        video_ids = existing_course.get("videos") or []
+        if not isinstance(video_ids, list):
+            video_ids = [video_ids]
+        
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        patch_updates = {}
+        for patch in patches:
+            target = _bulk_patch_target(patch)
+            label = f"{target[0]} {target[1]}"
+            if target in patch_updates:
+                raise HTTPException(status_code=400, detail=f"Duplicate patch for {label}")
+            patch_updates[target] = (label, _bulk_patch_update(patch, label, current_time))
+        
+        # Every patch must resolve to exactly one lecture of this course before anything is written
+        requested_ids = [value for kind, value in patch_updates if kind == "video_id"]
+        requested_files = [value for kind, value in patch_updates if kind == "fileId"]
+        found_ids = set(await courses_videos_collection.distinct(
+            "_id", {"$and": [{"_id": {"$in": video_ids}}, {"_id": {"$in": requested_ids}}]}
+        )) if requested_ids else set()
+        lectures_by_file = {}
+        if requested_files:
+            async for video in courses_videos_collection.find(
+                {"_id": {"$in": video_ids}, "fileId": {"$in": requested_files}}, {"fileId": 1}
+            ):
+                lectures_by_file.setdefault(video["fileId"], []).append(video["_id"])
+        missing = [label for (kind, value), (label, _) in patch_updates.items()
+                   if value not in (found_ids if kind == "video_id" else lectures_by_file)]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Videos not found in course: {', '.join(missing)}")
+        shared = [file_id for file_id in requested_files if len(lectures_by_file[file_id]) > 1]
+        if shared:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Several videos share fileId {', '.join(shared)}; patch them by video_id"
+            )
+        
+        updates = {}
+        for (kind, value), (label, update_data) in patch_updates.items():
+            video_id = value if kind == "video_id" else lectures_by_file[value][0]
+            if video_id in updates:
+                raise HTTPException(status_code=400, detail=f"Duplicate patch for video_id {video_id}")
+            updates[video_id] = update_data
+        
+        result = await courses_videos_collection.bulk_write([
+            UpdateOne({"_id": video_id}, {"$set": update_data})
+            for video_id, update_data in updates.items()
+        ], ordered=False)
+        invalidate_course_detail(course_id)
+        
+        # Re-sorted list in one query
+        videos = []
+        async for video in courses_videos_collection.find({"_id": {"$in": video_ids}}).sort("order", 1):
+            video["_id"] = str(video["_id"])
+            videos.append(video)
+        
+        return {
+            "success": True,
+            "message": f"Updated {len(updates)} course videos",
+            "data": {
+                "course_id": course_id,
+                "patched": len(updates),
+                "modified": result.modified_count,
+                "videos": videos
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk updating videos of course {course_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to update videos: {str(e)}")
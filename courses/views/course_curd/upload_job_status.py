@@ -0,0 +1,10 @@
+from fastapi import HTTPException, Depends
+from helper_function.apis_requests import get_current_user
+from helper_function.upload_jobs import get_upload_job, format_job
+
+async def get_upload_job_status(job_id: str, token: str = Depends(get_current_user)):
+    """Status and progress of a background media upload job"""
+    job = await get_upload_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return {"status": 200, "data": format_job(job)}
@@ -2,6 +2,12 @@ from fastapi import HTTPException, Request, Depends
 from bson import ObjectId
 from core.database import courses_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.layout_engine import sync_course_layout
+from helper_function.dashboard_counters import record_visibility_change
+from helper_function.course_detail_cache import invalidate_course_detail
+import logging
+
+logger = logging.getLogger(__name__)
 
 async def toggle_course_visibility(
     course_id: str,
@@ -24,11 +30,22 @@ async def toggle_course_visibility(
         current_visible = course.get("visible", False)
         new_visible = not current_visible
         
-        # Update course
-        await courses_collection.update_one(
-            {"_id": object_id},
+        # Update course only if nobody flipped it meanwhile, so the counter moves once per change
+        result = await courses_collection.update_one(
+            {"_id": object_id, "visible": course.get("visible")},
             {"$set": {"visible": new_visible}}
         )
+        if not result.modified_count:
+            raise HTTPException(status_code=409, detail="Course visibility was changed concurrently; reload and retry")
+        await record_visibility_change(current_visible, new_visible)
+        invalidate_course_detail(course_id)
+        
+        # Visibility rules and course cards depend on this flag
+        try:
+            await sync_course_layout(object_id)
+        except Exception as e:
+            # Don't fail the toggle; the periodic layout rebuild corrects the layouts
+            logger.error(f"Layout sync failed for course {course_id}: {e}")
         
         return {
             "success": True,
@@ -40,5 +57,7 @@ async def toggle_course_visibility(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,44 +1,75 @@
 from fastapi import HTTPException, Request, Depends
+from typing import Optional
 from core.database import courses_collection
 from helper_function.apis_requests import get_current_user
-from helper_function.validate_references import validate_course_references
+from helper_function.validate_references import validate_courses_references, request_lookup_cache
+from helper_function.pagination import fetch_keyset_page, keyset_cursor, validate_limit, DEFAULT_PAGE_LIMIT
+from helper_function.streaming import stream_documents, validate_stream_format, validate_stream_limit
+
+def format_visible_course(doc):
+    return {
+        "id": str(doc.get("_id")),
+        "title": doc.get("title"),
+        "description": doc.get("description"),
+        "image_url": doc.get("imageUrl") or doc.get("course_image_url"),
+        "rating": doc.get("rating"),
+        "price": doc.get("price"),
+        "visible": doc.get("visible"),
+        "instructor_id": str(doc.get("instructor_id")) if doc.get("instructor_id") else None,
+        "category_id": str(doc.get("category_id")) if doc.get("category_id") else None,
+    }
 
 async def get_visible_courses(
     request: Request,
-    token: str = Depends(get_current_user)
+    token: str = Depends(get_current_user),
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    stream: Optional[str] = None
 ):
-    """Get visible courses count and data"""
+    """Get visible courses count and data, optionally one cursor page at a time or streamed"""
     try:
-        # Fetch only courses where visible is true
-        docs = await courses_collection.find({"visible": True}).to_list(length=10000)
+        if stream:
+            # Stream every visible course (from `after`, up to `limit`) straight from the cursor
+            lookup_cache = request_lookup_cache(request)
+            cursor = keyset_cursor(courses_collection, {"visible": True}, after, limit=validate_stream_limit(limit))
+            return stream_documents(
+                cursor,
+                format_visible_course,
+                validate_stream_format(stream),
+                prepare_batch=lambda batch: validate_courses_references(batch, lookup_cache),
+            )
+        
+        pagination = None
+        if after or limit is not None:
+            # Keyset page: only courses where visible is true, after the cursor
+            page_limit = validate_limit(DEFAULT_PAGE_LIMIT if limit is None else limit)
+            docs, next_cursor, has_next = await fetch_keyset_page(
+                courses_collection, {"visible": True}, page_limit, after
+            )
+            pagination = {"limit": page_limit, "has_next": has_next, "next_cursor": next_cursor}
+        else:
+            # Fetch only courses where visible is true
+            docs = await courses_collection.find({"visible": True}).to_list(length=10000)
         
-        # Validate references for each course
-        for i, doc in enumerate(docs):
-            docs[i] = await validate_course_references(doc)
+        # Validate references for all courses in one batch
+        await validate_courses_references(docs, request_lookup_cache(request))
         
-        courses = [
-            {
-                "id": str(doc.get("_id")),
-                "title": doc.get("title"),
-                "description": doc.get("description"),
-                "image_url": doc.get("imageUrl") or doc.get("course_image_url"),
-                "rating": doc.get("rating"),
-                "price": doc.get("price"),
-                "visible": doc.get("visible"),
-                "instructor_id": str(doc.get("instructor_id")) if doc.get("instructor_id") else None,
-                "category_id": str(doc.get("category_id")) if doc.get("category_id") else None,
-            }
-            for doc in docs
-        ]
+        courses = [format_visible_course(doc) for doc in docs]
+        
+        data = {
+            "total_visible_courses": len(courses),
+            "courses": courses
+        }
+        if pagination:
+            data["pagination"] = pagination
         
         return {
             "success": True,
             "message": "Visible courses retrieved successfully",
-            "data": {
-                "total_visible_courses": len(courses),
-                "courses": courses
-            }
+            "data": data
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,8 @@
 from fastapi import HTTPException, Depends, Request
-from user.views.list_users import list_users
-from core.database import courses_collection
-from courses.views.course_curd.top_courses import get_top_courses
 from helper_function.apis_requests import get_current_user
+from helper_function.dashboard_stats import get_dashboard_stats
+from helper_function.layout_engine import format_course_card
+from helper_function.validate_references import resolve_valid_references, request_lookup_cache
 
 async def get_dashboard_home(
     request: Request,
@@ -10,38 +10,26 @@ async def get_dashboard_home(
 ):
     """Get dashboard home data with statistics"""
     try:
-        # Get user data (reuse existing logic)
-        user_data = await list_users(request=request, token=token)
-        
-        # Get total courses count
-        total_courses = await courses_collection.count_documents({})
-        
-        # Get visible courses count
-        visible_courses = await courses_collection.count_documents({"visible": True})
-        
-        # Get top courses data
-        top_courses_data = await get_top_courses(request=request, token=token)
-        
-        # Prepare dashboard statistics
-        dashboard_stats = {
-            "total_users": user_data.get("total", 0),
-            "total_courses": total_courses,
-            "visible_courses": visible_courses,
-            "hidden_courses": total_courses - visible_courses,
-            "top_courses_count": len(top_courses_data.get("data", {}).get("top_courses", []))
-        }
+        # Counts, recent users and top course cards come from the cached snapshot
+        stats = await get_dashboard_stats()
+        dashboard_stats = stats["statistics"]
+        recent_users = stats["recent_users"]
+
+        # References are checked at read time so deactivated ones drop out immediately
+        lookup_cache = await resolve_valid_references(request_lookup_cache(request))
+        top_courses = [format_course_card(card, lookup_cache) for card in stats["top_course_cards"]]
         
         return {
             "success": True,
             "message": "Dashboard data retrieved successfully",
             "data": {
                 "statistics": dashboard_stats,
-                "recent_users": user_data.get("users", [])[:5],  # Last 5 users
-                "top_courses": top_courses_data.get("data", {}).get("top_courses", [])[:5],  # Top 5 courses
+                "recent_users": recent_users,
+                "top_courses": top_courses,
                 "summary": {
                     "users": {
                         "total": dashboard_stats["total_users"],
-                        "recent_count": len(user_data.get("users", [])[:5])
+                        "recent_count": len(recent_users)
                     },
                     "courses": {
                         "total": dashboard_stats["total_courses"],
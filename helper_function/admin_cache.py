@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from bson import ObjectId
+from cachetools import TTLCache
+from core.database import admins_collection
+from helper_function.change_stream_watcher import watch_collection
+
+logger = logging.getLogger(__name__)
+
+ADMIN_CACHE_MAX_SIZE = 1024
+# Upper bound on how long a removed admin can keep access when change streams are unavailable
+ADMIN_CACHE_TTL_SECONDS = 300
+
+# LRU + TTL set of admin ids known to exist. Only positive results are cached
+# so a freshly created admin is never rejected.
+_known_admins = TTLCache(maxsize=ADMIN_CACHE_MAX_SIZE, ttl=ADMIN_CACHE_TTL_SECONDS)
+_watch_task = None
+
+async def admin_exists(admin_id: str) -> bool:
+    """Check an admin id against the cache, falling back to a projected lookup"""
+    if admin_id in _known_admins:
+        return True
+    admin = await admins_collection.find_one({"_id": ObjectId(admin_id)}, {"_id": 1})
+    if admin:
+        _known_admins[admin_id] = True
+    return admin is not None
+
+def invalidate_admin(admin_id=None):
+    """Forget one admin id, or every cached id when none is given"""
+    if admin_id is None:
+        _known_admins.clear()
+    else:
+        _known_admins.pop(str(admin_id), None)
+
+async def _on_admin_change(change):
+    document_key = change.get("documentKey")
+    if document_key:
+        invalidate_admin(document_key["_id"])
+    else:
+        invalidate_admin()
+
+async def _on_stream_ready():
+    # Changes made while the stream was down are unknown
+    invalidate_admin()
+
+async def start_admin_cache():
+    global _watch_task
+    _watch_task = asyncio.create_task(
+        watch_collection(admins_collection, _on_admin_change, on_ready=_on_stream_ready)
+    )
+
+async def stop_admin_cache():
+    if _watch_task:
+        _watch_task.cancel()
+        await asyncio.gather(_watch_task, return_exceptions=True)
@@ -7,6 +7,7 @@ import aiohttp
 from pathlib import Path
 from bson import ObjectId
 from typing import List, Dict, Any, Tuple, Optional
+from helper_function.course_detail_cache import invalidate_course_detail
 
 async def download_video_from_url(video_url: str, save_path: Path) -> None:
     """
@@ -118,7 +119,8 @@ async def fetch_course_videos_with_questions(
 async def save_video_results(
     video_id: str,
     video_data: Dict[str, Any],
-    courses_videos_collection
+    courses_videos_collection,
+    course_id: Optional[str] = None
 ) -> bool:
     """
     Save question and summary results directly to video document.
@@ -127,6 +129,8 @@ async def save_video_results(
         video_id: String ObjectId of the video
         video_data: Dictionary containing questions and summaries
         courses_videos_collection: MongoDB courses_videos collection
+        course_id: String ID of the video's course, whose cached details are
+            invalidated (all cached courses when not given)
         
     Returns:
         True if successful, False otherwise
@@ -151,6 +155,7 @@ async def save_video_results(
             {"_id": ObjectId(video_id)},
             update_doc
         )
+        invalidate_course_detail(course_id)
         
         return result.modified_count > 0
         
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Server error codes meaning change streams can never work on this deployment
+# (standalone mongod / $changeStream not supported)
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324}
+
+async def watch_collection(collection, on_change, pipeline=None, on_ready=None, on_lost=None, retry_delay: float = 5.0):
+    """Invoke `on_change(change)` for every change on `collection`.
+
+    Returns False straight away when the deployment has no change streams
+    (no replica set), so callers can fall back to TTL based expiry. Transient
+    errors reopen the stream after `retry_delay` seconds. `on_ready` is called
+    every time the stream is (re)opened, letting callers resync state they may
+    have missed while disconnected; `on_lost` is called when it drops.
+    """
+    while True:
+        try:
+            async with collection.watch(pipeline or []) as stream:
+                if on_ready:
+                    await on_ready()
+                async for change in stream:
+                    try:
+                        await on_change(change)
+                    except Exception as e:
+                        logger.error(f"Change handler for {collection.name} failed: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                logger.info(f"Change streams unavailable for {collection.name}: {e}")
+                if on_lost:
+                    on_lost()
+                return False
+            logger.warning(f"Change stream on {collection.name} failed, retrying: {e}")
+        except PyMongoError as e:
+            logger.warning(f"Change stream on {collection.name} interrupted, retrying: {e}")
+        if on_lost:
+            on_lost()
+        await asyncio.sleep(retry_delay)
@@ -0,0 +1,55 @@
+# Rendered course-detail and video-list payloads, pre-serialized to JSON
+# bytes so a hot course page is served without touching Mongo. Course and
+# video writes invalidate their course.
+from helper_function.generation_cache import GenerationCache
+from helper_function.streaming import dumps
+from helper_function.validate_references import REFERENCE_FIELDS
+
+COURSE_DETAIL_CACHE_MAX_SIZE = 1024
+COURSE_DETAIL_CACHE_TTL_SECONDS = 300
+
+# ("detail", course_id) -> (reference snapshot, JSON bytes)
+# ("videos", course_id) -> JSON bytes of the course's video list; holds no references
+_payloads = GenerationCache(maxsize=2 * COURSE_DETAIL_CACHE_MAX_SIZE, ttl=COURSE_DETAIL_CACHE_TTL_SECONDS)
+
+def _reference_snapshot(lookup_cache):
+    # The reference cache builds a new frozenset on every reload, so identity
+    # tells whether the active categories/languages/instructors changed
+    return tuple(lookup_cache[field]["valid"] for field in REFERENCE_FIELDS)
+
+def _same_snapshot(cached, current):
+    return all(a is b for a, b in zip(cached, current))
+
+def course_detail_generation():
+    """Token to take before rendering and pass back to cache_course_detail/cache_course_videos"""
+    return _payloads.generation()
+
+def get_cached_course_detail(course_id, lookup_cache):
+    """Cached payload bytes, if rendered against the current active references"""
+    entry = _payloads.get(("detail", str(course_id)))
+    if entry is None or not _same_snapshot(entry[0], _reference_snapshot(lookup_cache)):
+        return None
+    return entry[1]
+
+def cache_course_detail(course_id, payload, lookup_cache, generation):
+    """Serialize `payload`, storing it unless the course was written meanwhile"""
+    body = dumps(payload)
+    _payloads.store(("detail", str(course_id)), (_reference_snapshot(lookup_cache), body), generation)
+    return body
+
+def get_cached_course_videos(course_id):
+    """Cached video-list payload bytes, if any"""
+    return _payloads.get(("videos", str(course_id)))
+
+def cache_course_videos(course_id, payload, generation):
+    """Serialize `payload`, storing it unless the course was written meanwhile"""
+    body = dumps(payload)
+    _payloads.store(("videos", str(course_id)), body, generation)
+    return body
+
+def invalidate_course_detail(course_id=None):
+    """Forget one course's payloads, or every payload when none is given"""
+    if course_id is None:
+        _payloads.invalidate()
+    else:
+        _payloads.invalidate(("detail", str(course_id)), ("videos", str(course_id)))
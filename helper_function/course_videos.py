@@ -0,0 +1,124 @@
+# Course video list maintenance. The course's `videos` array is only changed
+# with atomic $push/$pull, and lecture `order` values may be fractional so a
+# lecture can be placed between two others without renumbering the course;
+# only when repeated inserts exhaust the gap is the course renumbered.
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
+from core.database import courses_collection, courses_videos_collection
+
+def parse_order(value):
+    """Order from form input as int or float, or None if it is not a number"""
+    try:
+        order = float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    if order != order or order in (float("inf"), float("-inf")):
+        return None
+    return int(order) if order.is_integer() else order
+
+def orders_between(before, after, count):
+    """`count` evenly spaced orders after `before` and strictly before `after`.
+
+    With no following lecture (`after` is None) the orders step by 1.
+    Returns None when the gap is too small to hold `count` distinct floats.
+    """
+    if after is None:
+        return [parse_order(before + i) for i in range(1, count + 1)]
+    step = (after - before) / (count + 1)
+    orders = [parse_order(before + step * i) for i in range(1, count + 1)]
+    if not all(low < high for low, high in zip([before, *orders], [*orders, after])):
+        return None
+    return orders
+
+async def _normalize_legacy_videos(course_id):
+    # Old courses store a single id (or null) instead of an array
+    await courses_collection.update_one(
+        {"_id": course_id, "videos": {"$not": {"$type": "array"}}},
+        [{"$set": {"videos": {"$cond": [{"$eq": [{"$ifNull": ["$videos", None]}, None]}, [], ["$videos"]]}}}]
+    )
+
+async def _update_videos(course_id, update, updated_at):
+    if updated_at:
+        update["$set"] = {"updated_at": updated_at}
+    for attempt in range(2):
+        try:
+            course = await courses_collection.find_one_and_update(
+                {"_id": course_id}, update, projection={"videos": 1}, return_document=ReturnDocument.AFTER
+            )
+            break
+        except OperationFailure:
+            if attempt:
+                raise
+            await _normalize_legacy_videos(course_id)
+    return None if course is None else course.get("videos", [])
+
+async def push_course_videos(course_id, video_ids, position=None, updated_at=None):
+    """Atomically add video ids to a course, at `position` or the end.
+
+    Returns the course's video ids after the write, or None if the course
+    does not exist.
+    """
+    push = {"$each": list(video_ids)}
+    if position is not None:
+        push["$position"] = position
+    return await _update_videos(ObjectId(course_id), {"$push": {"videos": push}}, updated_at)
+
+async def add_course_video_once(course_id, video_id, updated_at=None):
+    """Append one video id unless the course already holds it (safe to repeat)"""
+    return await _update_videos(ObjectId(course_id), {"$addToSet": {"videos": video_id}}, updated_at)
+
+async def pull_course_videos(course_id, video_ids, updated_at=None):
+    """Atomically remove video ids from a course; returns the remaining ids"""
+    return await _update_videos(ObjectId(course_id), {"$pull": {"videos": {"$in": list(video_ids)}}}, updated_at)
+
+async def find_course_video(video_ids, file_id, video_id=None, projection=None):
+    """The course lecture with `file_id` among the course's `video_ids`.
+
+    Deduplicated uploads let several lectures share a fileId; `video_id`
+    picks one of them. Raises LookupError if no lecture matches and
+    ValueError if the fileId is shared and no video_id was given.
+    """
+    query = {"_id": {"$in": video_ids}, "fileId": file_id}
+    if video_id is not None:
+        if not ObjectId.is_valid(str(video_id)):
+            raise LookupError(f"Invalid video id {video_id}")
+        query["$and"] = [{"_id": ObjectId(str(video_id))}]
+    matches = await courses_videos_collection.find(query, projection).limit(2).to_list(2)
+    if not matches:
+        raise LookupError(f"Video with fileId {file_id} not found")
+    if len(matches) > 1:
+        raise ValueError(f"Several videos share fileId {file_id}; pass video_id to choose one")
+    return matches[0]
+
+async def renumber_course_videos(video_ids):
+    """Reset the lectures' orders to 1..n, keeping their current sequence"""
+    lectures = await courses_videos_collection.find(
+        {"_id": {"$in": video_ids}}, {"_id": 1}
+    ).sort([("order", 1), ("_id", 1)]).to_list(None)
+    if lectures:
+        await courses_videos_collection.bulk_write([
+            UpdateOne({"_id": lecture["_id"]}, {"$set": {"order": number}})
+            for number, lecture in enumerate(lectures, start=1)
+        ], ordered=False)
+
+async def insertion_point(video_ids, after_file_id, count):
+    """Array position and orders for `count` videos inserted after a lecture.
+
+    `video_ids` are the course's current video ids; call this right before
+    pushing the new ids so the position still holds. Raises LookupError if
+    no lecture of the course has `after_file_id` and ValueError if several
+    share it. The course is renumbered when the gap after the lecture can
+    no longer be split.
+    """
+    for attempt in range(2):
+        anchor = await find_course_video(video_ids, after_file_id, projection={"order": 1})
+        anchor_order = anchor.get("order") or 0
+        following = await courses_videos_collection.find_one(
+            {"_id": {"$in": video_ids}, "order": {"$gt": anchor_order}}, {"order": 1}, sort=[("order", 1)]
+        )
+        orders = orders_between(anchor_order, following["order"] if following else None, count)
+        if orders is not None:
+            return video_ids.index(anchor["_id"]) + 1, orders
+        await renumber_course_videos(video_ids)
+    raise RuntimeError(f"Could not place {count} videos after fileId {after_file_id}")
@@ -0,0 +1,119 @@
+# Precomputed dashboard counters, kept in a single dashboard_collection
+# document. Course write paths adjust them with $inc; a periodic reconciler
+# recounts from the source collections to correct any drift. Users are not
+# written by this service, so total_users is kept current only by
+# reconcile_counters.
+import asyncio
+import logging
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from core.database import dashboard_collection, users_collection, courses_collection
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_ID = "counters"
+COUNTER_FIELDS = ("total_users", "total_courses", "visible_courses")
+# total_users is only as fresh as this
+COUNTERS_RECONCILE_INTERVAL_SECONDS = 15 * 60
+# Reconciliation passes that lost a race with a concurrent $inc are retried this often
+COUNTERS_RECONCILE_ATTEMPTS = 3
+
+_reconcile_task = None
+
+async def adjust_counters(**deltas):
+    """Atomically add deltas to the counters, e.g. adjust_counters(total_courses=1)"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    try:
+        await dashboard_collection.update_one(
+            {"_id": COUNTERS_ID},
+            {"$inc": deltas, "$set": {"updated_at": datetime.now()}},
+            upsert=True
+        )
+    except Exception as e:
+        # The reconciler corrects a missed adjustment
+        logger.error(f"Dashboard counter update {deltas} failed: {e}")
+
+async def record_course_created(visible):
+    await adjust_counters(total_courses=1, visible_courses=1 if visible is True else 0)
+
+async def record_course_deleted(visible):
+    await adjust_counters(total_courses=-1, visible_courses=-1 if visible is True else 0)
+
+async def record_visibility_change(previous_visible, new_visible):
+    if (previous_visible is True) != (new_visible is True):
+        await adjust_counters(visible_courses=1 if new_visible is True else -1)
+
+async def count_from_source():
+    """Recount every counter from its source collection"""
+    result = await courses_collection.aggregate([
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "visible": [{"$match": {"visible": True}}, {"$count": "count"}],
+        }}
+    ]).to_list(1)
+    facets = result[0] if result else {}
+
+    def facet_count(name):
+        rows = facets.get(name) or []
+        return rows[0]["count"] if rows else 0
+
+    return {
+        "total_users": await users_collection.count_documents({}),
+        "total_courses": facet_count("total"),
+        "visible_courses": facet_count("visible"),
+    }
+
+async def reconcile_counters():
+    """Overwrite the counters with exact counts; returns the fields that had drifted.
+
+    The overwrite only lands if no $inc touched the document since it was
+    read, so a concurrent adjustment is never lost; a conflicting pass is
+    retried and, failing that, left to the next reconciliation.
+    """
+    for _ in range(COUNTERS_RECONCILE_ATTEMPTS):
+        # Read before counting: an adjustment made after this read moves updated_at
+        previous = await dashboard_collection.find_one({"_id": COUNTERS_ID}) or {}
+        counts = await count_from_source()
+        drift = {field: counts[field] - previous.get(field, 0) for field in COUNTER_FIELDS if counts[field] != previous.get(field)}
+        now = datetime.now()
+        try:
+            result = await dashboard_collection.update_one(
+                {"_id": COUNTERS_ID, "updated_at": previous.get("updated_at"), **{field: previous.get(field) for field in COUNTER_FIELDS}},
+                {"$set": {**counts, "updated_at": now, "reconciled_at": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            continue  # The document changed (or was created) meanwhile
+        if result.matched_count or result.upserted_id is not None:
+            if drift and previous:
+                logger.warning(f"Dashboard counters drifted, corrected by {drift}")
+            return drift
+    logger.warning("Dashboard counters kept changing during reconciliation; retrying next pass")
+    return {}
+
+async def get_counters():
+    """Read the counters document, building it first if it does not exist yet"""
+    counters = await dashboard_collection.find_one({"_id": COUNTERS_ID}, {field: 1 for field in COUNTER_FIELDS})
+    if counters is None or any(field not in counters for field in COUNTER_FIELDS):
+        await reconcile_counters()
+        counters = await dashboard_collection.find_one({"_id": COUNTERS_ID}, {field: 1 for field in COUNTER_FIELDS}) or {}
+    return {field: counters.get(field, 0) for field in COUNTER_FIELDS}
+
+async def _reconcile_periodically():
+    while True:
+        try:
+            await reconcile_counters()
+        except Exception as e:
+            logger.error(f"Dashboard counter reconciliation failed: {e}")
+        await asyncio.sleep(COUNTERS_RECONCILE_INTERVAL_SECONDS)
+
+async def start_dashboard_counters():
+    global _reconcile_task
+    _reconcile_task = asyncio.create_task(_reconcile_periodically())
+
+async def stop_dashboard_counters():
+    if _reconcile_task:
+        _reconcile_task.cancel()
+        await asyncio.gather(_reconcile_task, return_exceptions=True)
@@ -0,0 +1,103 @@
+import asyncio
+import time
+import logging
+from core.database import users_collection, layout_collection
+from helper_function.dashboard_counters import get_counters
+from helper_function.layout_engine import TOP_COURSES_LAYOUT_ID, get_layout_cards
+
+logger = logging.getLogger(__name__)
+
+# Snapshots younger than this are served as-is
+DASHBOARD_STATS_TTL_SECONDS = 30
+# Older snapshots up to this age are served while a refresh runs in the background
+DASHBOARD_STATS_MAX_STALE_SECONDS = 300
+RECENT_USERS_LIMIT = 5
+TOP_COURSES_LIMIT = 5
+
+RECENT_USER_PROJECTION = {"name": 1, "email": 1, "created_at": 1}
+
+_snapshot = None
+_refresh_task = None
+_lock = asyncio.Lock()
+
+async def _recent_users():
+    cursor = users_collection.find({}, RECENT_USER_PROJECTION).sort("created_at", -1).limit(RECENT_USERS_LIMIT)
+    return [
+        {
+            "name": doc.get("name"),
+            "id": str(doc["_id"]),
+            "email": doc.get("email"),
+            "created_at": doc.get("created_at"),
+        }
+        async for doc in cursor
+    ]
+
+async def _top_courses():
+    """First course cards of the top courses layout, and how many it holds"""
+    layout, cards = await asyncio.gather(
+        layout_collection.find_one({"_id": TOP_COURSES_LAYOUT_ID}, {"card_count": 1}),
+        get_layout_cards(TOP_COURSES_LAYOUT_ID, limit=TOP_COURSES_LIMIT),
+    )
+    if not layout:
+        return [], 0
+    return cards, layout.get("card_count", len(cards))
+
+async def _compute():
+    global _snapshot
+    # Counts are O(1) reads of the precomputed counters document
+    counters, recent_users, (top_cards, top_total) = await asyncio.gather(
+        get_counters(),
+        _recent_users(),
+        _top_courses(),
+    )
+    _snapshot = {
+        "statistics": {
+            "total_users": counters["total_users"],
+            "total_courses": counters["total_courses"],
+            "visible_courses": counters["visible_courses"],
+            "hidden_courses": counters["total_courses"] - counters["visible_courses"],
+            "top_courses_count": top_total,
+        },
+        "recent_users": recent_users,
+        "top_course_cards": top_cards,
+        "computed_at": time.monotonic(),
+    }
+    return _snapshot
+
+async def _refresh():
+    async with _lock:
+        # Another caller may have refreshed while we waited
+        if _snapshot is not None and _age(_snapshot) <= DASHBOARD_STATS_TTL_SECONDS:
+            return _snapshot
+        return await _compute()
+
+async def _refresh_in_background():
+    global _refresh_task
+    try:
+        await _refresh()
+    except Exception as e:
+        logger.error(f"Dashboard stats refresh failed: {e}")
+    finally:
+        _refresh_task = None
+
+def _age(snapshot):
+    return time.monotonic() - snapshot["computed_at"]
+
+async def get_dashboard_stats():
+    """Return the cached dashboard snapshot, revalidating it when it ages.
+
+    Fresh snapshots are returned directly; stale ones are returned while a
+    single background task recomputes them. Only a missing or expired
+    snapshot makes the caller wait for the queries.
+    """
+    global _refresh_task
+    snapshot = _snapshot
+    if snapshot is not None:
+        age = _age(snapshot)
+        if age <= DASHBOARD_STATS_TTL_SECONDS:
+            return snapshot
+        if age <= DASHBOARD_STATS_MAX_STALE_SECONDS:
+            if _refresh_task is None:
+                _refresh_task = asyncio.create_task(_refresh_in_background())
+            return snapshot
+    return await _refresh()
@@ -2,7 +2,8 @@ from fastapi import HTTPException, Request, Depends
 from bson import ObjectId
 from core.database import courses_collection
 from helper_function.apis_requests import get_current_user
-from helper_function.video_upload import delete_from_tencent_vod
+from helper_function.media_outbox import stage_media_deletions, activate_media_deletions, discard_staged_deletions
+from helper_function.course_detail_cache import invalidate_course_detail
 
 async def delete_video_by_file_id(
     request: Request,
@@ -18,29 +19,52 @@ async def delete_video_by_file_id(
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
 
-        # Delete video from course lessons by fileId
-        delete_result = await courses_collection.update_one(
-            {
-                "_id": ObjectId(course_id),
-                "lessons.lesson_id": lesson_id
-            },
-            {
-                "$pull": {
-                    "lessons.$.videos": {"fileId": fileId}
-                }
-            }
+        lesson = next(
+            (lesson for lesson in course.get("lessons") or [] if isinstance(lesson, dict) and lesson.get("lesson_id") == lesson_id),
+            None
         )
-
-        if delete_result.matched_count == 0:
+        if lesson is None:
             raise HTTPException(status_code=404, detail="Lesson not found")
+        lesson_videos = lesson.get("videos") or []
+        # Every entry with this fileId is pulled, and each held its own reference to the file
+        removed = [video for video in lesson_videos if isinstance(video, dict) and video.get("fileId") == fileId]
+        if not removed:
+            raise HTTPException(status_code=404, detail="Video not found in lesson")
+
+        # The file is recorded in the outbox before the write and queued once it lands
+        staged_deletions = await stage_media_deletions([fileId] * len(removed), "delete_video_by_file_id")
+
+        # Delete video from course lessons by fileId, only if the lesson is as read above
+        try:
+            delete_result = await courses_collection.update_one(
+                {
+                    "_id": ObjectId(course_id),
+                    "lessons": {"$elemMatch": {"lesson_id": lesson_id, "videos": lesson_videos}}
+                },
+                {
+                    "$pull": {
+                        "lessons.$.videos": {"fileId": fileId}
+                    }
+                }
+            )
+        except Exception:
+            await discard_staged_deletions(staged_deletions)
+            raise
+
+        if delete_result.modified_count == 0:
+            await discard_staged_deletions(staged_deletions)
+            raise HTTPException(status_code=409, detail="Lesson was changed concurrently; reload and retry")
+        invalidate_course_detail(course_id)
 
-        # Also delete from Tencent VOD
-        await delete_from_tencent_vod(fileId)
+        # Also delete from Tencent VOD, via the media outbox
+        await activate_media_deletions(staged_deletions)
 
         return {
             "success": True,
             "message": "Video deleted successfully"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,33 @@
+# In-process TTL cache for rendered responses. Writes invalidate by key and
+# bump a generation counter; a render takes the generation before reading
+# Mongo and is only stored if no invalidation happened meanwhile. Other
+# worker processes do not see the invalidation, so the TTL bounds how stale
+# their entries can get.
+from cachetools import TTLCache
+
+class GenerationCache:
+    """TTLCache whose stores are guarded by an invalidation generation"""
+
+    def __init__(self, maxsize, ttl):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+
+    def generation(self):
+        """Token to take before rendering and pass back to store()"""
+        return self._generation
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def store(self, key, value, generation):
+        """Store `value` unless the cache was invalidated since `generation`"""
+        if generation == self._generation:
+            self._entries[key] = value
+
+    def invalidate(self, *keys):
+        """Forget the given keys, or every entry when none are given"""
+        self._generation += 1
+        if not keys:
+            self._entries.clear()
+        for key in keys:
+            self._entries.pop(key, None)
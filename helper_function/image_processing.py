@@ -0,0 +1,152 @@
+# Image variants for storefront clients: the original is kept and resized
+# WebP/JPEG renditions plus an inline blur placeholder are generated in a
+# process pool, so Pillow's CPU work never runs on the event loop or the
+# upload threads.
+import io
+import base64
+import asyncio
+import logging
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageFilter, ImageOps
+from core.config import upload_settings
+from helper_function.image_upload import upload_image_to_tencent
+from helper_function.media_outbox import enqueue_media_deletions
+
+logger = logging.getLogger(__name__)
+
+# WebP rendition widths; the JPEG fallback uses JPEG_VARIANT_WIDTH
+WEBP_VARIANT_WIDTHS = (320, 640, 1280)
+JPEG_VARIANT_WIDTH = 640
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_BLUR_RADIUS = 2
+
+# Processes start on first use. They are started from a forkserver, not
+# forked from the server, so they never inherit the event loop, the Mongo
+# client's sockets or locks held by other threads.
+image_process_pool = ProcessPoolExecutor(
+    max_workers=upload_settings.IMAGE_PROCESS_WORKERS,
+    mp_context=multiprocessing.get_context("forkserver")
+)
+
+async def stop_image_processing():
+    # Queued renders are cancelled; running ones finish before the workers exit
+    await asyncio.get_running_loop().run_in_executor(
+        None, partial(image_process_pool.shutdown, wait=True, cancel_futures=True)
+    )
+
+def _resized(image, width):
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+def _flattened(image):
+    """RGB copy for formats without alpha, composited over white"""
+    if image.mode == "RGB":
+        return image
+    rgba = image.convert("RGBA")
+    background = Image.new("RGB", rgba.size, (255, 255, 255))
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background
+
+def _encode(image, image_format, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+def render_variants(image_bytes: bytes):
+    """Runs in a worker process; returns (variants, placeholder data URI).
+
+    Widths larger than the source are not upscaled, so small images
+    produce fewer distinct variants.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+        variants = []
+        seen_widths = set()
+        for width in WEBP_VARIANT_WIDTHS:
+            resized = _resized(image, width)
+            if resized.width in seen_widths:
+                continue
+            seen_widths.add(resized.width)
+            variants.append({
+                "format": "webp",
+                "width": resized.width,
+                "height": resized.height,
+                "data": _encode(resized, "WEBP", WEBP_QUALITY),
+            })
+
+        jpeg = _flattened(_resized(image, JPEG_VARIANT_WIDTH))
+        variants.append({
+            "format": "jpg",
+            "width": jpeg.width,
+            "height": jpeg.height,
+            "data": _encode(jpeg, "JPEG", JPEG_QUALITY),
+        })
+
+        tiny = _flattened(_resized(image, PLACEHOLDER_WIDTH)).filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR_RADIUS))
+        placeholder = "data:image/jpeg;base64," + base64.b64encode(_encode(tiny, "JPEG", 40)).decode("ascii")
+    return variants, placeholder
+
+def image_file_ids(image_obj):
+    """Every Tencent fileId of a stored image subdocument: original and variants"""
+    if not image_obj:
+        return []
+    file_ids = [image_obj.get("fileId")]
+    file_ids.extend(variant.get("fileId") for variant in image_obj.get("variants") or [])
+    return [file_id for file_id in file_ids if file_id]
+
+async def _upload_variants(variants, filename):
+    stem = (filename or "image").rsplit(".", 1)[0]
+    results = await asyncio.gather(
+        *(
+            upload_image_to_tencent(variant["data"], f"{stem}_{variant['width']}w.{variant['format']}")
+            for variant in variants
+        ),
+        return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        # Partial variant sets are not stored; give back the ones that made it
+        uploaded = [r["file_id"] for r in results if not isinstance(r, Exception)]
+        await enqueue_media_deletions(uploaded, "image_variants_rollback")
+        raise failures[0]
+    return [
+        {
+            "fileId": result["file_id"],
+            "url": result["image_url"],
+            "format": variant["format"],
+            "width": variant["width"],
+            "height": variant["height"],
+        }
+        for variant, result in zip(variants, results)
+    ]
+
+async def upload_image_with_variants(image_content: bytes, filename: str):
+    """Upload the original image and its variants.
+
+    Returns upload_image_to_tencent's result plus "variants" and
+    "placeholder". Variant processing or upload failures are logged and the
+    original is returned without variants.
+    """
+    result = await upload_image_to_tencent(image_content, filename)
+    result["variants"], result["placeholder"] = [], None
+    try:
+        loop = asyncio.get_running_loop()
+        variants, placeholder = await loop.run_in_executor(image_process_pool, render_variants, image_content)
+        result["variants"] = await _upload_variants(variants, filename)
+        result["placeholder"] = placeholder
+    except Exception as e:
+        logger.warning(f"Image variants for {filename} were not generated: {e}")
+    return result
+
+async def upload_image_file_with_variants(image_file):
+    """UploadFile counterpart of upload_image_with_variants"""
+    return await upload_image_with_variants(await image_file.read(), image_file.filename)
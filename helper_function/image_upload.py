@@ -1,170 +1,164 @@
 # Tencent Cloud VOD Image Upload (same as video upload approach)
 import os
 import asyncio
-import time
 import logging
+from functools import partial
 from core.config import settings
-from tencentcloud.vod.v20180717 import vod_client, models
-from tencentcloud.common import credential
-from tencentcloud.common.profile.client_profile import ClientProfile
-from tencentcloud.common.profile.http_profile import HttpProfile
-from qcloud_cos import CosConfig, CosS3Client
+from helper_function.tencent_client import get_vod_client, get_cos_client
+from helper_function.upload_engine import run_in_upload_executor
+from helper_function.media_blobs import content_hash, acquire_blob, register_blob
+from helper_function.media_outbox import enqueue_media_deletions
+from tencentcloud.vod.v20180717 import models
 from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
 
 logger = logging.getLogger(__name__)
 
-# Initialize VOD client (same as video upload)
-try:
-    cred = credential.Credential(settings.TENCENT_SECRET_ID, settings.TENCENT_SECRET_KEY)
-    client_profile = ClientProfile(httpProfile=HttpProfile(endpoint="vod.tencentcloudapi.com"))
-    vod_client_instance = vod_client.VodClient(cred, settings.TENCENT_REGION, client_profile)
-except Exception as e:
-    logger.error(f"Tencent VOD client initialization failed: {e}")
-    vod_client_instance = None
+# CommitUpload is retried with backoff until the uploaded object is ready,
+# instead of sleeping a fixed time before every commit
+COMMIT_MAX_ATTEMPTS = 6
+COMMIT_RETRY_BASE_DELAY_SECONDS = 0.25
+COMMIT_RETRYABLE_ERROR_PREFIXES = (
+    "FailedOperation", "ResourceNotFound", "InternalError", "RequestLimitExceeded", "ClientNetworkError",
+)
+PRESIGNED_URL_EXPIRY_SECONDS = 315360000  # 10 years
 
-def uploadImageAsMedia(image_bytes: bytes, filename: str):
-    """Upload image as a media file using VOD service"""
-    if not vod_client_instance:
-        raise Exception("Tencent VOD client not initialized")
-
-    # Determine image type and set MediaType
+def _image_type(filename: str):
     ext = os.path.splitext(filename)[1].lower() if filename else ".jpg"
     if ext in (".jpg", ".jpeg"):
-        media_type = "jpg"
-    elif ext == ".png":
-        media_type = "png"
-    else:
-        raise Exception(f"Unsupported format: {ext}")
+        return "jpg"
+    if ext == ".png":
+        return "png"
+    if ext == ".webp":
+        return "webp"
+    raise Exception(f"Unsupported format: {ext}")
+
+def _vod_client():
+    vod_client_instance = get_vod_client()
+    if not vod_client_instance:
+        raise Exception("Tencent VOD client not initialized")
+    return vod_client_instance
 
-    # ApplyUpload - Upload image as media file
+def _apply_upload(image_type: str, filename: str = None, as_cover: bool = False):
     apply_req = models.ApplyUploadRequest()
-    apply_req.MediaType = media_type  # Use image format as MediaType
-    apply_req.MediaName = filename or f"image.{media_type}"
+    if as_cover:
+        apply_req.CoverType = image_type
+    else:
+        apply_req.MediaType = image_type  # Use image format as MediaType
+        apply_req.MediaName = filename or f"image.{image_type}"
     apply_req.SubAppId = int(settings.TENCENT_SUB_APP_ID)
+    return _vod_client().ApplyUpload(apply_req)
 
-    apply_resp = vod_client_instance.ApplyUpload(apply_req)
+def _commit_upload(vod_session_key: str):
+    commit_req = models.CommitUploadRequest()
+    commit_req.VodSessionKey = vod_session_key
+    commit_req.SubAppId = int(settings.TENCENT_SUB_APP_ID)
+    return _vod_client().CommitUpload(commit_req)
+
+async def _commit_when_ready(vod_session_key: str):
+    """CommitUpload, polling with exponential backoff while VOD is not ready"""
+    delay = COMMIT_RETRY_BASE_DELAY_SECONDS
+    for attempt in range(1, COMMIT_MAX_ATTEMPTS + 1):
+        try:
+            return await run_in_upload_executor(_commit_upload, vod_session_key)
+        except TencentCloudSDKException as e:
+            code = e.get_code() or ""
+            if not code.startswith(COMMIT_RETRYABLE_ERROR_PREFIXES) or attempt == COMMIT_MAX_ATTEMPTS:
+                raise
+            logger.info(f"CommitUpload not ready ({code}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+        delay *= 2
+
+async def _put_image(apply_resp, key: str, image_bytes: bytes, image_type: str):
+    """Upload to COS on the pooled session; returns the COS client"""
+    cos = get_cos_client(apply_resp.StorageRegion, apply_resp.TempCertificate)
+    await run_in_upload_executor(partial(
+        cos.put_object,
+        Bucket=apply_resp.StorageBucket,
+        Body=image_bytes,
+        Key=key,
+        StorageClass="STANDARD",
+        ContentType=f"image/{image_type}",
+    ))
+    return cos
 
+def _presigned_url(cos, bucket: str, key: str):
+    # Signing is local; no request is made
+    return cos.get_presigned_download_url(Bucket=bucket, Key=key, Expired=PRESIGNED_URL_EXPIRY_SECONDS)
+
+async def uploadImageAsMedia(image_bytes: bytes, filename: str):
+    """Upload image as a media file using VOD service"""
+    _vod_client()
+    image_type = _image_type(filename)
+
+    # ApplyUpload - Upload image as media file
+    apply_resp = await run_in_upload_executor(_apply_upload, image_type, filename)
     bucket = apply_resp.StorageBucket
     region = apply_resp.StorageRegion
 
     # Use MediaStoragePath for media files
-    media_path = apply_resp.MediaStoragePath
-    if media_path.startswith("/"):
-        media_path = media_path[1:]  # Remove leading slash
-
+    media_path = apply_resp.MediaStoragePath.lstrip("/")
     cos_url = f"https://{bucket}.cos.{region}.myqcloud.com/{media_path}"
     logger.info(f"ApplyUpload -> bucket={bucket}, media_path={media_path}")
 
-    # Upload to COS as media file
-    cos = CosS3Client(CosConfig(
-        Region=region,
-        SecretId=apply_resp.TempCertificate.SecretId,
-        SecretKey=apply_resp.TempCertificate.SecretKey,
-        Token=apply_resp.TempCertificate.Token,
-    ))
-
     # Upload without ACL (use default permissions)
-    cos.put_object(
-        Bucket=bucket,
-        Body=image_bytes,
-        Key=media_path,
-        StorageClass="STANDARD",
-        ContentType=f"image/{media_type}",
-    )
+    cos = await _put_image(apply_resp, media_path, image_bytes, image_type)
     logger.info(f"Uploaded to COS at ({cos_url})")
 
     # Create a presigned URL for reliable access
-    presigned_url = cos_url
     try:
-        presigned_url = cos.get_presigned_download_url(
-            Bucket=bucket,
-            Key=media_path,
-            Expired=315360000  # 10 years
-        )
-        logger.info("Generated presigned URL for media file")
+        presigned_url = _presigned_url(cos, bucket, media_path)
     except Exception as e:
         logger.warning(f"Failed to generate presigned URL: {e}")
         presigned_url = cos_url
 
-    # Wait for COS processing
-    time.sleep(2)
-
-    # CommitUpload for media file
-    commit_req = models.CommitUploadRequest()
-    commit_req.VodSessionKey = apply_resp.VodSessionKey
-    commit_req.SubAppId = int(settings.TENCENT_SUB_APP_ID)
-
-    commit_resp = vod_client_instance.CommitUpload(commit_req)
+    commit_resp = await _commit_when_ready(apply_resp.VodSessionKey)
     logger.info(f"✅ Media upload succeeded: FileId={commit_resp.FileId}")
 
     # Return the best available URL: MediaUrl > presigned > direct COS
     final_url = commit_resp.MediaUrl or presigned_url or cos_url
     return {"imageUrl": final_url, "FileId": commit_resp.FileId}
 
-def uploadImage(image_bytes: bytes, filename: str):
-    """Original cover upload method with fallbacks"""
-    if not vod_client_instance:
-        raise Exception("Tencent VOD client not initialized")
+async def uploadImageAsCover(image_bytes: bytes, filename: str):
+    """Cover upload; the file gets no FileId"""
+    image_type = _image_type(filename)
+    apply_resp = await run_in_upload_executor(_apply_upload, image_type, None, True)
+    cover_path = apply_resp.CoverStoragePath.lstrip("/")
+    cos = await _put_image(apply_resp, cover_path, image_bytes, image_type)
+    signed_url = _presigned_url(cos, apply_resp.StorageBucket, cover_path)
+    logger.info(f"Cover uploaded, using signed URL: {signed_url}")
+    return {"imageUrl": signed_url, "FileId": None}
+
+async def uploadImage(image_bytes: bytes, filename: str):
+    """Media upload, falling back to a cover upload"""
+    _vod_client()
 
     # Try uploading as media file first (better for public access)
     try:
-        return uploadImageAsMedia(image_bytes, filename)
+        return await uploadImageAsMedia(image_bytes, filename)
     except Exception as media_error:
         logger.warning(f"Media upload failed, trying cover upload: {media_error}")
 
-    # Fallback to cover upload
-    ext = os.path.splitext(filename)[1].lower() if filename else ".jpg"
-    if ext in (".jpg", ".jpeg"):
-        cover_type = "jpg"
-    elif ext == ".png":
-        cover_type = "png"
-    else:
-        raise Exception(f"Unsupported format: {ext}")
-
-    # ApplyUpload for cover
-    apply_req = models.ApplyUploadRequest()
-    apply_req.CoverType = cover_type
-    apply_req.SubAppId = int(settings.TENCENT_SUB_APP_ID)
-
-    apply_resp = vod_client_instance.ApplyUpload(apply_req)
-
-    bucket = apply_resp.StorageBucket
-    region = apply_resp.StorageRegion
-    cover_path = apply_resp.CoverStoragePath.lstrip("/")
-
-    # Upload to COS
-    cos = CosS3Client(CosConfig(
-        Region=region,
-        SecretId=apply_resp.TempCertificate.SecretId,
-        SecretKey=apply_resp.TempCertificate.SecretKey,
-        Token=apply_resp.TempCertificate.Token,
-    ))
-
-    cos.put_object(
-        Bucket=bucket,
-        Body=image_bytes,
-        Key=cover_path,
-        StorageClass="STANDARD",
-        ContentType=f"image/{cover_type}",
-    )
-
-    # Generate a presigned URL for reliable access
-    signed_url = cos.get_presigned_download_url(
-        Bucket=bucket,
-        Key=cover_path,
-        Expired=315360000  # 10 years
-    )
-
-    logger.info(f"Cover uploaded, using signed URL: {signed_url}")
-    return {"imageUrl": signed_url, "FileId": None}
+    return await uploadImageAsCover(image_bytes, filename)
 
 async def uploadImageToTencent(image: bytes, filename: str):
-    """Async wrapper for image upload"""
+    """Upload image bytes, reusing the existing file when the same bytes were uploaded before"""
     logger.info("🚀 Starting Tencent image upload")
-    loop = asyncio.get_running_loop()
     try:
-        result = await loop.run_in_executor(None, uploadImage, image, filename)
-        return result
+        digest = content_hash(image)
+        blob = await acquire_blob(digest, len(image))
+        if blob:
+            logger.info(f"Identical image already uploaded, reusing FileId={blob['file_id']}")
+            return {"imageUrl": blob["url"], "FileId": blob["file_id"]}
+
+        result = await uploadImage(image, filename)
+        if not result["FileId"]:
+            return result
+
+        blob = await register_blob(digest, len(image), "image", result["FileId"], result["imageUrl"])
+        if blob["file_id"] != result["FileId"]:
+            # A concurrent upload of the same bytes registered first; ours is redundant
+            await enqueue_media_deletions([result["FileId"]], "image_dedup")
+        return {"imageUrl": blob["url"], "FileId": blob["file_id"]}
     except TencentCloudSDKException as e:
         logger.error(f"VOD error: {e}", exc_info=True)
         raise Exception(f"Image upload failed: {str(e)}")
@@ -179,4 +173,8 @@ async def upload_image_to_tencent(image_content: bytes, filename: str):
     return {
         "file_id": result["FileId"],
         "image_url": result["imageUrl"]
-    }
\ No newline at end of file
+    }
+
+async def upload_image_file_to_tencent(image_file):
+    """Upload an UploadFile image (images are small enough to read in one go)"""
+    return await upload_image_to_tencent(await image_file.read(), image_file.filename)
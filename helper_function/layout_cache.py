@@ -0,0 +1,21 @@
+# Rendered layout pages served to the storefront, keyed by
+# (layout_id, skip, limit). The layout engine invalidates them after every
+# recompute and course sync.
+from helper_function.generation_cache import GenerationCache
+
+LAYOUT_CACHE_MAX_SIZE = 256
+LAYOUT_CACHE_TTL_SECONDS = 30
+
+_pages = GenerationCache(maxsize=LAYOUT_CACHE_MAX_SIZE, ttl=LAYOUT_CACHE_TTL_SECONDS)
+
+def layout_cache_generation():
+    return _pages.generation()
+
+def get_cached_layout_page(cache_key):
+    return _pages.get(cache_key)
+
+def cache_layout_page(cache_key, response, generation):
+    _pages.store(cache_key, response, generation)
+
+def invalidate_layout_cache():
+    _pages.invalidate()
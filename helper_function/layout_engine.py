@@ -0,0 +1,322 @@
+# Rule-based layouts. Each layout document carries a `rule`; each layout is
+# recomputed by its own aggregation into layout_cards, one materialized,
+# pre-projected course card per document, so storefront reads are one
+# indexed range scan and no layout document grows with the catalog.
+import asyncio
+import logging
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReplaceOne
+from core.database import courses_collection, layout_collection, layout_cards_collection
+from helper_function.layout_cache import invalidate_layout_cache
+
+logger = logging.getLogger(__name__)
+
+HIGH_RATING_LAYOUT_ID = ObjectId("68d0d3643deb5b22c6613b61")
+LOW_RATING_LAYOUT_ID = ObjectId("68d104bd896833b9498ad494")
+# Layout served by get_top_courses
+TOP_COURSES_LAYOUT_ID = HIGH_RATING_LAYOUT_ID
+
+# Rules given to the built-in layouts when they have none
+DEFAULT_LAYOUT_RULES = {
+    HIGH_RATING_LAYOUT_ID: {"type": "rating_range", "min": 4, "max": None},
+    LOW_RATING_LAYOUT_ID: {"type": "rating_range", "min": None, "max": 4},
+}
+
+RULE_TYPES = ("rating_range", "category", "visibility", "top_n")
+TOP_N_SORT_KEYS = ("rating", "price", "created_at", "updated_at", "title")
+TOP_N_MAX_LIMIT = 500
+
+# Course writes that touch a top_n layout are coalesced into one recompute
+LAYOUT_RECOMPUTE_DEBOUNCE_SECONDS = 5
+
+# Fields materialized on each course card
+COURSE_CARD_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "image_url": "$images.course_image_url",
+    "image_variants": "$images.variants",
+    "image_placeholder": "$images.placeholder",
+    "rating": 1,
+    "price": 1,
+    "visible": 1,
+    "instructor_id": 1,
+    "category_id": 1,
+}
+
+# find() projection that returns what build_course_card needs
+COURSE_CARD_FIND_PROJECTION = {
+    **{key: 1 for key in COURSE_CARD_PROJECTION if not key.startswith("image_")},
+    "images.course_image_url": 1,
+    "images.variants": 1,
+    "images.placeholder": 1,
+}
+
+_recompute_task = None
+
+def validate_layout_rule(rule):
+    """Normalise a rule dict, raising ValueError if it is not usable"""
+    if not isinstance(rule, dict) or rule.get("type") not in RULE_TYPES:
+        raise ValueError(f"Rule type must be one of {', '.join(RULE_TYPES)}")
+    rule_type = rule["type"]
+
+    if rule_type == "rating_range":
+        low, high = rule.get("min"), rule.get("max")
+        if low is None and high is None:
+            raise ValueError("rating_range needs min and/or max")
+        return {"type": rule_type, "min": None if low is None else float(low), "max": None if high is None else float(high)}
+
+    if rule_type == "category":
+        category_ids = rule.get("category_ids") or []
+        if not category_ids or not all(ObjectId.is_valid(str(c)) for c in category_ids):
+            raise ValueError("category rule needs a list of valid category_ids")
+        return {"type": rule_type, "category_ids": [ObjectId(str(c)) for c in category_ids]}
+
+    if rule_type == "visibility":
+        if not isinstance(rule.get("visible"), bool):
+            raise ValueError("visibility rule needs visible: true/false")
+        return {"type": rule_type, "visible": rule["visible"]}
+
+    sort_by = rule.get("sort_by", "rating")
+    if sort_by not in TOP_N_SORT_KEYS:
+        raise ValueError(f"top_n sort_by must be one of {', '.join(TOP_N_SORT_KEYS)}")
+    limit = int(rule.get("limit", 10))
+    if not 1 <= limit <= TOP_N_MAX_LIMIT:
+        raise ValueError(f"top_n limit must be between 1 and {TOP_N_MAX_LIMIT}")
+    return {
+        "type": rule_type,
+        "sort_by": sort_by,
+        "order": -1 if rule.get("order", -1) == -1 else 1,
+        "limit": limit,
+        "visible_only": bool(rule.get("visible_only", True)),
+    }
+
+def _rule_match(rule):
+    rule_type = rule["type"]
+    if rule_type == "rating_range":
+        # A missing rating counts as 0, as it always has for the rating layouts
+        rating = {"$ifNull": ["$rating", 0]}
+        bounds = []
+        if rule["min"] is not None:
+            bounds.append({"$gte": [rating, rule["min"]]})
+        if rule["max"] is not None:
+            bounds.append({"$lt": [rating, rule["max"]]})
+        return {"$expr": {"$and": bounds}}
+    if rule_type == "category":
+        return {"category_id": {"$in": rule["category_ids"]}}
+    if rule_type == "visibility":
+        return {"visible": rule["visible"]}
+    return {"visible": True} if rule["visible_only"] else {}
+
+def _card_key(layout_id, course_id):
+    # Built in one place so the embedded _id always has the same field order
+    return {"layout_id": layout_id, "course_id": course_id}
+
+def _rule_pipeline(rule):
+    """Pipeline producing a layout's course cards (top_n: in rank order)"""
+    stages = [{"$match": _rule_match(rule)}]
+    if rule["type"] == "top_n":
+        stages += [{"$sort": {rule["sort_by"]: rule["order"], "_id": 1}}, {"$limit": rule["limit"]}]
+    stages.append({"$project": COURSE_CARD_PROJECTION})
+    return stages
+
+def _card_document(layout_id, card, rank, computed_at):
+    # Filter layouts all use rank 0 and are ordered by course id; top_n layouts by rank
+    return {
+        "_id": _card_key(layout_id, card["_id"]),
+        "layout_id": layout_id,
+        "course_id": card["_id"],
+        "rank": rank,
+        "card": card,
+        "computed_at": computed_at,
+    }
+
+def course_matches_rule(rule, course):
+    """Python twin of _rule_match, for one course"""
+    rule_type = rule["type"]
+    if rule_type == "rating_range":
+        rating = course.get("rating") or 0
+        return (rule["min"] is None or rating >= rule["min"]) and (rule["max"] is None or rating < rule["max"])
+    if rule_type == "category":
+        category_ids = course.get("category_id") or []
+        if not isinstance(category_ids, list):
+            category_ids = [category_ids]
+        return any(ObjectId(str(c)) in rule["category_ids"] for c in category_ids if ObjectId.is_valid(str(c)))
+    if rule_type == "visibility":
+        return course.get("visible") == rule["visible"]
+    return not rule["visible_only"] or course.get("visible") is True
+
+def build_course_card(course):
+    """Course card as COURSE_CARD_PROJECTION would produce it"""
+    card = {key: course.get(key) for key in COURSE_CARD_PROJECTION if key in course and not key.startswith("image_")}
+    card["_id"] = course["_id"]
+    images = course.get("images") or {}
+    card["image_url"] = images.get("course_image_url")
+    # $project drops fields the course does not have; match that
+    for key, field in (("image_variants", "variants"), ("image_placeholder", "placeholder")):
+        if field in images:
+            card[key] = images[field]
+    return card
+
+def format_course_card(card, lookup_cache):
+    """Serialize a stored card, dropping references that are no longer active"""
+    def active_ids(field):
+        refs = card.get(field) or []
+        if not isinstance(refs, list):
+            refs = [refs]
+        valid = lookup_cache[field]["valid"]
+        return [str(ref) for ref in refs if ObjectId.is_valid(str(ref)) and ObjectId(str(ref)) in valid]
+
+    return {
+        "id": str(card["_id"]),
+        "title": card.get("title"),
+        "description": card.get("description"),
+        "image_url": card.get("image_url"),
+        "image_variants": [
+            {key: variant.get(key) for key in ("url", "format", "width", "height")}
+            for variant in card.get("image_variants") or []
+        ],
+        "image_placeholder": card.get("image_placeholder"),
+        "rating": card.get("rating"),
+        "price": card.get("price"),
+        "visible": card.get("visible"),
+        "instructor_id": active_ids("instructor_id"),
+        "category_id": active_ids("category_id"),
+    }
+
+async def _rule_layouts():
+    layouts = []
+    async for layout in layout_collection.find({"rule": {"$exists": True}}, {"rule": 1}):
+        try:
+            layouts.append((layout["_id"], validate_layout_rule(layout["rule"])))
+        except ValueError as e:
+            logger.warning(f"Skipping layout {layout['_id']} with invalid rule: {e}")
+    return layouts
+
+async def ensure_default_layouts():
+    """Give the built-in layouts their default rule unless they already have one"""
+    for layout_id, rule in DEFAULT_LAYOUT_RULES.items():
+        await layout_collection.update_one(
+            {"_id": layout_id},
+            [{"$set": {"rule": {"$ifNull": ["$rule", {"$literal": rule}]}}}],
+            upsert=True
+        )
+    # Pages are read in (rank, course_id) order; course writes look cards up by course
+    await layout_cards_collection.create_index([("layout_id", 1), ("rank", 1), ("course_id", 1)])
+    await layout_cards_collection.create_index([("course_id", 1)])
+
+async def _recompute_layout(layout_id, rule, computed_at):
+    if rule["type"] == "top_n":
+        # At most TOP_N_MAX_LIMIT cards, ranked here
+        cards = await courses_collection.aggregate(_rule_pipeline(rule)).to_list(rule["limit"])
+        if cards:
+            await layout_cards_collection.bulk_write([
+                ReplaceOne({"_id": _card_key(layout_id, card["_id"])},
+                           _card_document(layout_id, card, rank, computed_at), upsert=True)
+                for rank, card in enumerate(cards)
+            ], ordered=False)
+    else:
+        # Cards are written server-side; nothing proportional to the layout passes through here
+        await courses_collection.aggregate([
+            *_rule_pipeline(rule),
+            {"$replaceWith": {
+                "_id": {"layout_id": {"$literal": layout_id}, "course_id": "$_id"},
+                "layout_id": {"$literal": layout_id},
+                "course_id": "$_id",
+                "rank": {"$literal": 0},
+                "card": "$$ROOT",
+                "computed_at": {"$literal": computed_at},
+            }},
+            {"$merge": {"into": layout_cards_collection.name, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ], allowDiskUse=True).to_list(None)
+
+    # Cards this pass did not write no longer match; cards synced after it started are kept
+    await layout_cards_collection.delete_many({"layout_id": layout_id, "computed_at": {"$lt": computed_at}})
+    count = await layout_cards_collection.count_documents({"layout_id": layout_id})
+    await layout_collection.update_one(
+        {"_id": layout_id},
+        {"$set": {"card_count": count, "computed_at": computed_at}, "$unset": {"linked_courses": "", "course_cards": ""}}
+    )
+    invalidate_layout_cache()
+    return count
+
+async def recompute_layouts():
+    """Recompute every rule-based layout, one aggregation each; returns {layout_id: course count}"""
+    counts = {}
+    for layout_id, rule in await _rule_layouts():
+        counts[str(layout_id)] = await _recompute_layout(layout_id, rule, datetime.now())
+    logger.info(f"Recomputed {len(counts)} layouts")
+    return counts
+
+async def get_layout_cards(layout_id, skip=0, limit=None):
+    """A rule-based layout's course cards, in layout order"""
+    cursor = layout_cards_collection.find({"layout_id": layout_id}, {"card": 1}).sort([("rank", 1), ("course_id", 1)])
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [doc["card"] async for doc in cursor]
+
+async def _debounced_recompute():
+    global _recompute_task
+    await asyncio.sleep(LAYOUT_RECOMPUTE_DEBOUNCE_SECONDS)
+    _recompute_task = None
+    try:
+        await recompute_layouts()
+    except Exception as e:
+        logger.error(f"Layout recompute failed: {e}")
+
+def schedule_layout_recompute():
+    """Recompute all layouts shortly, coalescing bursts of course writes"""
+    global _recompute_task
+    if _recompute_task is None:
+        _recompute_task = asyncio.create_task(_debounced_recompute())
+
+async def sync_course_layout(course_id):
+    """Apply one course write to the layouts.
+
+    Filter rules are maintained in place: the course's card is upserted into
+    or removed from each layout. top_n layouts depend on every course, so
+    they get a debounced full recompute instead.
+    """
+    course_id = ObjectId(course_id)
+    course = await courses_collection.find_one({"_id": course_id}, COURSE_CARD_FIND_PROJECTION)
+    if course is None:
+        await remove_course_from_layouts(course_id)
+        return
+
+    card = build_course_card(course)
+    needs_recompute = False
+    now = datetime.now()
+    for layout_id, rule in await _rule_layouts():
+        if rule["type"] == "top_n":
+            needs_recompute = True
+            continue
+        key = {"_id": _card_key(layout_id, course_id)}
+        if course_matches_rule(rule, course):
+            result = await layout_cards_collection.replace_one(key, _card_document(layout_id, card, 0, now), upsert=True)
+            delta = 1 if result.upserted_id is not None else 0
+        else:
+            result = await layout_cards_collection.delete_one(key)
+            delta = -result.deleted_count
+        if delta:
+            await layout_collection.update_one({"_id": layout_id}, {"$inc": {"card_count": delta}})
+    # Cached pages may hold this course's old card
+    invalidate_layout_cache()
+    if needs_recompute:
+        schedule_layout_recompute()
+
+async def remove_course_from_layouts(course_id):
+    """Unlink a deleted course from every layout"""
+    course_id = ObjectId(course_id)
+    # Layouts without a rule keep a hand-curated linked_courses list
+    await layout_collection.update_many({"linked_courses": course_id}, {"$pull": {"linked_courses": course_id}})
+    layout_ids = await layout_cards_collection.distinct("layout_id", {"course_id": course_id})
+    if layout_ids:
+        await layout_cards_collection.delete_many({"course_id": course_id})
+        await layout_collection.update_many({"_id": {"$in": layout_ids}}, {"$inc": {"card_count": -1}})
+    invalidate_layout_cache()
+    top_n_layouts = {layout_id for layout_id, rule in await _rule_layouts() if rule["type"] == "top_n"}
+    if top_n_layouts.intersection(layout_ids):
+        # A top_n layout lost a course; refill it
+        schedule_layout_recompute()
@@ -1,82 +1,156 @@
-from fastapi import HTTPException, Request, Depends
+from fastapi import HTTPException, Request, Depends, Body, Query
+from typing import Optional
 from bson import ObjectId
 from core.database import courses_collection, layout_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.layout_engine import (
+    recompute_layouts, ensure_default_layouts, validate_layout_rule,
+    build_course_card, format_course_card, get_layout_cards, COURSE_CARD_FIND_PROJECTION,
+)
+from helper_function.layout_cache import get_cached_layout_page, cache_layout_page, layout_cache_generation
+from helper_function.pagination import MAX_PAGE_LIMIT
+from helper_function.validate_references import resolve_valid_references, request_lookup_cache
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How often every layout is recomputed, correcting any drift from incremental updates
+LAYOUT_REBUILD_INTERVAL_SECONDS = 60 * 60
+
+_rebuild_task = None
 
 async def update_layout_by_rating():
-    """Update layout collection based on course ratings"""
+    """Recompute every rule-based layout (the rating layouts included) in one pass"""
     try:
-        # Get all courses directly from database
-        courses_cursor = courses_collection.find({})
-        courses = await courses_cursor.to_list(length=None)
-        
-        # Separate courses by rating
-        high_rating_courses = []  # Rating >= 4
-        low_rating_courses = []   # Rating < 4
-        
-        for course in courses:
-            course_id = course["_id"]  # Already ObjectId from database
-            if course.get("rating", 0) >= 4:
-                high_rating_courses.append(course_id)
-            else:
-                low_rating_courses.append(course_id)
-        
-        # Update high rating layout (68d0d3643deb5b22c6613b61)
-        await layout_collection.update_one(
-            {"_id": ObjectId("68d0d3643deb5b22c6613b61")},
-            {"$set": {"linked_courses": high_rating_courses}},
-            upsert=True
-        )
-        
-        # Update low rating layout (68d104bd896833b9498ad494)
-        await layout_collection.update_one(
-            {"_id": ObjectId("68d104bd896833b9498ad494")},
-            {"$set": {"linked_courses": low_rating_courses}},
-            upsert=True
-        )
-        
+        counts = await recompute_layouts()
         return {
             "success": True,
             "message": "Layout updated successfully",
             "data": {
-                "high_rating_courses": len(high_rating_courses),
-                "low_rating_courses": len(low_rating_courses),
-                "total_courses": len(courses)
+                "layouts": counts,
+                "total_layouts": len(counts)
             }
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _rebuild_periodically():
+    await ensure_default_layouts()
+    while True:
+        try:
+            await recompute_layouts()
+        except Exception as e:
+            logger.error(f"Periodic layout rebuild failed: {e}")
+        await asyncio.sleep(LAYOUT_REBUILD_INTERVAL_SECONDS)
+
+async def start_layout_rebuild():
+    global _rebuild_task
+    _rebuild_task = asyncio.create_task(_rebuild_periodically())
+
+async def stop_layout_rebuild():
+    if _rebuild_task:
+        _rebuild_task.cancel()
+        await asyncio.gather(_rebuild_task, return_exceptions=True)
+
+async def update_layout_rule(
+    layout_id: str,
+    rule: dict = Body(..., embed=True),
+    token: str = Depends(get_current_user)
+):
+    """Set a layout's rule and recompute layouts.
+
+    Rules: {"type": "rating_range", "min", "max"}, {"type": "category",
+    "category_ids"}, {"type": "visibility", "visible"} or {"type": "top_n",
+    "sort_by", "order", "limit", "visible_only"}.
+    """
+    if not ObjectId.is_valid(layout_id):
+        raise HTTPException(status_code=400, detail="Invalid layout ID")
+    try:
+        rule = validate_layout_rule(rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await layout_collection.update_one({"_id": ObjectId(layout_id)}, {"$set": {"rule": rule}}, upsert=True)
+    counts = await recompute_layouts()
+    return {
+        "success": True,
+        "message": "Layout rule updated",
+        "data": {
+            "layout_id": layout_id,
+            "rule": {**rule, "category_ids": [str(c) for c in rule["category_ids"]]} if rule["type"] == "category" else rule,
+            "courses_count": counts.get(layout_id, 0)
+        }
+    }
+
+async def _layout_page(layout_id, skip, limit):
+    """Layout courses in layout order, as course cards, plus the linked total"""
+    layout = await layout_collection.find_one({"_id": layout_id}, {"rule": 1, "card_count": 1})
+    if not layout:
+        return None, 0
+
+    # Rule-based layouts are served from their materialized course cards
+    if "rule" in layout:
+        cards = await get_layout_cards(layout_id, skip, limit)
+        return cards, layout.get("card_count", 0)
+
+    # Other layouts: one $in fetch, re-ordered to match linked_courses
+    projection = {"linked_total": {"$size": {"$ifNull": ["$linked_courses", []]}}}
+    projection["linked_courses"] = {"$slice": [skip, limit]} if limit else 1
+    layout = await layout_collection.find_one({"_id": layout_id}, projection)
+    linked = layout.get("linked_courses", [])
+    if not limit:
+        linked = linked[skip:]
+    linked_course_ids = [ObjectId(str(c)) for c in linked if ObjectId.is_valid(str(c))]
+    docs = {}
+    async for doc in courses_collection.find({"_id": {"$in": linked_course_ids}}, COURSE_CARD_FIND_PROJECTION):
+        docs[doc["_id"]] = doc
+    cards = [build_course_card(docs[course_id]) for course_id in linked_course_ids if course_id in docs]
+    return cards, layout["linked_total"]
+
 async def get_layout_courses(
     layout_id: str,
     request: Request = None,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
     token: str = Depends(get_current_user)
 ):
-    """Get courses for specific layout"""
+    """Get courses for specific layout, in layout order, optionally one page at a time"""
     try:
-        layout = await layout_collection.find_one({"_id": ObjectId(layout_id)})
-        if not layout:
-            raise HTTPException(status_code=404, detail="Layout not found")
+        if not ObjectId.is_valid(layout_id):
+            raise HTTPException(status_code=400, detail="Invalid layout ID")
         
-        linked_course_ids = layout.get("linked_courses", [])
-        courses = []
+        cache_key = (layout_id, skip, limit)
+        response = get_cached_layout_page(cache_key)
+        if response is not None:
+            return response
+        generation = layout_cache_generation()
         
-        for course_id in linked_course_ids:
-            course = await courses_collection.find_one({"_id": course_id})
-            if course:
-                course["_id"] = str(course["_id"])
-                if course.get("cat_id"):
-                    course["cat_id"] = str(course["cat_id"])
-                courses.append(course)
+        cards, linked_total = await _layout_page(ObjectId(layout_id), skip, limit)
+        if cards is None:
+            raise HTTPException(status_code=404, detail="Layout not found")
         
-        return {
+        lookup_cache = await resolve_valid_references(request_lookup_cache(request))
+        courses = [format_course_card(card, lookup_cache) for card in cards]
+        
+        response = {
             "success": True,
             "layout_id": layout_id,
             "courses_count": len(courses),
-            "data": courses
+            "data": courses,
+            "pagination": {
+                "skip": skip,
+                "limit": limit,
+                "total_linked": linked_total,
+                "has_next": limit is not None and skip + limit < linked_total
+            }
         }
+        cache_layout_page(cache_key, response, generation)
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,101 @@
+# Content-addressed registry of uploaded media. Identical bytes map to one
+# Tencent file whose documents share it through a reference count; the file
+# is only deleted once its last reference is released.
+import logging
+from datetime import datetime
+import xxhash
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from core.database import media_blobs_collection
+
+logger = logging.getLogger(__name__)
+
+def content_hash(data: bytes) -> str:
+    return xxhash.xxh3_128_hexdigest(data)
+
+def new_content_hasher():
+    """Incremental hasher matching content_hash, for data read in chunks"""
+    return xxhash.xxh3_128()
+
+def file_content_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """content_hash of a file on disk, read in chunks (blocking)"""
+    hasher = new_content_hasher()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+async def acquire_blob(digest: str, size: int):
+    """Take a reference to existing media with this content, or None"""
+    return await media_blobs_collection.find_one_and_update(
+        {"_id": digest, "size": size},
+        {"$inc": {"refcount": 1}, "$set": {"updated_at": datetime.now()}},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def register_blob(digest: str, size: int, kind: str, file_id: str, url: str):
+    """Record freshly uploaded media, holding one reference.
+
+    If a concurrent upload of the same bytes registered first, a reference
+    to that blob is returned instead and the caller's file is redundant.
+    """
+    now = datetime.now()
+    blob = {
+        "_id": digest,
+        "size": size,
+        "kind": kind,
+        "file_id": file_id,
+        "url": url,
+        "refcount": 1,
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        await media_blobs_collection.insert_one(blob)
+        return blob
+    except DuplicateKeyError:
+        existing = await acquire_blob(digest, size)
+        return existing or blob
+
+async def release_media(file_ids):
+    """Drop one reference per fileId; returns the fileIds nothing references any more.
+
+    Files that were never registered are returned as-is, so callers can
+    treat the result as the list of files to delete.
+    """
+    to_delete = []
+    for file_id in file_ids:
+        while True:
+            shared = await media_blobs_collection.find_one_and_update(
+                {"file_id": file_id, "refcount": {"$gt": 1}},
+                {"$inc": {"refcount": -1}, "$set": {"updated_at": datetime.now()}}
+            )
+            if shared:
+                break
+            last = await media_blobs_collection.delete_one({"file_id": file_id, "refcount": {"$lte": 1}})
+            if last.deleted_count or not await media_blobs_collection.find_one({"file_id": file_id}, {"_id": 1}):
+                to_delete.append(file_id)
+                break
+            # A reference was taken between the two writes; try again
+    return to_delete
+
+async def forget_blobs(file_ids):
+    """Remove registry entries for files that are gone from Tencent"""
+    file_ids = list(file_ids)
+    if file_ids:
+        await media_blobs_collection.delete_many({"file_id": {"$in": file_ids}})
+
+async def forget_untouched_blobs(file_ids, since):
+    """Forget registry entries not updated since `since`; returns the fileIds left without one.
+
+    An entry a deduplicated upload acquired after `since` is kept, and its
+    file is not returned.
+    """
+    file_ids = list(file_ids)
+    if not file_ids:
+        return []
+    await media_blobs_collection.delete_many(
+        {"file_id": {"$in": file_ids}, "updated_at": {"$not": {"$gte": since}}}
+    )
+    kept = set(await media_blobs_collection.distinct("file_id", {"file_id": {"$in": file_ids}}))
+    return [file_id for file_id in file_ids if file_id not in kept]
@@ -0,0 +1,71 @@
+# Tencent VOD media deletion: DeleteMedia runs on its own thread pool and
+# batches fan out with bounded concurrency and rate-limit-aware retries.
+import random
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from core.config import settings, upload_settings
+from helper_function.tencent_client import get_vod_client
+from tencentcloud.vod.v20180717 import models
+from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
+
+logger = logging.getLogger(__name__)
+
+# Error code prefixes worth retrying: throttling, transient server and network errors
+RETRYABLE_ERROR_PREFIXES = ("RequestLimitExceeded", "LimitExceeded", "InternalError", "ClientNetworkError")
+# The file is already gone; deleting it again is a success
+NOT_FOUND_ERROR_PREFIXES = ("ResourceNotFound",)
+RETRY_BASE_DELAY_SECONDS = 0.5
+
+deletion_executor = ThreadPoolExecutor(
+    max_workers=upload_settings.MEDIA_DELETE_CONCURRENCY,
+    thread_name_prefix="media-delete",
+)
+deletion_semaphore = asyncio.Semaphore(upload_settings.MEDIA_DELETE_CONCURRENCY)
+
+def _delete_media_sync(file_id: str):
+    vod_client_instance = get_vod_client()
+    if not vod_client_instance:
+        raise Exception("Tencent client not initialized")
+    params = models.DeleteMediaRequest()
+    params.FileId = file_id
+    params.SubAppId = int(settings.TENCENT_SUB_APP_ID)
+    vod_client_instance.DeleteMedia(params)
+
+async def delete_media(file_id: str):
+    """Delete one file from Tencent VOD.
+
+    Returns {"file_id", "status", "attempts"[, "error"]} where status is
+    "deleted", "not_found" or "failed".
+    """
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    async with deletion_semaphore:
+        while True:
+            attempt += 1
+            try:
+                await loop.run_in_executor(deletion_executor, _delete_media_sync, file_id)
+                logger.info(f"File deleted from Tencent: {file_id}")
+                return {"file_id": file_id, "status": "deleted", "attempts": attempt}
+            except TencentCloudSDKException as e:
+                code = e.get_code() or ""
+                if code.startswith(NOT_FOUND_ERROR_PREFIXES):
+                    return {"file_id": file_id, "status": "not_found", "attempts": attempt}
+                error, retryable = f"{code}: {e.get_message()}", code.startswith(RETRYABLE_ERROR_PREFIXES)
+            except Exception as e:
+                error, retryable = str(e), False
+
+            if not retryable or attempt >= upload_settings.MEDIA_DELETE_MAX_ATTEMPTS:
+                logger.error(f"Failed to delete file {file_id}: {error}")
+                return {"file_id": file_id, "status": "failed", "attempts": attempt, "error": error}
+            # Exponential backoff with jitter so throttled calls don't retry in lockstep
+            delay = RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1)
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+async def delete_media_batch(file_ids):
+    """Delete many files concurrently; results come back in input order, one per distinct id"""
+    unique_ids = list(dict.fromkeys(file_id for file_id in file_ids if file_id))
+    return list(await asyncio.gather(*(delete_media(file_id) for file_id in unique_ids)))
+
+def deletion_succeeded(result) -> bool:
+    return result["status"] in ("deleted", "not_found")
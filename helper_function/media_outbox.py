@@ -0,0 +1,238 @@
+# Durable outbox for Tencent media cleanup. Request handlers stage the files
+# to delete before their database write and activate them after it; a
+# background reaper deletes them in batches and retries failures with backoff
+# until they succeed or go dead.
+import uuid
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from core.config import upload_settings
+from core.database import media_deletion_outbox_collection
+from helper_function.media_deletion import delete_media_batch, deletion_succeeded
+from helper_function.media_blobs import release_media, forget_blobs
+from helper_function.media_references import file_is_referenced
+
+logger = logging.getLogger(__name__)
+
+# Reaper poll interval while idle
+OUTBOX_POLL_SECONDS = 10
+# Retry backoff grows from the base delay up to the cap
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETRY_MAX_SECONDS = 6 * 60 * 60
+# A batch claimed by a reaper that died is released after this long
+OUTBOX_CLAIM_TIMEOUT_MINUTES = 15
+# Staged entries whose request never activated or discarded them are resolved after this long
+OUTBOX_STAGE_TIMEOUT_MINUTES = 15
+
+_work_available = asyncio.Event()
+_reaper_task = None
+# Counters since this process started
+_counters = {"batches": 0, "deleted": 0, "retried": 0, "dead": 0}
+
+async def enqueue_media_deletions(file_ids, source: str):
+    """Record Tencent files for deletion; returns the fileIds queued.
+
+    One reference is released per entry, so a fileId listed twice drops two.
+    Deduplicated media is only queued once its last reference is released.
+    """
+    released = await release_media([file_id for file_id in file_ids if file_id])
+    file_ids = list(dict.fromkeys(released))
+    if not file_ids:
+        return []
+    now = datetime.now()
+    await media_deletion_outbox_collection.insert_many([
+        {
+            "file_id": file_id,
+            "source": source,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for file_id in file_ids
+    ])
+    _work_available.set()
+    logger.info(f"Queued {len(file_ids)} media deletions from {source}")
+    return file_ids
+
+async def stage_media_deletions(file_ids, source: str):
+    """Record files a pending database write will stop referencing.
+
+    Call before the write, then activate_media_deletions once it succeeded
+    or discard_staged_deletions if it did not. Entries left staged by a
+    crash are queued by the reaper if nothing references the file any more.
+    Returns a stage token (None when there is nothing to stage).
+    """
+    releases = Counter(file_id for file_id in file_ids if file_id)
+    if not releases:
+        return None
+    stage = uuid.uuid4().hex
+    now = datetime.now()
+    await media_deletion_outbox_collection.insert_many([
+        {
+            "file_id": file_id,
+            "source": source,
+            "status": "staged",
+            "stage": stage,
+            # Blob references the write drops; a file can back several entries
+            "releases": count,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for file_id, count in releases.items()
+    ])
+    return stage
+
+async def activate_media_deletions(stage):
+    """Release the staged references; queue the files nothing holds any more.
+
+    Returns the fileIds queued for deletion.
+    """
+    if stage is None:
+        return []
+    entries = await media_deletion_outbox_collection.find(
+        {"stage": stage, "status": "staged"}, {"file_id": 1, "source": 1, "releases": 1}
+    ).to_list(None)
+    released = await release_media([
+        entry["file_id"] for entry in entries for _ in range(entry.get("releases", 1))
+    ])
+    file_ids = list(dict.fromkeys(released))
+    now = datetime.now()
+    if file_ids:
+        await media_deletion_outbox_collection.update_many(
+            {"stage": stage, "status": "staged", "file_id": {"$in": file_ids}},
+            {"$set": {"status": "pending", "next_attempt_at": now, "updated_at": now}, "$unset": {"stage": ""}}
+        )
+        _work_available.set()
+        logger.info(f"Queued {len(file_ids)} media deletions from {entries[0]['source']}")
+    # Files still shared through the blob registry are kept
+    await media_deletion_outbox_collection.delete_many({"stage": stage, "status": "staged"})
+    return file_ids
+
+async def discard_staged_deletions(stage):
+    """Drop staged entries after the database write failed"""
+    if stage is not None:
+        await media_deletion_outbox_collection.delete_many({"stage": stage, "status": "staged"})
+
+async def _resolve_abandoned_stages(now):
+    """Entries staged by a request that died before activating or discarding them"""
+    abandoned = media_deletion_outbox_collection.find(
+        {"status": "staged", "created_at": {"$lt": now - timedelta(minutes=OUTBOX_STAGE_TIMEOUT_MINUTES)}},
+        {"file_id": 1}
+    )
+    async for entry in abandoned:
+        if await file_is_referenced(entry["file_id"]):
+            # The write never happened, or another document shares the file
+            await media_deletion_outbox_collection.delete_one({"_id": entry["_id"], "status": "staged"})
+            continue
+        # The write landed; whatever the blob refcount says, nothing uses the file
+        await forget_blobs([entry["file_id"]])
+        await media_deletion_outbox_collection.update_one(
+            {"_id": entry["_id"], "status": "staged"},
+            {"$set": {"status": "pending", "next_attempt_at": now, "updated_at": now}, "$unset": {"stage": ""}}
+        )
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_SECONDS))
+
+async def _claim_batch():
+    """Claim up to MEDIA_OUTBOX_BATCH_SIZE due entries for this reaper"""
+    now = datetime.now()
+    # Release batches whose reaper never finished them
+    await media_deletion_outbox_collection.update_many(
+        {"status": "processing", "claimed_at": {"$lt": now - timedelta(minutes=OUTBOX_CLAIM_TIMEOUT_MINUTES)}},
+        {"$set": {"status": "pending", "updated_at": now}, "$unset": {"claim": ""}}
+    )
+    await _resolve_abandoned_stages(now)
+    due = await media_deletion_outbox_collection.find(
+        {"status": "pending", "next_attempt_at": {"$lte": now}}, {"_id": 1}
+    ).sort("next_attempt_at", 1).limit(upload_settings.MEDIA_OUTBOX_BATCH_SIZE).to_list(None)
+    if not due:
+        return []
+    claim = uuid.uuid4().hex
+    await media_deletion_outbox_collection.update_many(
+        {"_id": {"$in": [entry["_id"] for entry in due]}, "status": "pending"},
+        {"$set": {"status": "processing", "claim": claim, "claimed_at": now, "updated_at": now}}
+    )
+    return await media_deletion_outbox_collection.find({"claim": claim}).to_list(None)
+
+async def _process_batch(entries):
+    results = await delete_media_batch(entry["file_id"] for entry in entries)
+    outcome = {result["file_id"]: result for result in results}
+    now = datetime.now()
+
+    done_ids = []
+    updates = []
+    for entry in entries:
+        result = outcome[entry["file_id"]]
+        if deletion_succeeded(result):
+            done_ids.append(entry["_id"])
+            continue
+        attempts = entry["attempts"] + 1
+        if attempts >= upload_settings.MEDIA_OUTBOX_MAX_ATTEMPTS:
+            fields = {"status": "dead"}
+            _counters["dead"] += 1
+            logger.error(f"Giving up deleting {entry['file_id']} after {attempts} attempts: {result.get('error')}")
+        else:
+            fields = {"status": "pending", "next_attempt_at": now + _retry_delay(attempts)}
+            _counters["retried"] += 1
+        fields.update({"attempts": attempts, "last_error": result.get("error"), "updated_at": now})
+        updates.append(UpdateOne({"_id": entry["_id"]}, {"$set": fields, "$unset": {"claim": ""}}))
+
+    if done_ids:
+        await media_deletion_outbox_collection.delete_many({"_id": {"$in": done_ids}})
+    if updates:
+        await media_deletion_outbox_collection.bulk_write(updates, ordered=False)
+    _counters["batches"] += 1
+    _counters["deleted"] += len(done_ids)
+
+async def _reaper():
+    while True:
+        try:
+            entries = await _claim_batch()
+            if entries:
+                await _process_batch(entries)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Media outbox reaper error: {e}")
+        _work_available.clear()
+        try:
+            await asyncio.wait_for(_work_available.wait(), timeout=OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+async def get_outbox_metrics():
+    """Backlog by status, age of the oldest pending entry and this process's counters"""
+    by_status = {"staged": 0, "pending": 0, "processing": 0, "dead": 0}
+    async for row in media_deletion_outbox_collection.aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]):
+        by_status[row["_id"]] = row["count"]
+
+    oldest = await media_deletion_outbox_collection.find_one(
+        {"status": "pending"}, {"created_at": 1}, sort=[("created_at", 1)]
+    )
+    oldest_age = (datetime.now() - oldest["created_at"]).total_seconds() if oldest else 0
+    return {
+        "backlog": by_status,
+        "oldest_pending_seconds": int(oldest_age),
+        "since_start": dict(_counters),
+        "reaper_running": _reaper_task is not None and not _reaper_task.done(),
+    }
+
+async def start_media_outbox():
+    global _reaper_task
+    _reaper_task = asyncio.create_task(_reaper())
+
+async def stop_media_outbox():
+    global _reaper_task
+    if _reaper_task:
+        _reaper_task.cancel()
+        await asyncio.gather(_reaper_task, return_exceptions=True)
+        _reaper_task = None
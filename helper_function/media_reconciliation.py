@@ -0,0 +1,245 @@
+# Orphaned media reconciliation: finds Tencent VOD files that no document
+# references and reports them, or queues them in the deletion outbox.
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from core.config import settings
+from core.database import media_deletion_outbox_collection, media_reconciliation_runs_collection
+from helper_function.tencent_client import get_vod_client
+from helper_function.media_deletion import deletion_executor
+from helper_function.media_outbox import enqueue_media_deletions
+from helper_function.media_blobs import forget_untouched_blobs
+from helper_function.media_references import REFERENCE_SOURCES, file_is_referenced
+from tencentcloud.vod.v20180717 import models
+
+logger = logging.getLogger(__name__)
+
+# Media younger than this is never treated as orphaned; it may belong to an
+# upload whose database write has not happened yet
+RECONCILE_GRACE_HOURS = 24
+# Orphans queued for deletion per second, so a large cleanup drains gradually
+RECONCILE_DELETE_RATE = 20
+# Orphan fileIds kept on the run document; the count is always exact
+RECONCILE_REPORT_LIMIT = 1000
+SCAN_BATCH_SIZE = 1000
+VOD_PAGE_SIZE = 100
+
+_run_task = None
+
+class ReferencedFileIds:
+    """Sorted, de-duplicated array of fileIds with bisect membership checks"""
+
+    def __init__(self, file_ids):
+        self._ids = sorted(set(file_ids))
+
+    def __contains__(self, file_id):
+        index = bisect_left(self._ids, file_id)
+        return index < len(self._ids) and self._ids[index] == file_id
+
+    def __len__(self):
+        return len(self._ids)
+
+def _field_values(doc, path):
+    """Values at a dotted path, descending through lists.
+
+    Arrays may mix subdocuments with plain values (ObjectIds, strings);
+    only subdocuments are descended into.
+    """
+    values = [doc]
+    for key in path.split("."):
+        next_values = []
+        for value in values:
+            items = value if isinstance(value, list) else [value]
+            next_values.extend(item.get(key) for item in items if isinstance(item, dict))
+        values = next_values
+    file_ids = []
+    for value in values:
+        # The last key may itself hold an array of fileIds
+        file_ids.extend(value if isinstance(value, list) else [value])
+    return [file_id for file_id in file_ids if isinstance(file_id, str) and file_id]
+
+def document_file_ids(doc, fields):
+    """Every fileId a document holds at the given dotted fields"""
+    file_ids = []
+    for field in fields:
+        file_ids.extend(_field_values(doc, field))
+    return file_ids
+
+async def collect_referenced_file_ids():
+    file_ids = []
+    for collection, fields in REFERENCE_SOURCES:
+        projection = {field: 1 for field in fields}
+        async for doc in collection.find({}, projection).batch_size(SCAN_BATCH_SIZE):
+            file_ids.extend(document_file_ids(doc, fields))
+
+    # Files already waiting in the deletion outbox are not reported twice
+    async for entry in media_deletion_outbox_collection.find({}, {"file_id": 1}):
+        file_ids.append(entry["file_id"])
+    return ReferencedFileIds(file_ids)
+
+class MediaLister(ABC):
+    """Source of VOD media for reconciliation"""
+
+    @abstractmethod
+    def pages(self, created_before: datetime) -> AsyncIterator[list]:
+        """Yield lists of {"file_id", "created_at"} for media created before
+        the given UTC time; implemented as an async generator"""
+
+class StaticMediaLister(MediaLister):
+    """In-memory listing, for running reconciliation locally without Tencent.
+
+    `created_at` values must be timezone-aware UTC datetimes.
+    """
+
+    def __init__(self, media, page_size=VOD_PAGE_SIZE):
+        self.media = list(media)
+        self.page_size = page_size
+
+    async def pages(self, created_before: datetime):
+        eligible = [m for m in self.media if m["created_at"] < created_before]
+        for start in range(0, len(eligible), self.page_size):
+            yield eligible[start:start + self.page_size]
+
+class TencentMediaLister(MediaLister):
+    """Pages through SearchMedia in CreateTime order.
+
+    SearchMedia caps Offset + Limit, so each page starts after the last
+    CreateTime seen instead of using an offset; ids already seen at that
+    boundary timestamp are skipped.
+    """
+
+    def _search(self, after, before):
+        params = models.SearchMediaRequest()
+        params.SubAppId = int(settings.TENCENT_SUB_APP_ID)
+        params.Filters = ["basicInfo"]
+        params.Limit = VOD_PAGE_SIZE
+        sort = models.SortBy()
+        sort.Field = "CreateTime"
+        sort.Order = "Asc"
+        params.Sort = sort
+        time_range = models.TimeRange()
+        time_range.After = after
+        time_range.Before = before
+        params.CreateTime = time_range
+        return get_vod_client().SearchMedia(params)
+
+    async def pages(self, created_before: datetime):
+        if not get_vod_client():
+            raise Exception("Tencent client not initialized")
+        loop = asyncio.get_running_loop()
+        before = created_before.strftime("%Y-%m-%dT%H:%M:%SZ")
+        after = "1970-01-01T00:00:00Z"
+        # Ids already yielded whose CreateTime equals `after` (the range is inclusive)
+        seen_at_boundary = set()
+        while True:
+            response = await loop.run_in_executor(deletion_executor, self._search, after, before)
+            media = [
+                {
+                    "file_id": info.FileId,
+                    "created_at": datetime.fromisoformat(info.BasicInfo.CreateTime.replace("Z", "+00:00")),
+                    "create_time": info.BasicInfo.CreateTime,
+                }
+                for info in response.MediaInfoSet or []
+            ]
+            page = [m for m in media if m["file_id"] not in seen_at_boundary]
+            if page:
+                yield page
+            if len(media) < VOD_PAGE_SIZE:
+                return
+            last_time = media[-1]["create_time"]
+            if last_time != after:
+                after = last_time
+                seen_at_boundary = set()
+            elif not page:
+                logger.warning(f"More than {VOD_PAGE_SIZE} media share CreateTime {after}; stopping listing there")
+                return
+            seen_at_boundary.update(m["file_id"] for m in media if m["create_time"] == last_time)
+
+async def _queue_orphans_throttled(orphans, started_at):
+    """Queue orphans that are still unused; returns how many were queued.
+
+    References were collected before a possibly long listing, so each orphan
+    is checked again right before it is queued. A blob a deduplicated upload
+    acquired after the run started is kept; otherwise nothing references the
+    file, whatever its blob refcount says.
+    """
+    queued = 0
+    for start in range(0, len(orphans), RECONCILE_DELETE_RATE):
+        chunk = orphans[start:start + RECONCILE_DELETE_RATE]
+        unreferenced = [file_id for file_id in chunk if not await file_is_referenced(file_id)]
+        unused = await forget_untouched_blobs(unreferenced, started_at)
+        await enqueue_media_deletions(unused, "reconciliation")
+        queued += len(unused)
+        await asyncio.sleep(1)
+    return queued
+
+async def reconcile_media(lister: MediaLister = None, delete: bool = False, run_id: ObjectId = None):
+    """Diff VOD media against referenced fileIds; returns the run document.
+
+    With `delete`, orphans are queued in the deletion outbox at
+    RECONCILE_DELETE_RATE per second (`queued` counts those still unused by
+    then); otherwise they are only reported.
+    """
+    lister = lister or TencentMediaLister()
+    run_id = run_id or ObjectId()
+    started_at = datetime.now()
+    created_before = datetime.now(timezone.utc) - timedelta(hours=RECONCILE_GRACE_HOURS)
+    run = {
+        "_id": run_id,
+        "status": "running",
+        "delete": delete,
+        "started_at": started_at,
+        "created_before": created_before,
+        "scanned": 0,
+        "referenced": 0,
+        "orphan_count": 0,
+        "orphans": [],
+    }
+    await media_reconciliation_runs_collection.replace_one({"_id": run_id}, run, upsert=True)
+
+    try:
+        referenced = await collect_referenced_file_ids()
+        run["referenced"] = len(referenced)
+        orphans = []
+        async for page in lister.pages(created_before):
+            run["scanned"] += len(page)
+            orphans.extend(m["file_id"] for m in page if m["file_id"] not in referenced)
+            await media_reconciliation_runs_collection.update_one(
+                {"_id": run_id}, {"$set": {"scanned": run["scanned"], "orphan_count": len(orphans)}}
+            )
+
+        run.update({"orphan_count": len(orphans), "orphans": orphans[:RECONCILE_REPORT_LIMIT]})
+        if delete and orphans:
+            await media_reconciliation_runs_collection.update_one(
+                {"_id": run_id}, {"$set": {"status": "queueing", "orphan_count": len(orphans)}}
+            )
+            run["queued"] = await _queue_orphans_throttled(orphans, started_at)
+        run.update({"status": "completed", "finished_at": datetime.now()})
+        logger.info(f"Media reconciliation {run_id}: {run['scanned']} scanned, {len(orphans)} orphans")
+    except Exception as e:
+        logger.error(f"Media reconciliation {run_id} failed: {e}")
+        run.update({"status": "failed", "error": str(e), "finished_at": datetime.now()})
+
+    await media_reconciliation_runs_collection.replace_one({"_id": run_id}, run)
+    return run
+
+async def start_reconciliation(delete: bool = False):
+    """Start a reconciliation run in the background; None if one is already running here"""
+    global _run_task
+    if _run_task and not _run_task.done():
+        return None
+    run_id = ObjectId()
+    _run_task = asyncio.create_task(reconcile_media(delete=delete, run_id=run_id))
+    return run_id
+
+def format_run(run):
+    formatted = {key: value for key, value in run.items() if key != "_id"}
+    formatted["run_id"] = str(run["_id"])
+    for key in ("started_at", "finished_at", "created_before"):
+        if key in formatted:
+            formatted[key] = formatted[key].isoformat()
+    return formatted
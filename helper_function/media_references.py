@@ -0,0 +1,29 @@
+# Where Tencent fileIds are referenced from MongoDB. Shared by orphan
+# reconciliation (full scans) and the deletion outbox (single-file checks).
+from core.database import (
+    courses_collection, courses_videos_collection, course_intro_video_collection, categories_collection,
+    upload_jobs_collection,
+)
+
+# Collections and the (dotted) fields that hold Tencent fileIds
+REFERENCE_SOURCES = (
+    # `videos` mixes lecture document ids with legacy embedded {fileId, videoUrl}
+    # entries, and older courses nest lecture videos under `lessons`
+    (courses_collection, (
+        "images.fileId", "images.variants.fileId", "intro_videos.fileId",
+        "videos.fileId", "lessons.videos.fileId",
+    )),
+    (courses_videos_collection, ("fileId", "videos.fileId")),
+    (course_intro_video_collection, ("fileId", "file_id", "FileId")),
+    (categories_collection, ("image.fileId", "image.variants.fileId", "image_url.fileId", "image_url.variants.fileId")),
+    # Files an upload job produced but may not have attached yet
+    (upload_jobs_collection, ("result.file_id",)),
+)
+
+async def file_is_referenced(file_id: str) -> bool:
+    """Whether any document still points at a Tencent file (unindexed; use sparingly)"""
+    for collection, fields in REFERENCE_SOURCES:
+        query = {"$or": [{field: file_id} for field in fields]}
+        if await collection.find_one(query, {"_id": 1}):
+            return True
+    return False
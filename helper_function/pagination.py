@@ -0,0 +1,76 @@
+import time
+import base64
+import binascii
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+# How long an estimated_document_count result is reused
+ESTIMATED_COUNT_TTL_SECONDS = 60
+
+# Page size used in cursor mode when the client passes `after` without `limit`
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+_estimated_counts = {}
+
+def encode_cursor(last_id: ObjectId) -> str:
+    """Build the opaque `after` token pointing just past `last_id`"""
+    payload = orjson.dumps({"id": str(last_id)})
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(token: str) -> ObjectId:
+    """Turn an `after` token back into the _id to resume from"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = orjson.loads(base64.urlsafe_b64decode(padded))
+        return ObjectId(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def validate_limit(limit: int) -> int:
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    return limit
+
+def keyset_query(query: dict, after: str = None) -> dict:
+    """Add the `_id > cursor` condition for `after` to a query"""
+    if not after:
+        return dict(query)
+    return {**query, "_id": {"$gt": decode_cursor(after)}}
+
+def build_keyset_page(docs: list, limit: int):
+    """Trim a limit+1 fetch to `limit` documents and work out the next cursor.
+
+    Returns (docs, next_cursor, has_next).
+    """
+    has_next = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor(docs[-1]["_id"]) if has_next and docs else None
+    return docs, next_cursor, has_next
+
+def keyset_cursor(collection, query: dict, after: str = None, projection: dict = None, limit: int = None):
+    """Motor cursor over `query` in `_id` order, starting after the `after` token"""
+    cursor = collection.find(keyset_query(query, after), projection).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+async def fetch_keyset_page(collection, query: dict, limit: int, after: str = None, projection: dict = None):
+    """Fetch one `_id`-ordered page, reading limit+1 rows to learn whether more exist.
+
+    Returns (docs, next_cursor, has_next).
+    """
+    cursor = keyset_cursor(collection, query, after, projection, limit + 1)
+    docs = await cursor.to_list(length=limit + 1)
+    return build_keyset_page(docs, limit)
+
+async def get_estimated_count(collection) -> int:
+    """Collection size from metadata, cached for ESTIMATED_COUNT_TTL_SECONDS"""
+    cached = _estimated_counts.get(collection.name)
+    if cached and time.monotonic() - cached[1] < ESTIMATED_COUNT_TTL_SECONDS:
+        return cached[0]
+    count = await collection.estimated_document_count()
+    _estimated_counts[collection.name] = (count, time.monotonic())
+    return count
@@ -0,0 +1,95 @@
+import asyncio
+import time
+import logging
+from core.database import categories_collection, languages_collection, instructors_collection
+from helper_function.change_stream_watcher import watch_collection
+
+logger = logging.getLogger(__name__)
+
+# Reference kinds served from memory
+REFERENCE_COLLECTIONS = {
+    "categories": categories_collection,
+    "languages": languages_collection,
+    "instructors": instructors_collection,
+}
+
+# Used only while no change stream is keeping a kind coherent
+REFERENCE_CACHE_TTL_SECONDS = 300
+
+_entries = {}
+_watched = set()
+_watch_tasks = []
+_locks = {kind: asyncio.Lock() for kind in REFERENCE_COLLECTIONS}
+
+async def _load(kind):
+    """Read one reference collection (id, name, status) into memory"""
+    collection = REFERENCE_COLLECTIONS[kind]
+    references = {}
+    async for doc in collection.find({}, {"name": 1, "status": 1}):
+        references[doc["_id"]] = {"name": doc.get("name"), "status": doc.get("status")}
+
+    _entries[kind] = {
+        "references": references,
+        "active": frozenset(ref_id for ref_id, ref in references.items() if ref["status"] is True),
+        "loaded_at": time.monotonic(),
+    }
+    logger.info(f"Reference cache loaded {len(references)} {kind}")
+    return _entries[kind]
+
+def _is_stale(entry, kind):
+    if kind in _watched:
+        return False
+    return time.monotonic() - entry["loaded_at"] > REFERENCE_CACHE_TTL_SECONDS
+
+async def _get_entry(kind):
+    entry = _entries.get(kind)
+    if entry is not None and not _is_stale(entry, kind):
+        return entry
+    async with _locks[kind]:
+        entry = _entries.get(kind)
+        if entry is None or _is_stale(entry, kind):
+            entry = await _load(kind)
+    return entry
+
+async def get_references(kind):
+    """Return the cached id -> {name, status} mapping for a reference kind"""
+    return (await _get_entry(kind))["references"]
+
+async def get_active_reference_ids(kind):
+    """Return the ids of references whose status is True"""
+    return (await _get_entry(kind))["active"]
+
+async def invalidate_reference_cache(kind):
+    """Reload a reference kind after it was written to"""
+    async with _locks[kind]:
+        await _load(kind)
+
+async def _watch(kind):
+    async def on_change(change):
+        await invalidate_reference_cache(kind)
+
+    async def on_ready():
+        # Stream (re)opened: pick up anything written while it was down
+        _watched.add(kind)
+        await invalidate_reference_cache(kind)
+
+    def on_lost():
+        _watched.discard(kind)
+
+    await watch_collection(REFERENCE_COLLECTIONS[kind], on_change, on_ready=on_ready, on_lost=on_lost)
+    logger.info(f"Reference cache for {kind} falls back to a {REFERENCE_CACHE_TTL_SECONDS}s TTL")
+
+async def start_reference_cache():
+    """Warm the cache and start one change stream watcher per reference kind"""
+    for kind in REFERENCE_COLLECTIONS:
+        try:
+            await invalidate_reference_cache(kind)
+        except Exception as e:
+            logger.error(f"Reference cache warm-up failed for {kind}: {e}")
+        _watch_tasks.append(asyncio.create_task(_watch(kind)))
+
+async def stop_reference_cache():
+    for task in _watch_tasks:
+        task.cancel()
+    await asyncio.gather(*_watch_tasks, return_exceptions=True)
+    _watch_tasks.clear()
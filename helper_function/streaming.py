@@ -0,0 +1,72 @@
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from helper_function.pagination import validate_limit
+
+# Supported `?stream=` values and their content types
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+# Documents pulled from the Motor cursor (and written to the socket) per batch
+STREAM_BATCH_SIZE = 500
+
+def _json_default(obj):
+    # ObjectId and any other BSON type orjson does not serialise natively
+    return str(obj)
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=_json_default)
+
+def validate_stream_format(stream: str) -> str:
+    if stream not in STREAM_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"stream must be one of: {', '.join(STREAM_MEDIA_TYPES)}"
+        )
+    return stream
+
+def validate_stream_limit(limit):
+    """Check a streamed `limit` like a page size; None streams every document"""
+    return None if limit is None else validate_limit(limit)
+
+async def _iter_batches(cursor, batch_size: int):
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _encode(cursor, transform, stream_format, prepare_batch, batch_size):
+    first = True
+    if stream_format == "json":
+        yield b"["
+    async for batch in _iter_batches(cursor, batch_size):
+        if prepare_batch:
+            await prepare_batch(batch)
+        items = [dumps(transform(doc)) for doc in batch]
+        if stream_format == "ndjson":
+            yield b"\n".join(items) + b"\n"
+        else:
+            chunk = b",".join(items)
+            yield chunk if first else b"," + chunk
+        first = False
+    if stream_format == "json":
+        yield b"]"
+
+def stream_documents(cursor, transform, stream_format: str, prepare_batch=None, batch_size: int = STREAM_BATCH_SIZE):
+    """Stream a Motor cursor to the client as NDJSON or a chunked JSON array.
+
+    Documents are read `batch_size` at a time, passed through the optional
+    async `prepare_batch(batch)` hook (e.g. reference validation), converted
+    with `transform(doc)` and serialised with orjson, so memory stays bounded
+    by one batch whatever the result size.
+    """
+    return StreamingResponse(
+        _encode(cursor, transform, stream_format, prepare_batch, batch_size),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+    )
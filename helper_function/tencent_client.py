@@ -0,0 +1,82 @@
+# Shared Tencent Cloud clients: one VOD API client with keep-alive and one
+# pooled HTTP session for COS, built once and safe to use from upload threads.
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.config import settings, upload_settings
+from tencentcloud.vod.v20180717 import vod_client
+from tencentcloud.common import credential
+from tencentcloud.common.profile.client_profile import ClientProfile
+from tencentcloud.common.profile.http_profile import HttpProfile
+from qcloud_cos import CosConfig, CosS3Client
+
+logger = logging.getLogger(__name__)
+
+# A temporary certificate is not used for a new request this close to its expiry
+CERTIFICATE_EXPIRY_MARGIN_SECONDS = 120
+# COS request timeout for large multipart uploads
+COS_TIMEOUT_SECONDS = 1800
+
+_lock = threading.Lock()
+_vod_client = None
+_cos_session = None
+
+def get_vod_client():
+    """Shared VodClient, or None if it cannot be initialized"""
+    global _vod_client
+    if _vod_client is None:
+        with _lock:
+            if _vod_client is None:
+                try:
+                    cred = credential.Credential(settings.TENCENT_SECRET_ID, settings.TENCENT_SECRET_KEY)
+                    http_profile = HttpProfile(endpoint="vod.tencentcloudapi.com", keepAlive=True)
+                    _vod_client = vod_client.VodClient(cred, settings.TENCENT_REGION, ClientProfile(httpProfile=http_profile))
+                except Exception as e:
+                    logger.error(f"Tencent client initialization failed: {e}")
+    return _vod_client
+
+def _get_cos_session():
+    global _cos_session
+    if _cos_session is None:
+        with _lock:
+            if _cos_session is None:
+                retry_strategy = Retry(
+                    total=5,
+                    backoff_factor=2,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
+                )
+                # Enough connections for every part thread of every concurrent upload
+                pool_size = upload_settings.UPLOAD_PART_THREADS * upload_settings.UPLOAD_CONCURRENCY
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry_strategy)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _cos_session = session
+    return _cos_session
+
+def certificate_is_fresh(temp_certificate) -> bool:
+    """True while a TempCertificate is safe to start another request with"""
+    expires_at = getattr(temp_certificate, "ExpiredTime", None)
+    if not expires_at:
+        return False
+    return time.time() < expires_at - CERTIFICATE_EXPIRY_MARGIN_SECONDS
+
+def get_cos_client(region: str, temp_certificate, timeout=COS_TIMEOUT_SECONDS):
+    """COS client for an ApplyUpload certificate, on the shared connection pool.
+
+    Clients are cheap once the session is shared; the certificate is scoped
+    to a single ApplyUpload, so callers keep the client for that upload.
+    """
+    cos_config = CosConfig(
+        Region=region,
+        SecretId=temp_certificate.SecretId,
+        SecretKey=temp_certificate.SecretKey,
+        Token=temp_certificate.Token,
+        Timeout=timeout,
+        Scheme='https'
+    )
+    return CosS3Client(cos_config, session=_get_cos_session())
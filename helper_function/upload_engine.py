@@ -0,0 +1,129 @@
+# Streaming media upload engine: spools incoming files to disk in bounded
+# chunks and runs blocking Tencent/COS work on a dedicated thread pool.
+import os
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import UploadFile
+from core.config import upload_settings
+from helper_function.media_blobs import new_content_hasher
+
+logger = logging.getLogger(__name__)
+
+# Dedicated, size-limited pool so uploads never starve the default executor
+upload_executor = ThreadPoolExecutor(
+    max_workers=upload_settings.UPLOAD_EXECUTOR_WORKERS,
+    thread_name_prefix="media-upload",
+)
+
+# Bounds how many files are uploaded at once, across all requests in this worker
+upload_semaphore = asyncio.Semaphore(upload_settings.UPLOAD_CONCURRENCY)
+
+class MediaUploadError(Exception):
+    """Raised when any file of a concurrent upload batch fails; carries per-file results"""
+
+    def __init__(self, results):
+        self.results = results
+        failed = [r["filename"] for r in results if r["status"] == "failed"]
+        super().__init__(f"Failed to upload: {', '.join(failed)}")
+
+class SpooledUpload:
+    """An uploaded file copied to a local temp file, with its content hash"""
+
+    def __init__(self, path: str, size: int, filename: str, content_hash: str = None):
+        self.path = path
+        self.size = size
+        self.filename = filename
+        self.content_hash = content_hash
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove spooled upload {self.path}: {e}")
+
+async def run_in_upload_executor(func, *args):
+    """Run blocking upload work on the dedicated upload pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(upload_executor, func, *args)
+
+def _spool_to_disk(source, filename: str):
+    suffix = os.path.splitext(filename or "")[1]
+    with tempfile.NamedTemporaryFile(
+        mode="wb", suffix=suffix, dir=upload_settings.UPLOAD_SPOOL_DIR, delete=False
+    ) as target:
+        # Hashed while copying so deduplication costs no extra read of the file
+        hasher = new_content_hasher()
+        try:
+            for chunk in iter(lambda: source.read(upload_settings.UPLOAD_COPY_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                target.write(chunk)
+        except BaseException:
+            target.close()
+            os.remove(target.name)
+            raise
+        return target.name, target.tell(), hasher.hexdigest()
+
+async def spool_upload_file(upload: UploadFile) -> SpooledUpload:
+    """Copy an UploadFile to a named temp file, chunk by chunk, off the event loop"""
+    await upload.seek(0)
+    path, size, digest = await run_in_upload_executor(_spool_to_disk, upload.file, upload.filename)
+    logger.info(f"Spooled {upload.filename} ({size} bytes) to {path}")
+    return SpooledUpload(path, size, upload.filename, digest)
+
+async def _upload_one(field, filename, upload):
+    async with upload_semaphore:
+        try:
+            return {"field": field, "filename": filename, "status": "uploaded", "result": await upload()}
+        except Exception as e:
+            logger.error(f"Upload of {filename} failed: {e}")
+            return {"field": field, "filename": filename, "status": "failed", "error": str(e)}
+
+async def upload_concurrently(jobs, rollback):
+    """Run uploads concurrently under upload_semaphore.
+
+    `jobs` is a list of (field, filename, upload) where `upload` is a
+    zero-argument coroutine function returning a dict with a "file_id" (and
+    optionally image "variants"). Results come back in job order. If any
+    upload fails, every file that did upload is removed with
+    `rollback(file_id)` and MediaUploadError is raised with the per-file
+    outcome.
+    """
+    results = await asyncio.gather(*(_upload_one(*job) for job in jobs))
+    if all(r["status"] == "uploaded" for r in results):
+        return results
+
+    uploaded = [r for r in results if r["status"] == "uploaded" and _uploaded_file_ids(r["result"])]
+    outcomes = await asyncio.gather(*(
+        asyncio.gather(*(rollback(file_id) for file_id in _uploaded_file_ids(r["result"])), return_exceptions=True)
+        for r in uploaded
+    ))
+    for r, outcome in zip(uploaded, outcomes):
+        r["status"] = "rolled_back" if all(o is True for o in outcome) else "rollback_failed"
+    raise MediaUploadError(results)
+
+def uploaded_file_ids(results):
+    """Every Tencent fileId (originals and image variants) an upload batch produced"""
+    return [
+        file_id
+        for r in results if r["status"] == "uploaded"
+        for file_id in _uploaded_file_ids(r["result"])
+    ]
+
+def _uploaded_file_ids(result):
+    file_ids = [result.get("file_id")]
+    file_ids.extend(variant.get("fileId") for variant in result.get("variants") or [])
+    return [file_id for file_id in file_ids if file_id]
+
+def upload_failure_detail(error: MediaUploadError):
+    """Per-file report for an HTTP error response"""
+    return {
+        "message": str(error),
+        "files": [
+            {key: r[key] for key in ("field", "filename", "status", "error") if key in r}
+            for r in error.results
+        ]
+    }
@@ -0,0 +1,266 @@
+# Background upload jobs: HTTP handlers stage the file on disk and enqueue a
+# job; worker tasks upload it to Tencent VOD and attach it to the course.
+import os
+import uuid
+import asyncio
+import logging
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from core.config import upload_settings
+from core.database import upload_jobs_collection, upload_sessions_collection, courses_videos_collection
+from helper_function.video_upload import upload_video_deduplicated, upload_progress
+from helper_function.upload_engine import run_in_upload_executor
+from helper_function.media_blobs import file_content_hash
+from helper_function.course_detail_cache import invalidate_course_detail
+from helper_function.course_videos import add_course_video_once
+
+logger = logging.getLogger(__name__)
+
+# Workers poll at this interval when idle, so jobs queued by other processes are picked up
+JOB_POLL_SECONDS = 5
+# A running job's updated_at is touched this often, so it never looks stale while alive
+JOB_HEARTBEAT_SECONDS = 60
+# Failed attempts are retried after this delay, doubling each time
+JOB_RETRY_BASE_SECONDS = 30
+
+_job_available = asyncio.Event()
+_workers = []
+
+def format_job(job):
+    return {
+        "job_id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "course_id": job["course_id"],
+        "progress": job["progress"],
+        "result": job.get("result"),
+        "video_id": str(job["video_id"]) if job.get("video_id") else None,
+        "error": job.get("error"),
+        "attempts": job["attempts"],
+        "created_at": job["created_at"].strftime("%Y-%m-%d %H:%M:%S"),
+        "updated_at": job["updated_at"].strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+async def enqueue_course_video_job(course_id: str, source_path: str, filename: str, video: dict,
+                                   upload_session_id: str = None, content_hash: str = None):
+    """Queue a staged file for upload as a course video.
+
+    `source_path` is removed once the job completes. Files of a resumable
+    upload session are kept on failure so finalize can be retried. Without
+    a `content_hash` the worker hashes the file before uploading.
+    """
+    now = datetime.now()
+    job = {
+        "_id": ObjectId(),
+        "kind": "course_video",
+        "status": "queued",
+        "filename": filename,
+        "source_path": source_path,
+        "course_id": course_id,
+        "video": video,
+        "upload_session_id": upload_session_id,
+        "content_hash": content_hash,
+        "progress": {"consumed_bytes": 0, "total_bytes": os.path.getsize(source_path), "percent": 0},
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    await upload_jobs_collection.insert_one(job)
+    _job_available.set()
+    return job
+
+async def get_upload_job(job_id: str):
+    if not ObjectId.is_valid(job_id):
+        return None
+    return await upload_jobs_collection.find_one({"_id": ObjectId(job_id)})
+
+def _progress_reporter(job_id, loop):
+    """Build a COS progress callback that also records progress on the job.
+
+    COS calls it from upload threads; the database write is scheduled on the
+    event loop and only issued when the whole percentage changes.
+    """
+    last_percent = [-1]
+
+    def report(consumed_bytes, total_bytes):
+        upload_progress(consumed_bytes, total_bytes)
+        percent = int(100 * consumed_bytes / total_bytes) if total_bytes else 0
+        if percent == last_percent[0]:
+            return
+        last_percent[0] = percent
+        progress = {"consumed_bytes": consumed_bytes, "total_bytes": total_bytes, "percent": percent}
+        asyncio.run_coroutine_threadsafe(
+            upload_jobs_collection.update_one(
+                {"_id": job_id, "status": "running"},
+                {"$set": {"progress": progress, "updated_at": datetime.now()}}
+            ),
+            loop
+        )
+
+    return report
+
+async def _claim_job():
+    """Atomically take the oldest due queued job, or a running one that went stale.
+
+    Each claim gets a fresh token; writes made for a job are conditioned on
+    it, so a worker whose job was taken over cannot overwrite the new run.
+    """
+    now = datetime.now()
+    stale_before = now - timedelta(minutes=upload_settings.UPLOAD_JOB_STALE_MINUTES)
+    return await upload_jobs_collection.find_one_and_update(
+        {"$or": [
+            # Jobs queued before next_attempt_at existed are due at once
+            {"status": "queued", "next_attempt_at": {"$not": {"$gt": now}}},
+            {"status": "running", "updated_at": {"$lt": stale_before}},
+        ]},
+        {"$set": {"status": "running", "claim": uuid.uuid4().hex, "updated_at": now}, "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def _claimed(job):
+    return {"_id": job["_id"], "claim": job["claim"]}
+
+async def _heartbeat(job):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            await upload_jobs_collection.update_one(
+                {**_claimed(job), "status": "running"}, {"$set": {"updated_at": datetime.now()}}
+            )
+        except Exception as e:
+            logger.warning(f"Upload job {job['_id']} heartbeat failed: {e}")
+
+async def _attach_course_video(job, tencent_result):
+    """Insert the lecture and add it to the course; safe to repeat for the same job"""
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    video_id = job.get("video_id")
+    if video_id is None:
+        # The id is recorded before inserting, so a retried job reuses the same lecture
+        video_id = ObjectId()
+        await upload_jobs_collection.update_one(_claimed(job), {"$set": {"video_id": video_id}})
+    video_obj = {
+        "_id": video_id,
+        **job["video"],
+        "fileId": tencent_result["file_id"],
+        "videoUrl": tencent_result["video_url"],
+        "type": "video",
+        "uploaded_at": current_time,
+        "course_id": job["course_id"]
+    }
+    try:
+        await courses_videos_collection.insert_one(video_obj)
+    except DuplicateKeyError:
+        pass  # Inserted by an earlier attempt of this job
+    await add_course_video_once(job["course_id"], video_id, current_time)
+    invalidate_course_detail(job["course_id"])
+    if job.get("upload_session_id"):
+        await upload_sessions_collection.update_one(
+            {"_id": ObjectId(job["upload_session_id"])},
+            {"$set": {"status": "completed", "video_id": str(video_id), "updated_at": datetime.now()}}
+        )
+    return {**tencent_result, "video_id": str(video_id)}
+
+async def _fail_job(job, error):
+    now = datetime.now()
+    if job["attempts"] < upload_settings.UPLOAD_JOB_MAX_ATTEMPTS:
+        delay = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+        logger.warning(f"Upload job {job['_id']} attempt {job['attempts']} failed, retrying in {delay}s: {error}")
+        await upload_jobs_collection.update_one(
+            _claimed(job),
+            {"$set": {
+                "status": "queued",
+                "error": error,
+                "next_attempt_at": now + timedelta(seconds=delay),
+                "updated_at": now,
+            }}
+        )
+        return
+
+    logger.error(f"Upload job {job['_id']} failed after {job['attempts']} attempts: {error}")
+    await upload_jobs_collection.update_one(
+        _claimed(job), {"$set": {"status": "failed", "error": error, "updated_at": now}}
+    )
+    if job.get("upload_session_id"):
+        # The staged file is kept so the client can finalize again
+        await upload_sessions_collection.update_one(
+            {"_id": ObjectId(job["upload_session_id"])},
+            {"$set": {"status": "uploading", "updated_at": now}}
+        )
+    else:
+        _remove_source(job["source_path"])
+
+async def _run_job(job):
+    loop = asyncio.get_running_loop()
+    logger.info(f"Running upload job {job['_id']} ({job['filename']}), attempt {job['attempts']}")
+    heartbeat = asyncio.create_task(_heartbeat(job))
+    try:
+        tencent_result = job.get("result")
+        if not tencent_result:
+            path = job["source_path"]
+            # Resumable session parts are written at arbitrary offsets, so they are hashed here
+            digest = job.get("content_hash") or await run_in_upload_executor(file_content_hash, path)
+            tencent_result = await upload_video_deduplicated(
+                path, os.path.getsize(path), digest, _progress_reporter(job["_id"], loop)
+            )
+            # Recorded before attaching, so a retry attaches this file instead of uploading again
+            await upload_jobs_collection.update_one(_claimed(job), {"$set": {"result": tencent_result}})
+        result = await _attach_course_video(job, tencent_result)
+    except Exception as e:
+        await _fail_job(job, str(e))
+        return
+    finally:
+        heartbeat.cancel()
+
+    _remove_source(job["source_path"])
+    total = job["progress"]["total_bytes"]
+    await upload_jobs_collection.update_one(
+        _claimed(job),
+        {"$set": {
+            "status": "completed",
+            "result": result,
+            "progress": {"consumed_bytes": total, "total_bytes": total, "percent": 100},
+            "updated_at": datetime.now()
+        }}
+    )
+    logger.info(f"Upload job {job['_id']} completed: {result['file_id']}")
+
+def _remove_source(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove upload source {path}: {e}")
+
+async def _worker(number):
+    while True:
+        try:
+            job = await _claim_job()
+        except Exception as e:
+            logger.error(f"Upload worker {number} could not claim a job: {e}")
+            job = None
+        if job:
+            await _run_job(job)
+            continue
+        _job_available.clear()
+        try:
+            await asyncio.wait_for(_job_available.wait(), timeout=JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+async def start_upload_jobs():
+    # Jobs left queued, or running by a process that died, are claimed on the first poll
+    for number in range(upload_settings.UPLOAD_JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker(number)))
+
+async def stop_upload_jobs():
+    # Interrupted jobs stay "running" and are taken over once their heartbeat goes stale
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,119 @@
+# Local on-disk stand-in for an object store: holds the parts of resumable
+# upload sessions until they are finalized and handed to Tencent VOD.
+import os
+import asyncio
+import logging
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from core.config import upload_settings
+from core.database import upload_sessions_collection
+
+logger = logging.getLogger(__name__)
+
+SESSION_DIR = upload_settings.UPLOAD_SESSION_DIR or os.path.join(tempfile.gettempdir(), "upload_sessions")
+
+# Chunk writes get their own pool so they never queue behind hour-long
+# Tencent uploads on the upload executor
+session_io_executor = ThreadPoolExecutor(
+    max_workers=upload_settings.UPLOAD_SESSION_IO_WORKERS,
+    thread_name_prefix="upload-session-io",
+)
+
+_sweeper_task = None
+
+async def _run_io(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(session_io_executor, func, *args)
+
+def session_part_path(upload_id: str) -> str:
+    return os.path.join(SESSION_DIR, f"{upload_id}.part")
+
+def _create(path: str):
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    open(path, "wb").close()
+
+def _write_at(path: str, offset: int, data: bytes):
+    with open(path, "r+b") as part:
+        part.seek(offset)
+        part.write(data)
+
+def _truncate(path: str, size: int):
+    with open(path, "r+b") as part:
+        part.truncate(size)
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def create_part_file(upload_id: str) -> str:
+    path = session_part_path(upload_id)
+    await _run_io(_create, path)
+    return path
+
+async def write_chunk(path: str, offset: int, body, max_bytes: int) -> int:
+    """Write a streamed request body at `offset`; returns the number of bytes written.
+
+    Anything past the last committed offset (left by an interrupted chunk) is
+    discarded first. The body is buffered up to UPLOAD_COPY_CHUNK_SIZE before
+    each disk write, so memory stays bounded however large the chunk is.
+    """
+    await _run_io(_truncate, path, offset)
+    written = 0
+    buffer = bytearray()
+    async for data in body:
+        written += len(data)
+        if written > max_bytes:
+            raise ValueError(f"Chunk exceeds {max_bytes} bytes")
+        buffer.extend(data)
+        if len(buffer) >= upload_settings.UPLOAD_COPY_CHUNK_SIZE:
+            await _run_io(_write_at, path, offset + written - len(buffer), bytes(buffer))
+            buffer.clear()
+    if buffer:
+        await _run_io(_write_at, path, offset + written - len(buffer), bytes(buffer))
+    return written
+
+async def remove_part_file(path: str):
+    await _run_io(_remove, path)
+
+async def sweep_expired_sessions():
+    """Delete sessions that expired while uploading, with their part files"""
+    removed = 0
+    expired = upload_sessions_collection.find(
+        {"status": "uploading", "expires_at": {"$lt": datetime.now()}}, {"_id": 1}
+    )
+    async for session in expired:
+        # Re-checked in the delete, so a session finalized meanwhile is kept
+        session = await upload_sessions_collection.find_one_and_delete(
+            {"_id": session["_id"], "status": "uploading", "expires_at": {"$lt": datetime.now()}},
+            projection={"path": 1}
+        )
+        if session:
+            await remove_part_file(session["path"])
+            removed += 1
+    if removed:
+        logger.info(f"Removed {removed} expired upload sessions")
+    return removed
+
+async def _sweeper():
+    while True:
+        try:
+            await sweep_expired_sessions()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Upload session sweep failed: {e}")
+        await asyncio.sleep(upload_settings.UPLOAD_SESSION_SWEEP_MINUTES * 60)
+
+async def start_upload_session_sweeper():
+    global _sweeper_task
+    _sweeper_task = asyncio.create_task(_sweeper())
+
+async def stop_upload_session_sweeper():
+    global _sweeper_task
+    if _sweeper_task:
+        _sweeper_task.cancel()
+        await asyncio.gather(_sweeper_task, return_exceptions=True)
+        _sweeper_task = None
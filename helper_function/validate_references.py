@@ -1,100 +1,100 @@
 from bson import ObjectId
-from core.database import categories_collection, languages_collection, instructors_collection, courses_collection
+from pymongo import UpdateOne
+from core.database import courses_collection
+from helper_function.reference_cache import get_active_reference_ids
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def validate_course_references(course):
-    """Validate and filter invalid references in course data and update database"""
-    
+# Course reference field -> reference cache kind holding the referenced documents
+REFERENCE_FIELDS = {
+    "category_id": "categories",
+    "language_id": "languages",
+    "instructor_id": "instructors",
+}
+
+def _to_object_id(ref_id):
+    """Normalise a stored reference (string or ObjectId) to an ObjectId"""
+    if isinstance(ref_id, str):
+        return ObjectId(ref_id)
+    return ref_id
+
+def request_lookup_cache(request):
+    """Return the reference lookup cache shared by everything handling `request`"""
+    if request is None:
+        return {}
+    cache = getattr(request.state, "reference_lookup_cache", None)
+    if cache is None:
+        cache = {}
+        request.state.reference_lookup_cache = cache
+    return cache
+
+async def resolve_valid_references(lookup_cache=None):
+    """Resolve the active category, language and instructor ids.
+
+    Ids come from the in-process reference cache, so no query is issued.
+    `lookup_cache` is a dict shared across calls within a request: it pins one
+    snapshot of the active ids so every course in the request is validated
+    against the same state.
+    """
+    if lookup_cache is None:
+        lookup_cache = {}
+
+    for field, kind in REFERENCE_FIELDS.items():
+        if field not in lookup_cache:
+            lookup_cache[field] = {"valid": await get_active_reference_ids(kind)}
+
+    return lookup_cache
+
+def _clean_course_references(course, lookup_cache):
+    """Filter invalid references in place, returning the $set payload if anything changed"""
     course_updated = False
-    original_categories = course.get("category_id", [])
-    original_languages = course.get("language_id", [])
-    original_instructors = course.get("instructor_id", [])
-    
-    # Validate category_id (handle both array and single value)
-    if "category_id" in course and course["category_id"]:
-        if isinstance(course["category_id"], list):
-            valid_categories = []
-            for cat_id in course["category_id"]:
-                if isinstance(cat_id, str):
-                    cat_id = ObjectId(cat_id)
-                exists = await categories_collection.find_one({"_id": cat_id, "status": True})
-                logger.info(f"Checking category {cat_id}: exists={bool(exists)}")
-                if exists:
-                    valid_categories.append(cat_id)
-            if len(valid_categories) != len(course["category_id"]):
-                course_updated = True
-            course["category_id"] = valid_categories
-        else:
-            # Single value - validate and keep or remove
-            cat_id = course["category_id"]
-            if isinstance(cat_id, str):
-                cat_id = ObjectId(cat_id)
-            exists = await categories_collection.find_one({"_id": cat_id, "status": True})
-            if not exists:
-                course["category_id"] = None
-                course_updated = True
-    
-    # Validate language_id (handle both array and single value)
-    if "language_id" in course and course["language_id"]:
-        if isinstance(course["language_id"], list):
-            valid_languages = []
-            for lang_id in course["language_id"]:
-                if isinstance(lang_id, str):
-                    lang_id = ObjectId(lang_id)
-                exists = await languages_collection.find_one({"_id": lang_id, "status": True})
-                if exists:
-                    valid_languages.append(lang_id)
-            if len(valid_languages) != len(course["language_id"]):
-                course_updated = True
-            course["language_id"] = valid_languages
-        else:
-            # Single value - validate and keep or remove
-            lang_id = course["language_id"]
-            if isinstance(lang_id, str):
-                lang_id = ObjectId(lang_id)
-            exists = await languages_collection.find_one({"_id": lang_id, "status": True})
-            if not exists:
-                course["language_id"] = None
-                course_updated = True
-    
-    # Validate instructor_id (handle both array and single value)
-    if "instructor_id" in course and course["instructor_id"]:
-        if isinstance(course["instructor_id"], list):
-            valid_instructors = []
-            for inst_id in course["instructor_id"]:
-                if isinstance(inst_id, str):
-                    inst_id = ObjectId(inst_id)
-                exists = await instructors_collection.find_one({"_id": inst_id, "status": True})
-                if exists:
-                    valid_instructors.append(inst_id)
-            if len(valid_instructors) != len(course["instructor_id"]):
+
+    for field in REFERENCE_FIELDS:
+        if field not in course or not course[field]:
+            continue
+        valid_ids = lookup_cache[field]["valid"]
+
+        if isinstance(course[field], list):
+            valid_refs = [ref_id for ref_id in map(_to_object_id, course[field]) if ref_id in valid_ids]
+            if len(valid_refs) != len(course[field]):
                 course_updated = True
-            course["instructor_id"] = valid_instructors
+            course[field] = valid_refs
         else:
             # Single value - validate and keep or remove
-            inst_id = course["instructor_id"]
-            if isinstance(inst_id, str):
-                inst_id = ObjectId(inst_id)
-            exists = await instructors_collection.find_one({"_id": inst_id, "status": True})
-            if not exists:
-                course["instructor_id"] = None
+            if _to_object_id(course[field]) not in valid_ids:
+                course[field] = None
                 course_updated = True
-    
+
+    if not course_updated:
+        return None
+    return {field: course[field] for field in REFERENCE_FIELDS if field in course}
+
+async def validate_courses_references(courses, lookup_cache=None):
+    """Validate and filter invalid references for a page of courses.
+
+    Referenced ids are checked against the reference cache and the courses
+    that needed cleaning are written back with a single bulk_write.
+    """
+    if not courses:
+        return courses
+
+    lookup_cache = await resolve_valid_references(lookup_cache)
+
+    operations = []
+    for course in courses:
+        update_data = _clean_course_references(course, lookup_cache)
+        if update_data and "_id" in course:
+            operations.append(UpdateOne({"_id": course["_id"]}, {"$set": update_data}))
+
     # Update database if references were cleaned
-    if course_updated:
-        update_data = {}
-        if "category_id" in course:
-            update_data["category_id"] = course["category_id"]
-        if "language_id" in course:
-            update_data["language_id"] = course["language_id"]
-        if "instructor_id" in course:
-            update_data["instructor_id"] = course["instructor_id"]
-        
-        await courses_collection.update_one(
-            {"_id": course["_id"]},
-            {"$set": update_data}
-        )
-    
-    return course
\ No newline at end of file
+    if operations:
+        await courses_collection.bulk_write(operations, ordered=False)
+        logger.info(f"Cleaned invalid references on {len(operations)} courses")
+
+    return courses
+
+async def validate_course_references(course, lookup_cache=None):
+    """Validate and filter invalid references in course data and update database"""
+    await validate_courses_references([course], lookup_cache)
+    return course
@@ -1,5 +1,6 @@
 # Tencent Cloud VOD Integration - Working Implementation
 from fastapi import HTTPException, UploadFile, File, Form
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from bson import ObjectId
 from typing import Optional
@@ -9,28 +10,20 @@ import uuid
 import json
 import asyncio
 import logging
-from core.config import settings
-from tencentcloud.vod.v20180717 import vod_client, models
-from tencentcloud.common import credential
-from tencentcloud.common.profile.client_profile import ClientProfile
-from tencentcloud.common.profile.http_profile import HttpProfile
-from qcloud_cos import CosConfig, CosS3Client
+from core.config import settings, upload_settings
+from helper_function.upload_engine import run_in_upload_executor, spool_upload_file
+from helper_function.tencent_client import get_vod_client, get_cos_client, certificate_is_fresh
+from helper_function.media_deletion import delete_media, deletion_succeeded
+from helper_function.media_blobs import release_media, acquire_blob, register_blob
+from helper_function.media_outbox import enqueue_media_deletions
+from helper_function.course_detail_cache import get_cached_course_videos, cache_course_videos, course_detail_generation
+from tencentcloud.vod.v20180717 import models
 from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
 import io
 
 logger = logging.getLogger(__name__)
 
 
-
-# Initialize client outside function for reuse
-try:
-    cred = credential.Credential(settings.TENCENT_SECRET_ID, settings.TENCENT_SECRET_KEY)
-    client_profile = ClientProfile(httpProfile=HttpProfile(endpoint="vod.tencentcloudapi.com"))
-    vod_client_instance = vod_client.VodClient(cred, settings.TENCENT_REGION, client_profile)
-except Exception as e:
-    logger.error(f"Tencent client initialization failed: {e}")
-    vod_client_instance = None
-
 def upload_progress(consumed_bytes, total_bytes):
     """Progress callback for monitoring upload"""
     if total_bytes:
@@ -38,90 +31,104 @@ def upload_progress(consumed_bytes, total_bytes):
         if rate % 10 == 0: # Log every 10%
             logger.info(f"Upload progress: {rate}% ({consumed_bytes}/{total_bytes} bytes)")
 
-def uploadVideo(videoFile):
-    """Upload video with multipart upload for large files"""
+# COS rejects multipart uploads with more parts than this
+COS_MAX_PARTS = 10000
+
+def _part_size_mb(file_size):
+    """Configured part size, grown only when the file would exceed COS_MAX_PARTS"""
+    min_part_mb = -(-file_size // (COS_MAX_PARTS * 1024 * 1024))
+    return max(upload_settings.UPLOAD_PART_SIZE_MB, min_part_mb)
+
+def uploadVideo(videoFile, progress_callback=upload_progress):
+    """Upload video with multipart upload for large files.
+
+    `videoFile` may be a local file path (streamed from disk part by part),
+    raw bytes or a file object. `progress_callback(consumed, total)` is
+    called as parts of a file on disk complete.
+    """
+    vod_client_instance = get_vod_client()
     if not vod_client_instance:
         raise Exception("Tencent client not initialized")
     
+    response = None
     for attempt in range(3):
         try:
-            # Step 1: Apply for upload
-            params = models.ApplyUploadRequest()
-            params.MediaType = "MP4"
-            params.SubAppId = int(settings.TENCENT_SUB_APP_ID)
-            response = vod_client_instance.ApplyUpload(params)
-            
-            logger.info(f"Upload approved. Region: {response.StorageRegion}")
+            # Step 1: Apply for upload. A retry reuses the application while
+            # its temporary certificate is still valid
+            if response is None or not certificate_is_fresh(response.TempCertificate):
+                params = models.ApplyUploadRequest()
+                params.MediaType = "MP4"
+                params.SubAppId = int(settings.TENCENT_SUB_APP_ID)
+                response = vod_client_instance.ApplyUpload(params)
+                logger.info(f"Upload approved. Region: {response.StorageRegion}")
 
-            # Step 2: Configure COS client with extended timeouts
-            cos_config = CosConfig(
-                Region=response.StorageRegion,
-                SecretId=response.TempCertificate.SecretId,
-                SecretKey=response.TempCertificate.SecretKey,
-                Token=response.TempCertificate.Token,
-                Timeout=1800, # 30 minutes timeout
-                Scheme='https'
-            )
-            cos = CosS3Client(cos_config)
-            
-            # Configure retry policy on the session
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-            
-            retry_strategy = Retry(
-                total=5,
-                backoff_factor=2,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
-            )
-            adapter = HTTPAdapter(max_retries=retry_strategy)
-            cos._session.mount("https://", adapter)
-            cos._session.mount("http://", adapter)
+            # Step 2: COS client on the shared, retrying connection pool
+            cos = get_cos_client(response.StorageRegion, response.TempCertificate)
 
-            # Step 3: Get file size and ensure proper format
-            if isinstance(videoFile, bytes):
-                # If it's raw bytes, convert to BytesIO
-                file_size = len(videoFile)
-                videoFile = io.BytesIO(videoFile)
-                logger.info(f"Converted bytes to BytesIO")
-            elif isinstance(videoFile, io.BytesIO):
-                videoFile.seek(0, 2)
-                file_size = videoFile.tell()
-                videoFile.seek(0)
-            elif hasattr(videoFile, 'size'):
-                file_size = videoFile.size
-                if hasattr(videoFile, 'seek'):
-                    videoFile.seek(0)
-            elif hasattr(videoFile, 'tell') and hasattr(videoFile, 'seek'):
-                # Try to get size from file object
-                current_pos = videoFile.tell()
-                videoFile.seek(0, 2)
-                file_size = videoFile.tell()
-                videoFile.seek(current_pos)
+            # Step 3: Upload. Files on disk go through COS multipart upload, which
+            # reads one part per worker thread, so memory stays bounded by
+            # UPLOAD_PART_SIZE_MB * UPLOAD_PART_THREADS whatever the file size
+            if isinstance(videoFile, (str, os.PathLike)):
+                file_size = os.path.getsize(videoFile)
+                if file_size > 5 * 1024 * 1024:
+                    logger.info("Using multipart upload from disk for large file")
+                    cos.upload_file(
+                        Bucket=response.StorageBucket,
+                        Key=response.MediaStoragePath,
+                        LocalFilePath=os.fspath(videoFile),
+                        PartSize=_part_size_mb(file_size),
+                        MAXThread=upload_settings.UPLOAD_PART_THREADS,
+                        progress_callback=progress_callback
+                    )
+                else:
+                    with open(videoFile, "rb") as body:
+                        cos.put_object(
+                            Bucket=response.StorageBucket,
+                            Key=response.MediaStoragePath,
+                            Body=body
+                        )
+                    progress_callback(file_size, file_size)
             else:
-                raise ValueError("Unable to determine file size from provided video object")
-            
-            # Step 4: Upload based on file size
-            # Use multipart for files > 5MB
-            if file_size > 5 * 1024 * 1024:
-                logger.info("Using multipart upload for large file")
-                
-                # Calculate optimal part size (between 1MB and 100MB)
-                part_size_mb = min(max(1, file_size // (100 * 1024 * 1024)), 100)
+                # Get file size and ensure proper format
+                if isinstance(videoFile, bytes):
+                    # If it's raw bytes, convert to BytesIO
+                    file_size = len(videoFile)
+                    videoFile = io.BytesIO(videoFile)
+                    logger.info(f"Converted bytes to BytesIO")
+                elif isinstance(videoFile, io.BytesIO):
+                    videoFile.seek(0, 2)
+                    file_size = videoFile.tell()
+                    videoFile.seek(0)
+                elif hasattr(videoFile, 'size'):
+                    file_size = videoFile.size
+                    if hasattr(videoFile, 'seek'):
+                        videoFile.seek(0)
+                elif hasattr(videoFile, 'tell') and hasattr(videoFile, 'seek'):
+                    # Try to get size from file object
+                    current_pos = videoFile.tell()
+                    videoFile.seek(0, 2)
+                    file_size = videoFile.tell()
+                    videoFile.seek(current_pos)
+                else:
+                    raise ValueError("Unable to determine file size from provided video object")
                 
-                response_upload = cos.upload_file_from_buffer(
-                    Bucket=response.StorageBucket,
-                    Key=response.MediaStoragePath,
-                    Body=videoFile,
-                    PartSize=part_size_mb, # Part size in MB
-                    MAXThread=10 # Parallel upload threads
-                )
-            else:
-                response_upload = cos.put_object(
-                    Bucket=response.StorageBucket,
-                    Key=response.MediaStoragePath,
-                    Body=videoFile
-                )
+                # Use multipart for files > 5MB
+                if file_size > 5 * 1024 * 1024:
+                    logger.info("Using multipart upload for large file")
+                    
+                    response_upload = cos.upload_file_from_buffer(
+                        Bucket=response.StorageBucket,
+                        Key=response.MediaStoragePath,
+                        Body=videoFile,
+                        PartSize=_part_size_mb(file_size), # Part size in MB
+                        MAXThread=upload_settings.UPLOAD_PART_THREADS # Parallel upload threads
+                    )
+                else:
+                    response_upload = cos.put_object(
+                        Bucket=response.StorageBucket,
+                        Key=response.MediaStoragePath,
+                        Body=videoFile
+                    )
 
             # Step 5: Commit upload
             commitParams = models.CommitUploadRequest()
@@ -138,6 +145,8 @@ def uploadVideo(videoFile):
         except TencentCloudSDKException as err:
             if attempt == 2:
                 raise
+            # VOD rejected the application or commit; start a fresh one
+            response = None
             import time
             time.sleep(2 ** attempt) # Exponential backoff
         except Exception as err:
@@ -147,21 +156,19 @@ def uploadVideo(videoFile):
             import time
             time.sleep(2 ** attempt)
 
-async def uploadVideoToTencent(video):
+async def uploadVideoToTencent(video, progress_callback=upload_progress):
     """Main async function for video upload"""
     try:
-        if not vod_client_instance:
+        if not get_vod_client():
             return None
         
         # Ensure video file is at the beginning
         if hasattr(video, 'seek'):
             video.seek(0)
-            
-        loop = asyncio.get_running_loop()
         
-        # Upload video with extended timeout
+        # Upload video on the dedicated upload pool with extended timeout
         videoData = await asyncio.wait_for(
-            loop.run_in_executor(None, uploadVideo, video),
+            run_in_upload_executor(uploadVideo, video, progress_callback),
             timeout=3600 # 1 hour timeout for very large files
         )
         
@@ -186,21 +193,15 @@ async def uploadVideoToTencent(video):
         return None
 
 async def delete_from_tencent_vod(file_id: str):
-    """Delete file from Tencent VOD"""
-    try:
-        if not vod_client_instance or not file_id:
-            return False
-        
-        params = models.DeleteMediaRequest()
-        params.FileId = file_id
-        params.SubAppId = int(settings.TENCENT_SUB_APP_ID)
-        
-        response = vod_client_instance.DeleteMedia(params)
-        logger.info(f"File deleted from Tencent: {file_id}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to delete file {file_id}: {str(e)}")
+    """Delete file from Tencent VOD off the event loop; True if it is gone.
+
+    Deduplicated media still referenced elsewhere only loses one reference.
+    """
+    if not file_id:
         return False
+    if not await release_media([file_id]):
+        return True
+    return deletion_succeeded(await delete_media(file_id))
 
 def extract_file_id_from_url(url: str) -> str:
     """Extract FileId from Tencent VOD URL"""
@@ -233,8 +234,8 @@ def extract_file_id_from_url(url: str) -> str:
         logger.error(f"Error extracting fileId from URL {url}: {e}")
         return None
 
-async def upload_to_tencent_vod(file_content: bytes, filename: str):
-    """Async upload function"""
+async def upload_to_tencent_vod(file_content, filename: str):
+    """Async upload function (file_content: local path, bytes or file object)"""
     try:
         result = await uploadVideoToTencent(file_content)
         if result:
@@ -244,6 +245,39 @@ async def upload_to_tencent_vod(file_content: bytes, filename: str):
     except Exception as e:
         raise Exception(f"Video upload failed: {str(e)}")
 
+async def upload_video_deduplicated(path: str, size: int, digest: str, progress_callback=upload_progress):
+    """Upload a video file on disk unless the same bytes are already on Tencent.
+
+    A match takes a reference to the existing file instead; the reference is
+    given back through the deletion outbox or delete_from_tencent_vod.
+    """
+    blob = await acquire_blob(digest, size)
+    if blob:
+        logger.info(f"Identical video already uploaded, reusing FileId={blob['file_id']}")
+        return {"file_id": blob["file_id"], "video_url": blob["url"]}
+
+    result = await uploadVideoToTencent(path, progress_callback)
+    if not result:
+        raise Exception("Video upload failed: Upload returned None")
+    blob = await register_blob(digest, size, "video", result["file_id"], result["video_url"])
+    if blob["file_id"] != result["file_id"]:
+        # A concurrent upload of the same bytes registered first; ours is redundant
+        await enqueue_media_deletions([result["file_id"]], "video_dedup")
+    return {"file_id": blob["file_id"], "video_url": blob["url"]}
+
+async def upload_video_file_to_tencent(video_file: UploadFile):
+    """Upload an UploadFile without reading it into memory.
+
+    The file is spooled to disk in bounded chunks, hashed on the way, and
+    streamed to COS part by part unless identical bytes were uploaded
+    before; the spool file is removed once the upload finishes.
+    """
+    spooled = await spool_upload_file(video_file)
+    try:
+        return await upload_video_deduplicated(spooled.path, spooled.size, spooled.content_hash)
+    finally:
+        spooled.cleanup()
+
 async def upload_course_video(
     course_id: str,
     video_file: UploadFile = File(...),
@@ -251,51 +285,68 @@ async def upload_course_video(
     video_description: Optional[str] = Form(None),
     order: Optional[int] = Form(None)
 ):
-    """Upload video file to Tencent Cloud VOD"""
+    """Stage a course video and queue its Tencent Cloud VOD upload.
+
+    Returns 202 with a job id at once; poll /admin/jobs/{job_id} for progress.
+    """
+    from helper_function.upload_jobs import enqueue_course_video_job, format_job
+
     try:
+        if not ObjectId.is_valid(course_id):
+            raise HTTPException(status_code=400, detail="Invalid course ID")
+
         # Check course exists
-        course = await courses_collection.find_one({"_id": ObjectId(course_id)})
+        course = await courses_collection.find_one({"_id": ObjectId(course_id)}, {"_id": 1})
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
 
-        # Read video file content
-        file_content = await video_file.read()
-        
-        # Upload to Tencent Cloud VOD
-        tencent_result = await upload_to_tencent_vod(file_content, video_file.filename)
-
-        # Add video to course with Tencent URLs
+        # Spool to disk; the worker removes the file once the upload completes
+        spooled = await spool_upload_file(video_file)
         video_data = {
-            "fileId": tencent_result["file_id"],
-            "videoUrl": tencent_result["video_url"],
             "video_title": video_title or video_file.filename,
             "video_description": video_description or "",
             "order": order or 1
         }
+        try:
+            job = await enqueue_course_video_job(
+                course_id, spooled.path, video_file.filename, video_data, content_hash=spooled.content_hash
+            )
+        except Exception:
+            spooled.cleanup()
+            raise
 
-        await courses_collection.update_one(
-            {"_id": ObjectId(course_id)},
-            {"$push": {"videos": video_data}}
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "message": "Video upload queued",
+                "data": format_job(job)
+            }
         )
 
-        return {
-            "success": True,
-            "message": "Video uploaded to Tencent Cloud VOD successfully",
-            "data": video_data
-        }
-
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 async def get_course_videos(course_id: str):
     """Get all videos for a course"""
     try:
-        course = await courses_collection.find_one({"_id": ObjectId(course_id)})
+        cached = get_cached_course_videos(course_id)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        generation = course_detail_generation()
+
+        course = await courses_collection.find_one({"_id": ObjectId(course_id)}, {"videos": 1})
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
-        return {
+        # Lecture ids are stringified by the serializer; legacy embedded videos pass through
+        body = cache_course_videos(course_id, {
             "success": True,
-            "data": course.get("videos", [])
-        }
+            "data": course.get("videos") or []
+        }, generation)
+        return Response(content=body, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,31 +1,58 @@
 from fastapi import HTTPException, Request, Depends
+from typing import Optional
 from core.database import instructors_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.pagination import fetch_keyset_page, keyset_cursor, get_estimated_count, validate_limit, DEFAULT_PAGE_LIMIT
+from helper_function.streaming import stream_documents, validate_stream_format, validate_stream_limit
+
+def format_instructor(doc):
+    return {
+        "id": str(doc.get("_id")),
+        "instructor_name": doc.get("name"),
+        "status": doc.get("status", True)
+    }
 
 async def get_all_instructors(
     request: Request,
-    token: str = Depends(get_current_user)
+    token: str = Depends(get_current_user),
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    stream: Optional[str] = None
 ):
  
     try:
-        docs = await instructors_collection.find({}).to_list(length=10000)  
-        instructors = [
-            {
-                "id": str(doc.get("_id")),
-                "instructor_name": doc.get("name"),
-                "status": doc.get("status", True)
+        if stream:
+            cursor = keyset_cursor(instructors_collection, {}, after, limit=validate_stream_limit(limit))
+            return stream_documents(cursor, format_instructor, validate_stream_format(stream))
+        
+        pagination = None
+        if after or limit is not None:
+            page_limit = validate_limit(DEFAULT_PAGE_LIMIT if limit is None else limit)
+            docs, next_cursor, has_next = await fetch_keyset_page(instructors_collection, {}, page_limit, after)
+            pagination = {
+                "limit": page_limit,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+                "estimated_total": await get_estimated_count(instructors_collection)
             }
-            for doc in docs
-        ]
+        else:
+            docs = await instructors_collection.find({}).to_list(length=10000)
+        instructors = [format_instructor(doc) for doc in docs]
+        
+        data = {
+            "total_instructors": len(instructors),
+            "instructors": instructors
+        }
+        if pagination:
+            data["pagination"] = pagination
         
         return {
             "success": True,
             "message": "Instructors retrieved successfully",
-            "data": {
-                "total_instructors": len(instructors),
-                "instructors": instructors
-            }
+            "data": data
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -2,6 +2,7 @@ from fastapi import HTTPException, Request, Form, Depends
 from bson import ObjectId
 from core.database import languages_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.reference_cache import invalidate_reference_cache
 from datetime import datetime
 
 async def create_language(
@@ -28,6 +29,7 @@ async def create_language(
         }
         
         result = await languages_collection.insert_one(new_language)
+        await invalidate_reference_cache("languages")
         language_id = str(result.inserted_id)
         
         # Format response
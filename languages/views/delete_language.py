@@ -2,6 +2,7 @@ from fastapi import HTTPException, Request, Depends
 from bson import ObjectId
 from core.database import languages_collection, courses_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.reference_cache import invalidate_reference_cache
 
 async def delete_language(
     language_id: str,
@@ -27,6 +28,7 @@ async def delete_language(
         
         # Delete language from database
         await languages_collection.delete_one({"_id": ObjectId(language_id)})
+        await invalidate_reference_cache("languages")
         
         return {
             "success": True,
@@ -1,32 +1,59 @@
 from fastapi import HTTPException, Request, Depends
+from typing import Optional
 from core.database import languages_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.pagination import fetch_keyset_page, keyset_cursor, get_estimated_count, validate_limit, DEFAULT_PAGE_LIMIT
+from helper_function.streaming import stream_documents, validate_stream_format, validate_stream_limit
+
+def format_language(doc):
+    return {
+        "id": str(doc.get("_id")),
+        "name": doc.get("name"),
+        "status": doc.get("status", True)
+    }
 
 async def get_all_languages(
     request: Request,
-    token: str = Depends(get_current_user)
+    token: str = Depends(get_current_user),
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    stream: Optional[str] = None
 ):
     """Get all languages with id and name"""
     try:
-        docs = await languages_collection.find({}).to_list(length=10000)
+        if stream:
+            cursor = keyset_cursor(languages_collection, {}, after, limit=validate_stream_limit(limit))
+            return stream_documents(cursor, format_language, validate_stream_format(stream))
         
-        languages = [
-            {
-                "id": str(doc.get("_id")),
-                "name": doc.get("name"),
-                "status": doc.get("status", True)
+        pagination = None
+        if after or limit is not None:
+            page_limit = validate_limit(DEFAULT_PAGE_LIMIT if limit is None else limit)
+            docs, next_cursor, has_next = await fetch_keyset_page(languages_collection, {}, page_limit, after)
+            pagination = {
+                "limit": page_limit,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+                "estimated_total": await get_estimated_count(languages_collection)
             }
-            for doc in docs
-        ]
+        else:
+            docs = await languages_collection.find({}).to_list(length=10000)
+        
+        languages = [format_language(doc) for doc in docs]
+        
+        data = {
+            "total_languages": len(languages),
+            "languages": languages
+        }
+        if pagination:
+            data["pagination"] = pagination
         
         return {
             "success": True,
             "message": "Languages retrieved successfully",
-            "data": {
-                "total_languages": len(languages),
-                "languages": languages
-            }
+            "data": data
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -2,6 +2,7 @@ from fastapi import HTTPException, Request, Form, Depends
 from bson import ObjectId
 from core.database import languages_collection
 from helper_function.apis_requests import get_current_user
+from helper_function.reference_cache import invalidate_reference_cache
 from datetime import datetime
 from typing import Optional
 
@@ -52,6 +53,7 @@ async def update_language(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail={"message": "Language not found. Please verify the language ID and try again."})
+        await invalidate_reference_cache("languages")
         
         # Get updated language
         updated_language = await languages_collection.find_one({"_id": ObjectId(language_id)})
@@ -1,13 +1,41 @@
+from contextlib import asynccontextmanager
 from core.routes import api_router
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from middleware.allowedHostsMiddleware import AllowedHostsMiddleware
 from middleware.timeMeasureMiddleware import ExecutionTimeMiddleware
-from middleware.checkUserExistsMiddleware import CheckUserExistsMiddleware
-from middleware.tokenAuthentication import AccessTokenAuthenticatorMiddleware
+from middleware.adminAuthMiddleware import AdminAuthMiddleware
+from helper_function.reference_cache import start_reference_cache, stop_reference_cache
+from helper_function.admin_cache import start_admin_cache, stop_admin_cache
+from helper_function.upload_jobs import start_upload_jobs, stop_upload_jobs
+from helper_function.media_outbox import start_media_outbox, stop_media_outbox
+from helper_function.layoutdata_update import start_layout_rebuild, stop_layout_rebuild
+from helper_function.dashboard_counters import start_dashboard_counters, stop_dashboard_counters
+from helper_function.upload_session_store import start_upload_session_sweeper, stop_upload_session_sweeper
+from helper_function.image_processing import stop_image_processing
 
-app = FastAPI(title="Skillobal API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm in-process caches and start their background watchers
+    await start_reference_cache()
+    await start_admin_cache()
+    await start_upload_jobs()
+    await start_media_outbox()
+    await start_layout_rebuild()
+    await start_dashboard_counters()
+    await start_upload_session_sweeper()
+    yield
+    await stop_upload_session_sweeper()
+    await stop_dashboard_counters()
+    await stop_layout_rebuild()
+    await stop_media_outbox()
+    await stop_upload_jobs()
+    # After the upload workers, which may still be rendering image variants
+    await stop_image_processing()
+    await stop_admin_cache()
+    await stop_reference_cache()
+
+app = FastAPI(title="Skillobal API", lifespan=lifespan)
 
 # Custom exception handler for consistent response format
 @app.exception_handler(HTTPException)
@@ -33,11 +61,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Keep all existing middleware in same order
-app.add_middleware(AllowedHostsMiddleware, allowed_hosts)
-# Add the custom middleware
-app.add_middleware(AccessTokenAuthenticatorMiddleware)
-app.add_middleware(CheckUserExistsMiddleware)
+# Host check, token verification and admin existence check (single pure ASGI layer)
+app.add_middleware(AdminAuthMiddleware, allowed_hosts=allowed_hosts)
 #app.add_middleware(ExecutionTimeMiddleware)
 
 # Include all routes
@@ -0,0 +1,83 @@
+import jwt
+import logging
+from bson.errors import InvalidId
+from core.config import jwt_settings
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from helper_function.admin_cache import admin_exists
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_PATHS = frozenset({
+    "/admin/login",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+})
+
+class AdminAuthMiddleware:
+    """Host check, JWT verification and admin existence check in one pure ASGI layer.
+
+    The token is decoded once; its claims are exposed to endpoints through
+    request.state (userId, otpId, token_claims).
+    """
+
+    def __init__(self, app, allowed_hosts: list[str], excluded_paths=EXCLUDED_PATHS):
+        self.app = app
+        self.allow_any_host = "*" in allowed_hosts
+        self.allowed_hosts = frozenset(allowed_hosts)
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        # Only HTTP requests are checked; CORS preflight always passes through
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        response = await self.authenticate(scope)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def authenticate(self, scope):
+        """Return an error response, or None when the request may proceed"""
+        headers = Headers(scope=scope)
+
+        if not self.allow_any_host:
+            host = headers.get("host", "").split(":")[0]  # Extract the host
+            if host not in self.allowed_hosts:
+                return JSONResponse({"detail": "Host not allowed"}, status_code=400)
+
+        if scope["path"] in self.excluded_paths:
+            return None
+
+        token = headers.get("token")
+        if not token:
+            return JSONResponse({"msg": "token not present"}, status_code=400)
+
+        try:
+            claims = jwt.decode(token, jwt_settings.SUGAR_VALUE, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return JSONResponse({"msg": "Token has expired"}, status_code=400)
+        except jwt.InvalidTokenError:
+            return JSONResponse({"msg": "Invalid token"}, status_code=400)
+
+        user_id = claims.get("id")
+        try:
+            if not user_id or not await admin_exists(user_id):
+                return JSONResponse({"msg": "no user found"}, status_code=404)
+        except (InvalidId, TypeError):
+            return JSONResponse({"msg": "Invalid token"}, status_code=400)
+        except Exception as e:
+            logger.error(f"Admin lookup failed: {e}")
+            return JSONResponse(
+                {"msg": "Something went wrong", "error": str(e)}, status_code=500
+            )
+
+        # Attach userId and otpId to the request state
+        state = scope.setdefault("state", {})
+        state["userId"] = user_id
+        state["otpId"] = claims.get("otpId")
+        state["token_claims"] = claims
+        return None
@@ -0,0 +1,21 @@
+import os
+
+# core.config validates settings at import; tests never reach Mongo, Tencent or the AI providers
+TEST_ENVIRONMENT = {
+    "MONGODB_URI": "mongodb://localhost:27017",
+    "DB_NAME": "test",
+    "SUGAR_VALUE": "test",
+    "TENCENT_SECRET_ID": "test",
+    "TENCENT_SUB_APP_ID": "1",
+    "TENCENT_SECRET_KEY": "test",
+    "TENCENT_REGION": "ap-test",
+    "GOOGLE_API_KEY": "test",
+    "LANGCHAIN_API_KEY": "test",
+    "LANGCHAIN_PROJECT": "test",
+    "LANGCHAIN_TRACING_V2": "false",
+    "OPENAI_API_KEY": "test",
+    "XAI_API_KEY": "test",
+}
+
+for name, value in TEST_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
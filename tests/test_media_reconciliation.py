@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+
+from core.database import courses_collection
+from helper_function import media_blobs, media_reconciliation
+from helper_function.media_references import REFERENCE_SOURCES
+from helper_function.media_reconciliation import (
+    ReferencedFileIds, StaticMediaLister, MediaLister, document_file_ids,
+)
+
+COURSE_FIELDS = dict((collection.name, fields) for collection, fields in REFERENCE_SOURCES)[courses_collection.name]
+
+def _orphans(media, referenced):
+    async def collect():
+        lister = StaticMediaLister(media, page_size=2)
+        orphans = []
+        async for page in lister.pages(datetime.now(timezone.utc)):
+            orphans.extend(m["file_id"] for m in page if m["file_id"] not in referenced)
+        return orphans
+    return asyncio.run(collect())
+
+def test_course_with_legacy_embedded_videos_keeps_its_files():
+    course = {
+        "_id": ObjectId(),
+        "images": {"fileId": "image", "variants": [{"fileId": "image-320"}]},
+        # Current lecture ids mixed with a video embedded by the old upload path
+        "videos": [ObjectId(), {"fileId": "legacy-lecture", "videoUrl": "https://example/legacy.mp4"}],
+        "lessons": [{"lesson_id": "1", "videos": [{"fileId": "lesson-video"}]}],
+    }
+    referenced = ReferencedFileIds(document_file_ids(course, COURSE_FIELDS))
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    media = [{"file_id": file_id, "created_at": old}
+             for file_id in ("image", "image-320", "legacy-lecture", "lesson-video", "orphan")]
+
+    assert _orphans(media, referenced) == ["orphan"]
+
+def test_legacy_single_embedded_video_is_referenced():
+    course = {"videos": {"fileId": "single-legacy"}}
+    assert document_file_ids(course, COURSE_FIELDS) == ["single-legacy"]
+
+def test_media_lister_is_abstract():
+    try:
+        MediaLister()
+    except TypeError:
+        return
+    raise AssertionError("MediaLister should not be instantiable")
+
+class _FakeBlobs:
+    """The two media_blobs queries forget_untouched_blobs issues, over a list"""
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    async def delete_many(self, query):
+        since = query["updated_at"]["$not"]["$gte"]
+        self.blobs = [blob for blob in self.blobs
+                      if blob["file_id"] not in query["file_id"]["$in"] or blob["updated_at"] >= since]
+
+    async def distinct(self, field, query):
+        return list({blob[field] for blob in self.blobs if blob["file_id"] in query["file_id"]["$in"]})
+
+def test_orphans_reused_during_the_run_are_not_queued(monkeypatch):
+    started_at = datetime.now()
+    blobs = _FakeBlobs([
+        # Leaked refcount, acquired by a deduplicated upload while the listing ran
+        {"file_id": "reused", "refcount": 2, "updated_at": started_at + timedelta(minutes=5)},
+        # Leaked refcount nobody touched
+        {"file_id": "leaked", "refcount": 1, "updated_at": started_at - timedelta(days=3)},
+    ])
+    queued = []
+
+    async def referenced(file_id):
+        # A document started pointing at it after references were collected
+        return file_id == "attached"
+
+    async def enqueue(file_ids, source):
+        queued.extend(file_ids)
+        return file_ids
+
+    async def no_sleep(_):
+        pass
+
+    monkeypatch.setattr(media_blobs, "media_blobs_collection", blobs)
+    monkeypatch.setattr(media_reconciliation, "file_is_referenced", referenced)
+    monkeypatch.setattr(media_reconciliation, "enqueue_media_deletions", enqueue)
+    monkeypatch.setattr(media_reconciliation.asyncio, "sleep", no_sleep)
+
+    count = asyncio.run(media_reconciliation._queue_orphans_throttled(
+        ["reused", "leaked", "attached", "unregistered"], started_at
+    ))
+
+    assert queued == ["leaked", "unregistered"] and count == 2
+    assert [blob["file_id"] for blob in blobs.blobs] == ["reused"]
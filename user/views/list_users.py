@@ -1,28 +1,54 @@
 from core.database import users_collection, courses_collection
-from fastapi import Request, Depends
+from fastapi import Request, Depends, HTTPException
+from typing import Optional
 from bson import ObjectId
 from fastapi.responses import JSONResponse
 from helper_function.apis_requests import get_current_user
+from helper_function.pagination import fetch_keyset_page, keyset_cursor, get_estimated_count, validate_limit, DEFAULT_PAGE_LIMIT
+from helper_function.streaming import stream_documents, validate_stream_format, validate_stream_limit
 from core.database import users_collection
-async def list_users(request:Request, token: str = Depends(get_current_user)):
+
+USER_LIST_PROJECTION = {"name": 1, "email": 1, "created_at": 1}
+
+def format_user(doc):
+    return {
+        "name": doc.get("name"),
+        "id": str(doc.get("_id")),
+        "email": doc.get("email"),
+        "created_at": doc.get("created_at"),
+    }
+
+async def list_users(request:Request, token: str = Depends(get_current_user), after: Optional[str] = None, limit: Optional[int] = None, stream: Optional[str] = None):
 
     try:
-        docs = await users_collection.find().to_list(length=10000)
-        users = [
-            {   
-                "name": doc.get("name"),
-                "id": str(doc.get("_id")),
-                "email": doc.get("email"),
-                "created_at": doc.get("created_at"),
-            }
-            for doc in docs
-        ]
+        if stream:
+            # Stream user rows only; counts stay available from the non-streaming response
+            cursor = keyset_cursor(users_collection, {}, after, USER_LIST_PROJECTION, validate_stream_limit(limit))
+            return stream_documents(cursor, format_user, validate_stream_format(stream))
+
+        pagination = None
+        if after or limit is not None:
+            page_limit = validate_limit(DEFAULT_PAGE_LIMIT if limit is None else limit)
+            docs, next_cursor, has_next = await fetch_keyset_page(
+                users_collection, {}, page_limit, after, USER_LIST_PROJECTION
+            )
+            total = await get_estimated_count(users_collection)
+            pagination = {"limit": page_limit, "has_next": has_next, "next_cursor": next_cursor}
+        else:
+            docs = await users_collection.find({}, USER_LIST_PROJECTION).to_list(length=10000)
+            total = len(docs)
+        users = [format_user(doc) for doc in docs]
 
         # Count active (visible) courses
         active_courses = await courses_collection.count_documents({"visible": True})
 
-        return {"total": len(users), "activeCourses": active_courses, "users": users}
+        response = {"total": total, "activeCourses": active_courses, "users": users}
+        if pagination:
+            response["pagination"] = pagination
+        return response
 
+    except HTTPException as err:
+        return JSONResponse({"msg": err.detail}, status_code=err.status_code)
     except Exception as err:
         return JSONResponse(
             {"msg": "something went wrong", "err": str(err)}, status_code=500